@@ -97,6 +97,39 @@ def ingest(
     else:
         print(f"⚠️ Alvo '{target}' desconhecido.")
 
+@app.command("fake-ollama")
+def fake_ollama(
+    host: str = "127.0.0.1",
+    port: int = 11435,
+    tokens_per_second: float = typer.Option(50.0, help="Velocidade de decode (0 = sem atraso)"),
+    prefill_ms: float = typer.Option(100.0, help="Atraso fixo antes do primeiro token"),
+    prefill_tokens_per_second: float = typer.Option(2000.0, help="Prefill proporcional ao prompt (0 = sem)"),
+    error_rate: float = typer.Option(0.0, help="Fração de chamadas que falham com HTTP 500"),
+    response_tokens: int = typer.Option(64, help="Tokens por resposta (num_predict tem prioridade)"),
+    load_ms: float = typer.Option(0.0, help="Carga a frio na primeira chamada de cada modelo"),
+    parallel: int = typer.Option(4, help="Gerações simultâneas (como OLLAMA_NUM_PARALLEL)"),
+    seed: int = 0,
+    models: str = typer.Option("", help="Modelos anunciados, separados por vírgula (padrão: família gemma3)")
+):
+    """
+    Inicia um Ollama falso e determinístico (testes de carga/latência sem GPU nem rede).
+    Aponte o Sentinela para ele com OLLAMA_URL=http://HOST:PORT.
+    """
+    from src.interfaces.fake_ollama import FakeOllamaConfig, create_app
+    config = FakeOllamaConfig(
+        tokens_per_second=tokens_per_second,
+        prefill_ms=prefill_ms,
+        prefill_tokens_per_second=prefill_tokens_per_second,
+        error_rate=error_rate,
+        response_tokens=response_tokens,
+        load_ms=load_ms,
+        parallel=parallel,
+        seed=seed,
+        models=[m.strip() for m in models.split(",") if m.strip()] or None
+    )
+    print(f"🧪 Fake Ollama em http://{host}:{port} ({tokens_per_second:g} tok/s, prefill {prefill_ms:g}ms, erro {error_rate:.0%})")
+    uvicorn.run(create_app(config), host=host, port=port, log_level="warning")
+
 @app.command()
 def clean():
     """
@@ -34,13 +34,14 @@ async def reingest_all():
     
     # 2. Clear ALL ChromaDB chunks
     try:
-        db_manager.chroma_client.delete_collection("sentinela_documents")
+        db_manager.chroma_client.delete_collection(db_manager.COLLECTION_NAME)
         logger.info("🗑️ ChromaDB collection deleted.")
     except Exception as e:
         logger.warning(f"Could not delete collection (may not exist): {e}")
     
-    # Recreate empty collection
-    db_manager.chroma_client.get_or_create_collection("sentinela_documents")
+    # Recreate empty collection (applies the configured HNSW profile / cosine space)
+    db_manager._collection_space = None
+    db_manager.get_collection()
     logger.info("✅ Fresh ChromaDB collection created.")
     
     # 3. Clear parent chunks from SQLite
@@ -82,7 +83,7 @@ async def reingest_all():
             logger.error(f"❌ {filename} error: {e}")
     
     # 5. Final report
-    col = db_manager.chroma_client.get_or_create_collection("sentinela_documents")
+    col = db_manager.get_collection()
     
     logger.info(f"\n{'='*60}")
     logger.info(f"🏁 RE-INGESTION COMPLETE")
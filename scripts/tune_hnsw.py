@@ -0,0 +1,249 @@
+"""
+Recall x latency sweep for the HNSW parameters of the vector collection.
+
+Copies the live embeddings into throwaway in-memory collections, measures recall@k
+against exact (brute-force) cosine search and per-query latency for a grid of
+M / construction_ef / search_ef, and recommends the cheapest setting that reaches
+the target recall for the current corpus size.
+
+Usage:
+    python -m scripts.tune_hnsw                      # report only
+    python -m scripts.tune_hnsw --target-recall 0.98 --apply
+    python -m scripts.tune_hnsw --m 16,32 --ef-search 64,128,256
+
+--apply stores the result in runtime settings (vector_index_overrides), which new
+collections are created with. Existing collections keep the configuration they were
+created with (get_or_create_collection does not update it), so --apply also changes
+search_ef in place on the live collection and its gazette shards via
+collection.modify(configuration=...) and re-reads the configuration to confirm it.
+M / construction_ef only change after rebuilding the collection
+(scripts/reingest_affected.py).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def default_grid(corpus_size: int) -> dict:
+    """Parameter grid scaled to the corpus size (bigger graphs need more neighbours)."""
+    if corpus_size < 50_000:
+        return {"M": [8, 16, 32], "construction_ef": [100, 200], "search_ef": [32, 64, 128]}
+    if corpus_size < 1_000_000:
+        return {"M": [16, 32, 48], "construction_ef": [200, 400], "search_ef": [64, 128, 256]}
+    return {"M": [32, 48, 64], "construction_ef": [400, 600], "search_ef": [128, 256, 512]}
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def exact_top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force cosine top-k (ground truth), computed in blocks to bound memory."""
+    truth = []
+    for start in range(0, len(queries), 256):
+        sims = queries[start:start + 256] @ corpus.T
+        top = np.argpartition(-sims, kth=min(k, sims.shape[1] - 1), axis=1)[:, :k]
+        truth.append(top)
+    return np.vstack(truth)
+
+
+async def load_audit_queries(limit: int) -> list:
+    """Real citizen questions from the audit trail (best source of query distribution)."""
+    from src.core.database import db_manager
+    try:
+        conn = await db_manager.get_sqlite()
+        async with conn.execute(
+            "SELECT DISTINCT query FROM audit_logs WHERE query IS NOT NULL AND query != '' LIMIT ?",
+            (limit,)
+        ) as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+    except Exception as e:
+        logger.warning(f"Could not read audit queries: {e}")
+        return []
+
+
+def build_collection(client, corpus: np.ndarray, m: int, construction_ef: int, search_ef: int):
+    metadata = {
+        "hnsw:space": "cosine",
+        "hnsw:M": m,
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": search_ef,
+    }
+    name = f"tune_{uuid.uuid4().hex[:12]}"
+    collection = client.create_collection(name, metadata=metadata, embedding_function=None)
+
+    batch = 5000
+    try:
+        batch = min(batch, client.get_max_batch_size())
+    except Exception:
+        pass
+
+    start = time.perf_counter()
+    for i in range(0, len(corpus), batch):
+        block = corpus[i:i + batch]
+        collection.add(
+            ids=[str(j) for j in range(i, i + len(block))],
+            embeddings=block.tolist()
+        )
+    build_seconds = time.perf_counter() - start
+    return collection, build_seconds
+
+
+def set_search_ef(collection, search_ef: int) -> bool:
+    """Changes search_ef in place when the Chroma version allows it."""
+    try:
+        collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+        return True
+    except Exception:
+        return False
+
+
+def apply_search_ef(client, name: str, search_ef: int) -> bool:
+    """Changes search_ef on an existing collection and confirms it by re-reading its configuration."""
+    if not set_search_ef(client.get_collection(name), search_ef):
+        return False
+    configuration = client.get_collection(name).configuration or {}
+    return (configuration.get("hnsw") or {}).get("ef_search") == search_ef
+
+
+def measure(collection, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    latencies = []
+    hits = 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        res = collection.query(query_embeddings=[q.tolist()], n_results=k, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {int(i) for i in res["ids"][0]}
+        hits += len(found.intersection(int(i) for i in expected))
+    latencies = np.array(latencies)
+    return {
+        "recall": hits / (len(queries) * k),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def pick_best(results: list, target_recall: float) -> dict:
+    """Cheapest p95 reaching the target; otherwise the best recall available."""
+    eligible = [r for r in results if r["recall"] >= target_recall]
+    if eligible:
+        return min(eligible, key=lambda r: (r["p95_ms"], r["M"], r["search_ef"]))
+    return max(results, key=lambda r: (r["recall"], -r["p95_ms"]))
+
+
+def parse_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v.strip()] if value else []
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="HNSW recall x latency sweep")
+    parser.add_argument("--k", type=int, default=10, help="Recall@k (default: 10)")
+    parser.add_argument("--queries", type=int, default=200, help="Number of probe queries")
+    parser.add_argument("--max-vectors", type=int, default=200_000, help="Cap on vectors copied from the live collection")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--m", type=str, default="", help="Comma-separated M values")
+    parser.add_argument("--ef-construction", type=str, default="", help="Comma-separated construction_ef values")
+    parser.add_argument("--ef-search", type=str, default="", help="Comma-separated search_ef values")
+    parser.add_argument("--apply", action="store_true", help="Persist the recommendation in runtime settings")
+    args = parser.parse_args()
+
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+    from src.core.database import db_manager
+    from src.core.settings_manager import settings_manager
+
+    # 1. Corpus snapshot
+    live = db_manager.get_collection()
+    total = live.count()
+    if total == 0:
+        logger.info("Collection is empty. Nothing to tune.")
+        return
+
+    snapshot = live.get(include=["embeddings"], limit=args.max_vectors)
+    corpus = normalize(np.asarray(snapshot["embeddings"], dtype=np.float32))
+    logger.info(f"📦 Corpus: {total} vectors in production, {len(corpus)} sampled (dim={corpus.shape[1]}).")
+
+    # 2. Probe queries: audit trail first, random corpus points as fallback
+    rng = np.random.default_rng(42)
+    texts = await load_audit_queries(args.queries)
+    queries = None
+    if len(texts) >= 20:
+        try:
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+            queries = normalize(np.asarray(DefaultEmbeddingFunction()(texts), dtype=np.float32))
+            logger.info(f"🔎 Using {len(texts)} real queries from audit_logs.")
+        except Exception as e:
+            logger.warning(f"Could not embed audit queries ({e}). Falling back to corpus samples.")
+    if queries is None:
+        idx = rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)
+        # Small perturbation so probes are not exact duplicates of indexed points
+        queries = normalize(corpus[idx] + rng.normal(0, 0.01, size=corpus[idx].shape).astype(np.float32))
+        logger.info(f"🔎 Using {len(queries)} perturbed corpus samples as probes.")
+
+    k = min(args.k, len(corpus))
+    truth = exact_top_k(queries, corpus, k)
+
+    # 3. Sweep
+    grid = default_grid(total)
+    grid["M"] = parse_list(args.m) or grid["M"]
+    grid["construction_ef"] = parse_list(args.ef_construction) or grid["construction_ef"]
+    grid["search_ef"] = parse_list(args.ef_search) or grid["search_ef"]
+
+    client = chromadb.EphemeralClient(settings=ChromaSettings(anonymized_telemetry=False))
+    results = []
+    for m in grid["M"]:
+        for cef in grid["construction_ef"]:
+            collection, build_s = build_collection(client, corpus, m, cef, grid["search_ef"][0])
+            for sef in grid["search_ef"]:
+                if sef != grid["search_ef"][0] and not set_search_ef(collection, sef):
+                    client.delete_collection(collection.name)
+                    collection, build_s = build_collection(client, corpus, m, cef, sef)
+                stats = measure(collection, queries, truth, k)
+                row = {"M": m, "construction_ef": cef, "search_ef": sef, "build_s": build_s, **stats}
+                results.append(row)
+                logger.info(
+                    f"M={m:<3} cef={cef:<4} sef={sef:<4} recall@{k}={stats['recall']:.3f} "
+                    f"p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms build={build_s:.1f}s"
+                )
+            client.delete_collection(collection.name)
+
+    # 4. Recommendation
+    best = pick_best(results, args.target_recall)
+    overrides = {"M": best["M"], "construction_ef": best["construction_ef"], "search_ef": best["search_ef"]}
+    logger.info(f"\n{'='*60}")
+    logger.info(f"🏁 Recommended for {total} vectors (target recall {args.target_recall}): {overrides}")
+    logger.info(f"   recall@{k}={best['recall']:.3f} p95={best['p95_ms']:.2f}ms")
+
+    if args.apply:
+        settings_manager.update({"vector_index_overrides": overrides})
+        logger.info("✅ Saved to vector_index_overrides (used by newly created collections).")
+
+        targets = [(db_manager.chroma_client, db_manager.COLLECTION_NAME)] + [
+            (db_manager.cold_chroma_client if shard["location"] == "cold" else db_manager.chroma_client, shard["name"])
+            for shard in await db_manager.list_vector_shards()
+        ]
+        for target_client, name in targets:
+            if apply_search_ef(target_client, name, best["search_ef"]):
+                logger.info(f"✅ {name}: search_ef={best['search_ef']} (configuration confirmed).")
+            else:
+                logger.warning(f"⚠️ {name}: could not change search_ef in place. Rebuild the collection to apply it.")
+        logger.info("ℹ️ M/construction_ef only apply after rebuilding the collection (scripts/reingest_affected.py).")
+
+    await db_manager.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -12,13 +12,20 @@ class Settings(BaseSettings):
     BASE_DIR: Path = Path(__file__).resolve().parent.parent
     DATA_DIR: Path = BASE_DIR / "data"
     CHROMADB_DIR: Path = DATA_DIR / "chromadb"
+    CHROMADB_COLD_DIR: Path = DATA_DIR / "chromadb_cold" # Offloaded gazette shards (cold storage)
     SQLITE_DB_PATH: Path = DATA_DIR / "sqlite" / "sentinela.db"
+    MODEL_CACHE_DB_PATH: Path = DATA_DIR / "sqlite" / "model_cache.db" # Query embeddings / rerank scores
     INGEST_DIR: Path = DATA_DIR / "ingest"
     
     # LLM
     OLLAMA_URL: str = "http://localhost:11434"
+    OLLAMA_URLS: str = "" # Vários nós (separados por vírgula); vazio = só OLLAMA_URL
     LLM_MODEL: str = "gemma3:27b"  # Default Factory Model
-    LLM_TIMEOUT: int = 120
+    LLM_TIMEOUT: int = 120 # Read timeout (s): tempo máximo entre bytes da resposta
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    OLLAMA_MAX_CONNECTIONS: int = 16 # Teto de conexões (e de streams simultâneos) com o Ollama
+    OLLAMA_MAX_KEEPALIVE: int = 8 # Conexões ociosas mantidas abertas
+    OLLAMA_KEEPALIVE_EXPIRY: float = 120.0 # Segundos até fechar uma conexão ociosa
     
     # OCR
     OCR_MIN_CONFIDENCE: float = 70.0
@@ -32,6 +39,10 @@ class Settings(BaseSettings):
     def cors_origins(self) -> List[str]:
         return [o.strip() for o in self.CORS_ALLOW_ORIGINS.split(",") if o.strip()]
 
+    def ollama_urls(self) -> List[str]:
+        urls = [u.strip() for u in self.OLLAMA_URLS.split(",") if u.strip()]
+        return urls or [self.OLLAMA_URL]
+
     def allowed_upload_mime(self) -> List[str]:
         return [m.strip() for m in self.ALLOWED_UPLOAD_MIME.split(",") if m.strip()]
     
@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Números, dispositivos e datas: "artigo 5" x "artigo 6" ou "decretos de 2023" x "de 2024" ficam
+# acima do limiar semântico, mas são perguntas diferentes -> só casamento exato
+EXACT_ONLY_PATTERN = re.compile(
+    r"\d|\b(art|artigo|artigos|inciso|incisos|paragrafo|alinea|janeiro|fevereiro|marco|abril|maio|junho|"
+    r"julho|agosto|setembro|outubro|novembro|dezembro)\b"
+)
+
+
+def requires_exact_match(query_norm: str) -> bool:
+    return bool(EXACT_ONLY_PATTERN.search(query_norm))
+
+
+def date_scope(date_range) -> str:
+    """Resolved (start, end) period as part of the cache key ('' = no period)."""
+    return f"{date_range[0]}:{date_range[1]}" if date_range else ""
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, no accents, no punctuation, single spaces."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.findall(r"\w+", text))
+
+
+class AnswerCache:
+    """
+    Semantic answer cache for chat turns.
+    Key: normalized formal_query + sphere + resolved period + corpus generation (bumped when
+    documents are activated/deleted, which invalidates every older answer). Near-duplicate
+    queries match through query embeddings above a similarity threshold, except queries with
+    numbers, legal provisions or dates, which only match exactly. In-memory LRU with TTL,
+    persisted in SQLite (answer_cache) so restarts keep the warm entries.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._loaded_generation = None
+
+    @staticmethod
+    def make_key(query_norm: str, sphere: str, generation: int, period: str = "") -> str:
+        return hashlib.sha256(f"{query_norm}|{sphere}|{period}|{generation}".encode()).hexdigest()
+
+    @staticmethod
+    async def _embed(text: str) -> Optional[np.ndarray]:
+        try:
+            from src.core.embedder import embedder
+            return (await asyncio.to_thread(embedder.encode, [text]))[0] # Fora do event loop
+        except Exception:
+            return None # Exact matching only
+
+    async def _ensure_loaded(self, generation: int):
+        """Loads the persisted entries of the current generation; drops stale ones."""
+        if self._loaded_generation == generation:
+            return
+        from src.core.database import db_manager
+        from src.core.settings_manager import settings_manager
+
+        conn = await db_manager.get_sqlite()
+        min_created = time.time() - settings_manager.answer_cache_ttl_hours * 3600
+        await conn.execute("DELETE FROM answer_cache WHERE generation != ? OR created_at < ?", (generation, min_created))
+        await conn.commit()
+
+        self._entries.clear()
+        async with conn.execute(
+            "SELECT key, query_norm, sphere, date_range, embedding, response, citations_json, created_at "
+            "FROM answer_cache ORDER BY COALESCE(last_hit_at, created_at) DESC LIMIT ?",
+            (settings_manager.answer_cache_max_entries,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        for row in reversed(rows): # Oldest first: most recent end up at the LRU tail
+            self._entries[row["key"]] = {
+                "query_norm": row["query_norm"],
+                "sphere": row["sphere"],
+                "period": row["date_range"] or "",
+                "vector": np.frombuffer(row["embedding"], dtype=np.float32) if row["embedding"] else None,
+                "response": row["response"],
+                "citations": json.loads(row["citations_json"] or "[]"),
+                "created_at": row["created_at"],
+            }
+        self._loaded_generation = generation
+
+    def _expired(self, entry: Dict[str, Any], ttl_seconds: float) -> bool:
+        return time.time() - entry["created_at"] > ttl_seconds
+
+    async def lookup(self, formal_query: str, sphere: str, date_range=None) -> Optional[Dict[str, Any]]:
+        """
+        Returns {"response", "citations", "match", "similarity"} or None.
+        `date_range` is the resolved (start, end) period of the turn (UI filter or intent).
+        """
+        from src.core.database import db_manager
+        from src.core.settings_manager import settings_manager
+
+        generation = await db_manager.get_corpus_generation()
+        await self._ensure_loaded(generation)
+        ttl = settings_manager.answer_cache_ttl_hours * 3600
+
+        query_norm = normalize_query(formal_query)
+        period = date_scope(date_range)
+        key = self.make_key(query_norm, sphere, generation, period)
+        entry = self._entries.get(key)
+        match, similarity = "exact", 1.0
+
+        if entry is None and not requires_exact_match(query_norm):
+            # Near-duplicate: one matrix-vector product over the entries with the same sphere and period
+            candidates = [(k, e) for k, e in self._entries.items()
+                          if e["sphere"] == sphere and e["period"] == period
+                          and e["vector"] is not None and not self._expired(e, ttl)]
+            vector = await self._embed(query_norm) if candidates else None
+            if vector is not None:
+                sims = np.stack([e["vector"] for _, e in candidates]) @ vector
+                best = int(np.argmax(sims))
+                if sims[best] >= settings_manager.answer_cache_similarity:
+                    key, entry = candidates[best]
+                    match, similarity = "semantic", float(sims[best])
+
+        if entry is None:
+            return None
+        if self._expired(entry, ttl):
+            await self._delete(key)
+            return None
+
+        self._entries.move_to_end(key)
+        conn = await db_manager.get_sqlite()
+        await conn.execute("UPDATE answer_cache SET hits = hits + 1, last_hit_at = ? WHERE key = ?", (time.time(), key))
+        await conn.commit()
+        return {"response": entry["response"], "citations": entry["citations"], "match": match, "similarity": similarity}
+
+    async def store(self, formal_query: str, sphere: str, response: str, citations: List[Dict[str, Any]],
+                    date_range=None):
+        from src.core.database import db_manager
+        from src.core.settings_manager import settings_manager
+
+        if not response or not response.strip():
+            return
+        generation = await db_manager.get_corpus_generation()
+        await self._ensure_loaded(generation)
+
+        query_norm = normalize_query(formal_query)
+        period = date_scope(date_range)
+        key = self.make_key(query_norm, sphere, generation, period)
+        vector = await self._embed(query_norm)
+        now = time.time()
+        self._entries[key] = {
+            "query_norm": query_norm,
+            "sphere": sphere,
+            "period": period,
+            "vector": vector,
+            "response": response,
+            "citations": citations,
+            "created_at": now,
+        }
+        self._entries.move_to_end(key)
+
+        conn = await db_manager.get_sqlite()
+        await conn.execute(
+            """
+            INSERT OR REPLACE INTO answer_cache
+                (key, query_norm, sphere, date_range, generation, embedding, response, citations_json, hits, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?)
+            """,
+            (key, query_norm, sphere, period, generation,
+             vector.astype(np.float32).tobytes() if vector is not None else None,
+             response, json.dumps(citations, ensure_ascii=False, default=str), now)
+        )
+        await conn.commit()
+
+        # LRU eviction
+        while len(self._entries) > settings_manager.answer_cache_max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            await conn.execute("DELETE FROM answer_cache WHERE key = ?", (old_key,))
+        await conn.commit()
+
+    async def _delete(self, key: str):
+        from src.core.database import db_manager
+        self._entries.pop(key, None)
+        conn = await db_manager.get_sqlite()
+        await conn.execute("DELETE FROM answer_cache WHERE key = ?", (key,))
+        await conn.commit()
+
+    async def clear(self) -> int:
+        from src.core.database import db_manager
+        count = len(self._entries)
+        self._entries.clear()
+        self._loaded_generation = None
+        conn = await db_manager.get_sqlite()
+        await conn.execute("DELETE FROM answer_cache")
+        await conn.commit()
+        return count
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,84 @@
+import logging
+import re
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sentence boundaries plus line breaks (incisos, alíneas and table rows live on their own lines)
+_SENTENCE_SPLIT = re.compile(r"(?<=[.?!;:])\s+|\n+")
+
+
+class ExtractiveCompressor:
+    """
+    Query-focused extractive compression of retrieved parents.
+    Keeps the sentences most similar to the query (plus their neighbours) up to a
+    character keep-ratio, in original order, marking the gaps with "[...]".
+    The first sentence is always kept: it carries the article/page header used in citations.
+    """
+
+    def split_sentences(self, text: str) -> List[str]:
+        return [s.strip() for s in _SENTENCE_SPLIT.split(text) if s and s.strip()]
+
+    def select(self, sentences: List[str], scores: np.ndarray, keep_ratio: float, neighbours: int = 1) -> List[int]:
+        """Indices kept: best sentences (with neighbours) until the character budget is reached."""
+        budget = keep_ratio * sum(len(s) for s in sentences)
+        keep = {0}
+        used = len(sentences[0])
+        for idx in np.argsort(-scores):
+            if used >= budget:
+                break
+            for j in range(max(0, idx - neighbours), min(len(sentences), idx + neighbours + 1)):
+                if j not in keep:
+                    keep.add(j)
+                    used += len(sentences[j])
+        return sorted(keep)
+
+    def compress_many(self, query: str, texts: List[str], keep_ratio: float = 0.4,
+                      neighbours: int = 1, min_chars: int = 1200) -> List[str]:
+        """
+        Compresses several parents with a single embedding call (query + all sentences).
+        Texts shorter than min_chars are returned untouched.
+        """
+        from src.core.embedder import embedder
+
+        split = [self.split_sentences(t) if t and len(t) >= min_chars else None for t in texts]
+        flat = [s for sentences in split if sentences for s in sentences]
+        if not flat:
+            return list(texts)
+
+        try:
+            vectors = embedder.encode([query] + flat)
+        except Exception as e:
+            logger.warning(f"⚠️ Compressão de contexto indisponível: {e}")
+            return list(texts)
+
+        # Vectorized cosine (normalized embeddings): one matrix-vector product for every sentence
+        scores_all = vectors[1:] @ vectors[0]
+
+        results = []
+        offset = 0
+        for text, sentences in zip(texts, split):
+            if not sentences or len(sentences) < 3:
+                offset += len(sentences or [])
+                results.append(text)
+                continue
+            scores = scores_all[offset:offset + len(sentences)]
+            offset += len(sentences)
+
+            kept = self.select(sentences, scores, keep_ratio, neighbours)
+            parts = []
+            previous = -1
+            for idx in kept:
+                if previous >= 0 and idx != previous + 1:
+                    parts.append("[...]")
+                parts.append(sentences[idx])
+                previous = idx
+            if kept[-1] < len(sentences) - 1:
+                parts.append("[...]")
+            results.append(" ".join(parts))
+        return results
+
+
+context_compressor = ExtractiveCompressor()
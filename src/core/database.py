@@ -1,8 +1,9 @@
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 import aiosqlite
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from src.config import settings
 
 # Logger setup
@@ -13,9 +14,17 @@ class DatabaseManager:
     Centralized database manager for Vector (ChromaDB) and Relational (SQLite) data.
     """
     
+    COLLECTION_NAME = "sentinela_documents"
+    ROUTING_COLLECTION_NAME = "sentinela_doc_routing" # Document-level index (parent centroids + summaries)
+
     def __init__(self):
         self._chroma_client = None
         self._sqlite_connection = None
+        self._collection_space = None
+        self._embedding_function = None
+        self._cold_chroma_client = None
+        self._cold_shards = set() # Names of gazette shards offloaded to cold storage
+        self._corpus_generation = None # Bumped on activation/deletion (answer cache invalidation)
 
     @property
     def chroma_client(self):
@@ -31,6 +40,352 @@ class DatabaseManager:
             )
         return self._chroma_client
 
+    def get_collection(self):
+        """
+        Returns the main vector collection, creating it from the configured HNSW profile.
+        Existing collections keep their original space/M (Chroma does not allow changing them);
+        a mismatch is logged so the admin can rebuild via scripts/reingest_affected.py.
+        """
+        from src.core.settings_manager import settings_manager
+        from src.core.vector_index import collection_metadata
+
+        expected = collection_metadata(
+            settings_manager.vector_index_profile,
+            settings_manager.vector_index_overrides
+        )
+        collection = self.chroma_client.get_or_create_collection(self.COLLECTION_NAME, metadata=expected)
+
+        if self._collection_space is None:
+            current = collection.metadata or {}
+            # Legacy collections created without metadata use Chroma's default (L2)
+            self._collection_space = current.get("hnsw:space", "l2")
+            if self._collection_space != expected["hnsw:space"]:
+                logger.warning(
+                    f"⚠️ Coleção '{self.COLLECTION_NAME}' usa espaço '{self._collection_space}' "
+                    f"mas o perfil pede '{expected['hnsw:space']}'. Reindexe para aplicar."
+                )
+        return collection
+
+    @property
+    def cold_chroma_client(self):
+        """
+        Persistent client for offloaded (cold) gazette shards. Opened lazily: only queries
+        with an explicit date range reaching old periods touch it.
+        """
+        if not self._cold_chroma_client:
+            logger.info(f"Connecting to cold ChromaDB at {settings.CHROMADB_COLD_DIR}")
+            settings.CHROMADB_COLD_DIR.mkdir(parents=True, exist_ok=True)
+            self._cold_chroma_client = chromadb.PersistentClient(
+                path=str(settings.CHROMADB_COLD_DIR),
+                settings=ChromaSettings(anonymized_telemetry=False)
+            )
+        return self._cold_chroma_client
+
+    def _collection_by_name(self, name: Optional[str]):
+        """
+        Resolves a collection name (main collection or gazette shard, hot or cold).
+        """
+        if not name or name == self.COLLECTION_NAME:
+            return self.get_collection()
+
+        from src.core.settings_manager import settings_manager
+        from src.core.vector_index import collection_metadata
+        client = self.cold_chroma_client if name in self._cold_shards else self.chroma_client
+        return client.get_or_create_collection(
+            name,
+            metadata=collection_metadata(
+                settings_manager.vector_index_profile,
+                settings_manager.vector_index_overrides
+            )
+        )
+
+    async def _document_collection(self, doc_id: str):
+        """Collection holding the micro chunks of a document (shard-aware)."""
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+        try:
+            async with self._sqlite_connection.execute("SELECT vector_collection FROM documents WHERE id = ?", (doc_id,)) as cursor:
+                row = await cursor.fetchone()
+            return self._collection_by_name(row[0] if row else None)
+        except Exception:
+            return self.get_collection()
+
+    async def _collection_for_document(self, doc_type: str, metadata: dict):
+        """
+        Chooses where a document's micro chunks are written.
+        Gazettes with a publication date go to their period shard; everything else to the main collection.
+        Returns (collection, collection_name).
+        """
+        from src.core.settings_manager import settings_manager
+        from src.core.gazette_shards import parse_date, shard_for
+
+        granularity = settings_manager.gazette_partitioning
+        pub_date = parse_date(metadata.get("publication_date"))
+        if doc_type != "diario_oficial" or granularity == "off" or not pub_date:
+            return self.get_collection(), self.COLLECTION_NAME
+
+        name, period_start, period_end = shard_for(pub_date, granularity)
+        await self._register_shard(name, period_start, period_end)
+        return self._collection_by_name(name), name
+
+    async def _register_shard(self, name: str, period_start, period_end, location: str = None):
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+        await self._sqlite_connection.execute(
+            """
+            INSERT INTO vector_shards (name, period_start, period_end, location)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                location = COALESCE(?, vector_shards.location),
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (name, period_start.isoformat(), period_end.isoformat(), location or "hot", location)
+        )
+        await self._sqlite_connection.commit()
+        if location == "cold":
+            self._cold_shards.add(name)
+        elif location == "hot":
+            self._cold_shards.discard(name)
+
+    async def _set_document_collection(self, doc_id: str, collection_name: str):
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+        await self._sqlite_connection.execute(
+            "UPDATE documents SET vector_collection = ? WHERE id = ?", (collection_name, doc_id)
+        )
+        await self._sqlite_connection.commit()
+
+    async def list_vector_shards(self) -> List[Dict[str, Any]]:
+        """
+        Lists gazette shards with their period, storage tier and live chunk count.
+        """
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+        async with self._sqlite_connection.execute(
+            "SELECT name, period_start, period_end, location, updated_at FROM vector_shards ORDER BY period_start"
+        ) as cursor:
+            shards = [dict(row) for row in await cursor.fetchall()]
+        for shard in shards:
+            try:
+                shard["chunk_count"] = self._collection_by_name(shard["name"]).count()
+            except Exception:
+                shard["chunk_count"] = None
+        return shards
+
+    async def _shards_for_search(self, date_range=None) -> List[str]:
+        """
+        Date-range routing: picks the gazette shards a query must touch.
+        Without an explicit range every hot shard is searched (same recall as the keyword leg,
+        which has no date filter then). gazette_default_lookback_years > 0 trades old gazettes
+        for flat latency as the archive grows.
+        """
+        from datetime import date
+        from src.core.settings_manager import settings_manager
+        from src.core.gazette_shards import overlaps
+
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+        async with self._sqlite_connection.execute(
+            "SELECT name, period_start, period_end, location FROM vector_shards"
+        ) as cursor:
+            rows = await cursor.fetchall()
+
+        lookback = settings_manager.gazette_default_lookback_years
+        selected = []
+        for row in rows:
+            start = date.fromisoformat(row["period_start"])
+            end = date.fromisoformat(row["period_end"])
+            if date_range:
+                if overlaps(start, end, date_range):
+                    selected.append(row["name"])
+            elif row["location"] == "hot":
+                if lookback <= 0 or end.year >= date.today().year - lookback:
+                    selected.append(row["name"])
+        return selected
+
+    def _copy_collection(self, source, target, batch_size: int = 2000) -> int:
+        """Copies every record (ids, embeddings, documents, metadatas) between collections."""
+        copied = 0
+        offset = 0
+        while True:
+            batch = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            target.upsert(
+                ids=batch["ids"],
+                embeddings=[list(map(float, e)) for e in batch["embeddings"]],
+                documents=batch["documents"],
+                metadatas=batch["metadatas"]
+            )
+            copied += len(batch["ids"])
+            offset += batch_size
+        return copied
+
+    async def compact_gazette_shards(self, year: int) -> Dict[str, Any]:
+        """
+        Merges the quarterly shards of a closed year into a single yearly shard.
+        A fresh collection also rebuilds the HNSW graph (no tombstones from deletes).
+        """
+        from datetime import date
+        from src.core.gazette_shards import SHARD_PREFIX
+
+        quarter_names = [f"{SHARD_PREFIX}{year}q{q}" for q in range(1, 5)]
+        shards = [s for s in await self.list_vector_shards() if s["name"] in quarter_names]
+        if not shards:
+            return {"year": year, "merged": [], "chunks": 0}
+
+        target_name = f"{SHARD_PREFIX}{year}"
+        location = "cold" if all(s["location"] == "cold" for s in shards) else "hot"
+        await self._register_shard(target_name, date(year, 1, 1), date(year, 12, 31), location=location)
+        target = self._collection_by_name(target_name)
+
+        copied = 0
+        for shard in shards:
+            source = self._collection_by_name(shard["name"])
+            copied += self._copy_collection(source, target)
+            client = self.cold_chroma_client if shard["name"] in self._cold_shards else self.chroma_client
+            client.delete_collection(shard["name"])
+            self._cold_shards.discard(shard["name"])
+            await self._sqlite_connection.execute("DELETE FROM vector_shards WHERE name = ?", (shard["name"],))
+            await self._sqlite_connection.execute(
+                "UPDATE documents SET vector_collection = ? WHERE vector_collection = ?", (target_name, shard["name"])
+            )
+        await self._sqlite_connection.commit()
+
+        logger.info(f"🗜️ Shards {year} compactados em {target_name}: {copied} chunks.")
+        return {"year": year, "target": target_name, "merged": [s["name"] for s in shards], "chunks": copied}
+
+    async def offload_gazette_shard(self, name: str) -> Dict[str, Any]:
+        """
+        Moves a gazette shard to cold storage (separate persistent directory).
+        Offloaded shards are skipped by default searches and only opened for explicit date ranges.
+        """
+        shard = next((s for s in await self.list_vector_shards() if s["name"] == name), None)
+        if not shard:
+            raise ValueError(f"Shard '{name}' não encontrado.")
+        if shard["location"] == "cold":
+            return {"name": name, "chunks": 0, "location": "cold"}
+
+        from datetime import date
+        hot = self._collection_by_name(name)
+        self._cold_shards.add(name) # From now on the name resolves to the cold client
+        cold = self._collection_by_name(name)
+        copied = self._copy_collection(hot, cold)
+        self.chroma_client.delete_collection(name)
+        await self._register_shard(
+            name, date.fromisoformat(shard["period_start"]), date.fromisoformat(shard["period_end"]), location="cold"
+        )
+        logger.info(f"🧊 Shard {name} movido para armazenamento frio ({copied} chunks).")
+        return {"name": name, "chunks": copied, "location": "cold"}
+
+    async def migrate_legacy_gazettes(self) -> Dict[str, Any]:
+        """
+        Moves gazettes indexed in the main collection (before partitioning) into their period shards,
+        adding the publication_date/publication_ts metadata used by date-range filters.
+        Gazettes without a publication date stay in the main collection.
+        """
+        from src.core.settings_manager import settings_manager
+        from src.core.gazette_shards import parse_date, date_to_ts
+
+        if settings_manager.gazette_partitioning == "off":
+            return {"documents": 0, "chunks": 0}
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+        async with self._sqlite_connection.execute(
+            """
+            SELECT id, publication_date FROM documents
+            WHERE doc_type = 'diario_oficial' AND publication_date IS NOT NULL
+              AND (vector_collection IS NULL OR vector_collection = ?)
+            """,
+            (self.COLLECTION_NAME,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+
+        main = self.get_collection()
+        moved_docs = moved_chunks = 0
+        for row in rows:
+            pub_date = parse_date(row["publication_date"])
+            if not pub_date:
+                continue
+            date_meta = {"publication_date": pub_date.isoformat(), "publication_ts": date_to_ts(pub_date)}
+            batch = main.get(where={"original_doc_id": row["id"]}, include=["embeddings", "documents", "metadatas"])
+            if not batch["ids"]:
+                continue
+
+            target, name = await self._collection_for_document("diario_oficial", date_meta)
+            summary_ids, chunk_ids = [], []
+            embeddings, documents, metadatas = [], [], []
+            for chunk_id, emb, doc, meta in zip(batch["ids"], batch["embeddings"], batch["documents"], batch["metadatas"]):
+                if meta.get("parent_type") == "summary":
+                    summary_ids.append(chunk_id) # The summary chunk always stays in the main collection
+                    continue
+                chunk_ids.append(chunk_id)
+                embeddings.append(list(map(float, emb)))
+                documents.append(doc)
+                metadatas.append({**meta, **date_meta})
+
+            if chunk_ids:
+                target.upsert(ids=chunk_ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+                main.delete(ids=chunk_ids)
+            if summary_ids:
+                main.update(ids=summary_ids, metadatas=[date_meta] * len(summary_ids))
+            await self._set_document_collection(row["id"], name)
+            self.index_document_routing(row["id"], target) # Routing entries pick up publication_ts
+            moved_docs += 1
+            moved_chunks += len(chunk_ids)
+
+        logger.info(f"📦 Diários legados migrados para shards: {moved_docs} documentos, {moved_chunks} chunks.")
+        return {"documents": moved_docs, "chunks": moved_chunks}
+
+    def get_routing_collection(self):
+        """
+        Small document-level collection used as the first stage of two-stage retrieval.
+        One entry per parent (centroid of its micro chunks) plus the summary chunk.
+        """
+        from src.core.settings_manager import settings_manager
+        from src.core.vector_index import collection_metadata
+
+        return self.chroma_client.get_or_create_collection(
+            self.ROUTING_COLLECTION_NAME,
+            metadata=collection_metadata(
+                settings_manager.vector_index_profile,
+                settings_manager.vector_index_overrides
+            )
+        )
+
+    @property
+    def embedding_function(self):
+        """Same embedding function Chroma uses for the collections (default ONNX MiniLM)."""
+        if self._embedding_function is None:
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+            self._embedding_function = DefaultEmbeddingFunction()
+        return self._embedding_function
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a query once so it can be reused across several collection queries.
+        Served from the model cache (memory/SQLite) when the normalized query was seen before.
+        """
+        from src.core.settings_manager import settings_manager
+        if not settings_manager.model_cache_enabled:
+            return [float(x) for x in self.embedding_function([text])[0]]
+
+        from src.core.model_cache import model_cache, normalize_text
+        key = model_cache.make_key("qemb", "chroma-default", normalize_text(text))
+        cached = model_cache.get(key)
+        if cached is None:
+            # all-MiniLM-L6-v2 is uncased: embedding the normalized text loses nothing
+            cached = self.embedding_function([normalize_text(text)])[0]
+            model_cache.put(key, cached)
+        return [float(x) for x in cached]
+
+    @property
+    def collection_space(self) -> str:
+        """Distance space of the live collection (used to convert distances into similarity)."""
+        if self._collection_space is None:
+            self.get_collection()
+        return self._collection_space
+
     async def get_sqlite(self) -> aiosqlite.Connection:
         """
         Async SQLite connection factory.
@@ -125,11 +480,87 @@ class DatabaseManager:
         );
         """
         
+        query_shards = """
+        CREATE TABLE IF NOT EXISTS vector_shards (
+            name TEXT PRIMARY KEY, -- Chroma collection name (sentinela_gazettes_AAAA[qN])
+            period_start DATE NOT NULL,
+            period_end DATE NOT NULL,
+            location TEXT DEFAULT 'hot', -- 'hot' (main client) | 'cold' (offloaded)
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+        
+        query_citations = """
+        CREATE TABLE IF NOT EXISTS legal_citations (
+            law_id TEXT NOT NULL, -- 'cf', 'lei:12651', 'lc:140', 'decreto:6514'
+            article TEXT NOT NULL, -- '5', '4-A'
+            paragraph TEXT, -- NULL (caput), '1', 'unico'
+            inciso TEXT, -- NULL or roman numeral ('XI')
+            parent_id TEXT NOT NULL,
+            doc_id TEXT NOT NULL,
+            FOREIGN KEY(doc_id) REFERENCES documents(id) ON DELETE CASCADE
+        );
+        """
+        
+        query_state = """
+        CREATE TABLE IF NOT EXISTS system_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        """
+        
+        query_answer_cache = """
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            key TEXT PRIMARY KEY, -- sha256(formal_query normalizada | esfera | período | geração do corpus)
+            query_norm TEXT NOT NULL,
+            sphere TEXT,
+            date_range TEXT, -- período resolvido "início:fim" ('' = sem período)
+            generation INTEGER NOT NULL,
+            embedding BLOB, -- float32 (near-duplicate matching)
+            response TEXT NOT NULL,
+            citations_json TEXT,
+            hits INTEGER DEFAULT 0,
+            created_at REAL NOT NULL, -- epoch seconds
+            last_hit_at REAL
+        );
+        """
+        
+        query_sessions = """
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            id TEXT PRIMARY KEY, -- Opaque token (secrets.token_urlsafe)
+            user_hash TEXT NOT NULL,
+            summary TEXT DEFAULT '', -- Rolling summary of the compacted turns
+            scratchpad TEXT,
+            created_at REAL NOT NULL, -- epoch seconds
+            updated_at REAL NOT NULL
+        );
+        """
+        
+        query_session_messages = """
+        CREATE TABLE IF NOT EXISTS chat_session_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL, -- 'user' | 'assistant'
+            content TEXT NOT NULL,
+            tokens INTEGER DEFAULT 0,
+            created_at REAL NOT NULL,
+            FOREIGN KEY(session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
+        );
+        """
+        
         async with self._sqlite_connection.cursor() as cursor:
             await cursor.execute(query_audit)
             await cursor.execute(query_users)
             await cursor.execute(query_docs)
             await cursor.execute(query_parents)
+            await cursor.execute(query_shards)
+            await cursor.execute(query_citations)
+            await cursor.execute(query_state)
+            await cursor.execute(query_answer_cache)
+            await cursor.execute(query_sessions)
+            await cursor.execute(query_session_messages)
+            await cursor.execute("CREATE INDEX IF NOT EXISTS idx_session_messages ON chat_session_messages(session_id, id)")
+            await cursor.execute("CREATE INDEX IF NOT EXISTS idx_legal_citations_lookup ON legal_citations (law_id, article)")
             
             # FTS5 Virtual Table for Keyword Search
             query_fts = """
@@ -142,12 +573,15 @@ class DatabaseManager:
             );
             """
             await cursor.execute(query_fts)
+            # Vocabulary view over the FTS index (term -> nº de documentos), usado pelo intent engine local
+            await cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts_vocab USING fts5vocab(documents_fts, 'row')")
             
             # Schema Migrations (add columns to existing DBs)
             migrations = [
                 ("documents", "file_hash", "ALTER TABLE documents ADD COLUMN file_hash TEXT"),
                 ("documents", "extraction_quality", "ALTER TABLE documents ADD COLUMN extraction_quality TEXT DEFAULT 'unknown'"),
                 ("documents", "suggested_doc_type", "ALTER TABLE documents ADD COLUMN suggested_doc_type TEXT"),
+                ("answer_cache", "date_range", "ALTER TABLE answer_cache ADD COLUMN date_range TEXT"),
             ]
             for table, col, sql in migrations:
                 try:
@@ -189,6 +623,7 @@ class DatabaseManager:
                 ("ALTER TABLE documents ADD COLUMN description TEXT", "description"),
                 ("ALTER TABLE documents ADD COLUMN custom_tags TEXT", "custom_tags"),
                 ("ALTER TABLE documents ADD COLUMN initial_chunks_json TEXT", "initial_chunks_json"),
+                ("ALTER TABLE documents ADD COLUMN vector_collection TEXT", "vector_collection"),
                 
                 ("ALTER TABLE audit_logs ADD COLUMN query TEXT", "query"),
                 ("ALTER TABLE audit_logs ADD COLUMN response TEXT", "response"),
@@ -201,8 +636,38 @@ class DatabaseManager:
                 except Exception:
                     pass # Column exists or table newly created
             
+            # Cold shard cache (sync collection resolution needs it)
+            await cursor.execute("SELECT name FROM vector_shards WHERE location = 'cold'")
+            self._cold_shards = {row[0] for row in await cursor.fetchall()}
+            
             # ...
 
+    async def get_corpus_generation(self) -> int:
+        """
+        Monotonic version of the searchable corpus. Cached answers are keyed on it,
+        so activating or deleting a document invalidates them.
+        """
+        if self._corpus_generation is None:
+            if not self._sqlite_connection:
+                await self.get_sqlite()
+            async with self._sqlite_connection.execute(
+                "SELECT value FROM system_state WHERE key = 'corpus_generation'"
+            ) as cursor:
+                row = await cursor.fetchone()
+            self._corpus_generation = int(row[0]) if row else 0
+        return self._corpus_generation
+
+    async def bump_corpus_generation(self) -> int:
+        generation = await self.get_corpus_generation() + 1
+        await self._sqlite_connection.execute(
+            "INSERT INTO system_state (key, value) VALUES ('corpus_generation', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (str(generation),)
+        )
+        await self._sqlite_connection.commit()
+        self._corpus_generation = generation
+        return generation
+
     async def log_audit(self, action: str, user_hash: str, details: str = None, 
                         query_text: str = None, response_text: str = None, 
                         sources_json: str = None, confidence_score: float = 0.0):
@@ -312,7 +777,40 @@ class DatabaseManager:
         await self._sqlite_connection.commit()
         return doc_id
             
-    async def search_documents_keyword(self, query_text: str, limit: int = 5, sphere: str = None) -> list[dict]:
+    async def fts_term_stats(self, words: List[str]) -> Tuple[Dict[str, int], int]:
+        """
+        Document frequency of query words in the FTS vocabulary.
+        The index uses the porter tokenizer, so each word is matched by its longest indexed prefix (stem).
+        Returns ({word: doc_count}, total_documents); words absent from the corpus are omitted.
+        """
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+
+        candidates = {}
+        for word in words:
+            w = word.lower()
+            candidates[w] = [w] + [w[:i] for i in range(len(w) - 1, 3, -1)]
+        all_terms = sorted({t for prefixes in candidates.values() for t in prefixes})
+        if not all_terms:
+            return {}, 0
+
+        placeholders = ",".join("?" * len(all_terms))
+        async with self._sqlite_connection.execute(
+            f"SELECT term, doc FROM documents_fts_vocab WHERE term IN ({placeholders})", all_terms
+        ) as cursor:
+            vocab = {row[0]: row[1] for row in await cursor.fetchall()}
+        async with self._sqlite_connection.execute("SELECT COUNT(*) FROM documents_fts") as cursor:
+            total = (await cursor.fetchone())[0]
+
+        stats = {}
+        for word, prefixes in candidates.items():
+            for term in prefixes: # Longest first
+                if term in vocab:
+                    stats[word] = vocab[term]
+                    break
+        return stats, total
+
+    async def search_documents_keyword(self, query_text: str, limit: int = 5, sphere: str = None, date_range=None) -> list[dict]:
         """
         BM25-like search using SQLite FTS5.
         """
@@ -334,6 +832,10 @@ class DatabaseManager:
         if sphere:
             sql += " AND d.sphere = ?"
             params.append(sphere)
+        if date_range:
+            # Undated documents (laws, uploads) stay eligible; dated ones must fall inside the range
+            sql += " AND (d.publication_date IS NULL OR d.publication_date BETWEEN ? AND ?)"
+            params.extend([date_range[0].isoformat(), date_range[1].isoformat()])
             
         sql += " ORDER BY f.rank LIMIT ?"
         params.append(limit)
@@ -368,8 +870,6 @@ class DatabaseManager:
         """
         from src.utils.text_processing import text_splitter
         
-        collection = self.chroma_client.get_or_create_collection("sentinela_documents")
-            
         ids = []
         documents = []
         metadatas = []
@@ -378,6 +878,7 @@ class DatabaseManager:
         total_micros = 0
         
         doc_type = base_metadata.get("doc_type", "general")
+        collection, collection_name = await self._collection_for_document(doc_type, base_metadata)
         parent_type = "generic_macro"
         if doc_type == "tabela":
              parent_type = "table_page"
@@ -431,6 +932,7 @@ class DatabaseManager:
                     metadatas=metadatas
                 )
                 logger.info(f"Indexed {len(ids)} micro chunks (from {total_parents} parents) for {doc_id}")
+                await self._set_document_collection(doc_id, collection_name)
             except Exception as e:
                 logger.error(f"Failed to index structured micros: {e}")
 
@@ -490,7 +992,8 @@ class DatabaseManager:
             logger.warning("⚠️ Nenhum Macro-Chunk gerado. Tratando texto inteiro como único pai.")
             macro_chunks = [text]
 
-        collection = self.chroma_client.get_or_create_collection("sentinela_documents")
+        # Gazettes go to their period shard (time-partitioned index)
+        collection, collection_name = await self._collection_for_document(doc_type, metadata)
         
         total_parents = len(macro_chunks)
         total_micros_indexed = 0
@@ -546,7 +1049,9 @@ class DatabaseManager:
                 except Exception as e:
                     logger.error(f"Failed to index micros for parent {parent_id}: {e}")
 
-        logger.info(f"Indexing complete for {doc_id}. Parents: {total_parents}, Micros: {total_micros_indexed}.")
+        if total_micros_indexed:
+            await self._set_document_collection(doc_id, collection_name)
+        logger.info(f"Indexing complete for {doc_id}. Parents: {total_parents}, Micros: {total_micros_indexed} ({collection_name}).")
 
     async def inspect_document(self, doc_id: str) -> Dict[str, Any]:
         """
@@ -554,7 +1059,7 @@ class DatabaseManager:
         Useful for debugging text extraction quality.
         """
         try:
-            collection = self.chroma_client.get_collection("sentinela_documents")
+            collection = await self._document_collection(doc_id)
             # Fetch by ID prefix (since chunks are doc_id_0, doc_id_1...)
             # Chroma doesn't support prefix search on IDs easily, but we metadata filter is better.
             results = collection.get(
@@ -653,6 +1158,13 @@ class DatabaseManager:
                 "custom_tags": doc.get("custom_tags") or ""
             }
             
+            # Publication date as filterable metadata (gazette shards / date-range routing)
+            from src.core.gazette_shards import parse_date, date_to_ts
+            pub_date = parse_date(doc.get("publication_date"))
+            if pub_date:
+                base_meta["publication_date"] = pub_date.isoformat()
+                base_meta["publication_ts"] = date_to_ts(pub_date)
+            
             # Check for stored initial chunks (e.g. from LawScraper HTML)
             import json
             if doc.get("initial_chunks_json"):
@@ -688,7 +1200,7 @@ class DatabaseManager:
             
             if summary_text.strip():
                 try:
-                    collection = self.chroma_client.get_or_create_collection("sentinela_documents")
+                    collection = self.get_collection()
                     summary_id = f"{doc_id}_summary"
                     
                     summary_meta = base_meta.copy()
@@ -707,11 +1219,19 @@ class DatabaseManager:
                 except Exception as sc_e:
                     logger.error(f"Failed to index summary chunk: {sc_e}")
             
+            # 2.2 Document-level routing entries (two-stage retrieval)
+            self.index_document_routing(doc_id, await self._document_collection(doc_id))
+            
+            # 2.3 Structured citation index (Art./§/inciso -> parent) for direct lookups
+            await self.index_legal_citations(doc_id, doc)
+            
             # 3. Update status to 'active'
             async with self._sqlite_connection.execute("UPDATE documents SET status = 'active' WHERE id = ?", (doc_id,)) as cursor:
                 pass
             await self._sqlite_connection.commit()
             
+            await self.bump_corpus_generation()
+            
             logger.info(f"✅ Documento {doc_id} ATIVADO e indexado com sucesso.")
             return True
         except Exception as e:
@@ -724,7 +1244,7 @@ class DatabaseManager:
         Useful for expanding context without loading the full document.
         """
         try:
-            collection = self.chroma_client.get_collection("sentinela_documents")
+            collection = await self._document_collection(doc_id)
             
             # Range query in Chroma is tricky with where filter only supporting direct comparisons usually
             # But we can try multiple queries or a range filter if supported.
@@ -761,51 +1281,222 @@ class DatabaseManager:
             logger.error(f"Context window retrieval failed: {e}")
             return ""
 
-    async def search_documents(self, query: str, limit: int = 5, where: dict = None, sphere: str = None) -> list[dict]:
+    async def search_documents(self, query: str, limit: int = 5, where: dict = None, sphere: str = None,
+                               query_embedding: List[float] = None, date_range=None) -> list[dict]:
         """
         Semantic search for RAG context.
+        Searches the main collection plus the gazette shards selected by date-range routing
+        (see _shards_for_search) and merges the results by similarity.
         """
-        kwargs = {
-            "query_texts": [query],
-            "n_results": limit
-        }
+        from src.core.settings_manager import settings_manager
+        kwargs = {"n_results": limit}
+        if query_embedding is None and settings_manager.model_cache_enabled:
+            try:
+                # Cached: Chroma would re-embed query_texts every call. Thread: keeps the event loop (and deadlines) responsive
+                query_embedding = await asyncio.to_thread(self.embed_query, query)
+            except Exception as e:
+                logger.warning(f"Query embedding cache unavailable ({e}). Letting Chroma embed the query.")
+        if query_embedding is not None:
+            kwargs["query_embeddings"] = [query_embedding]
+        else:
+            kwargs["query_texts"] = [query]
         
         # Default filter: Active only
         status_filter = {"status": "active"}
         
-        if not where and not sphere:
-            kwargs["where"] = status_filter
-        else:
-            # Combine filters using $and
-            conditions = [status_filter]
-            if where:
-                conditions.append(where)
-            if sphere:
-                conditions.append({"sphere": sphere})
-            
-            kwargs["where"] = {"$and": conditions}
+        conditions = [status_filter]
+        if where:
+            conditions.append(where)
+        if sphere:
+            conditions.append({"sphere": sphere})
+        base_where = conditions[0] if len(conditions) == 1 else {"$and": conditions}
         
-        collection = self.chroma_client.get_or_create_collection("sentinela_documents")
-        results = collection.query(**kwargs)
+        from src.core.vector_index import distance_to_similarity
         
-        # Format results
-        # Chroma returns lists of lists (one per query)
-        if not results or not results["documents"]:
-            return []
-            
-        docs = results["documents"][0]
-        metas = results["metadatas"][0]
-        distances = results["distances"][0] if "distances" in results else [0]*len(docs)
+        main_where = base_where
+        shard_where = base_where
+        if date_range:
+            from src.core.gazette_shards import date_to_ts
+            in_range = {"$and": [
+                {"publication_ts": {"$gte": date_to_ts(date_range[0])}},
+                {"publication_ts": {"$lte": date_to_ts(date_range[1])}}
+            ]}
+            # Shard periods are coarse (year/quarter): refine with the exact publication date
+            shard_where = {"$and": conditions + [in_range]}
+            # Main collection: gazettes not migrated to shards (see migrate_legacy_gazettes) are filtered
+            # by date too; other document types keep matching (like the keyword leg's undated documents)
+            main_where = {"$and": conditions + [{"$or": [{"doc_type": {"$ne": "diario_oficial"}}, in_range]}]}
         
-        structured_results = []
-        for doc, meta, dist in zip(docs, metas, distances):
-            structured_results.append({
-                "content": doc,
-                "metadata": meta,
-                "score": 1 - dist # Approx similarity if using cosine distance
-            })
+        targets = [(self.get_collection(), main_where)]
+        for shard_name in await self._shards_for_search(date_range):
+            targets.append((self._collection_by_name(shard_name), shard_where))
+        
+        async def query_target(collection, collection_where) -> list[dict]:
+            try:
+                results = await asyncio.to_thread(collection.query, where=collection_where, **kwargs)
+            except Exception as e:
+                logger.warning(f"Vector search failed on {collection.name}: {e}")
+                return []
             
-        return structured_results
+            # Format results
+            # Chroma returns lists of lists (one per query)
+            if not results or not results["documents"]:
+                return []
+            
+            space = (collection.metadata or {}).get("hnsw:space", "l2")
+            docs = results["documents"][0]
+            metas = results["metadatas"][0]
+            distances = results["distances"][0] if "distances" in results else [0]*len(docs)
+            
+            return [
+                {"content": doc, "metadata": meta, "score": distance_to_similarity(dist, space)}
+                for doc, meta, dist in zip(docs, metas, distances)
+            ]
+        
+        # Shards are queried concurrently: latency follows the slowest shard, not the archive size
+        structured_results = [
+            r for batch in await asyncio.gather(*(query_target(c, w) for c, w in targets)) for r in batch
+        ]
+        structured_results.sort(key=lambda r: r["score"], reverse=True)
+        return structured_results[:limit]
+
+    def index_document_routing(self, doc_id: str, collection=None) -> int:
+        """
+        Builds the routing entries of a document from its already indexed micro chunks:
+        one normalized centroid per parent + the summary chunk (if any).
+        `collection` is the document's chunk collection when it lives in a gazette shard
+        (the summary chunk always stays in the main collection).
+        Returns the number of entries written.
+        """
+        import numpy as np
+        try:
+            sources = [self.get_collection()]
+            if collection is not None and collection.name != self.COLLECTION_NAME:
+                sources.append(collection)
+
+            rows = []
+            for source in sources:
+                results = source.get(
+                    where={"original_doc_id": doc_id},
+                    include=["embeddings", "metadatas", "documents"]
+                )
+                rows.extend(zip(results["ids"], results["embeddings"], results["metadatas"], results["documents"]))
+            if not rows:
+                return 0
+
+            groups: Dict[str, Dict[str, Any]] = {}
+            for chunk_id, emb, meta, text in rows:
+                if meta.get("parent_type") == "summary":
+                    key, entry_type = chunk_id, "summary"
+                else:
+                    key, entry_type = f"{meta.get('parent_id', chunk_id)}_centroid", "parent_centroid"
+                group = groups.setdefault(key, {"vectors": [], "meta": meta, "text": text or "", "entry_type": entry_type})
+                group["vectors"].append(emb)
+
+            ids, embeddings, metadatas, documents = [], [], [], []
+            for key, group in groups.items():
+                centroid = np.mean(np.asarray(group["vectors"], dtype=np.float32), axis=0)
+                norm = np.linalg.norm(centroid)
+                if norm > 0:
+                    centroid = centroid / norm
+
+                src_meta = group["meta"]
+                meta = {
+                    "original_doc_id": doc_id,
+                    "parent_id": src_meta.get("parent_id", ""),
+                    "entry_type": group["entry_type"],
+                    "status": src_meta.get("status", "active"),
+                    "sphere": src_meta.get("sphere", "unknown"),
+                    "doc_type": src_meta.get("doc_type", ""),
+                    "filename": src_meta.get("filename", ""),
+                    "publication_ts": src_meta.get("publication_ts", 0), # 0 = undated
+                }
+                ids.append(key)
+                embeddings.append(centroid.tolist())
+                metadatas.append(meta)
+                documents.append(group["text"][:300]) # Preview only (debug/inspection)
+
+            self.get_routing_collection().upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+            logger.info(f"🧭 Routing index: {len(ids)} entries for {doc_id} (from {len(rows)} micros).")
+            return len(ids)
+        except Exception as e:
+            logger.error(f"Failed to build routing entries for {doc_id}: {e}")
+            return 0
+
+    async def rebuild_routing_index(self) -> Dict[str, int]:
+        """
+        Backfills the routing collection for every active document (existing corpora).
+        """
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+
+        async with self._sqlite_connection.execute("SELECT id FROM documents WHERE status = 'active'") as cursor:
+            doc_ids = [row[0] for row in await cursor.fetchall()]
+
+        try:
+            self.chroma_client.delete_collection(self.ROUTING_COLLECTION_NAME)
+        except Exception:
+            pass # Collection did not exist yet
+
+        entries = 0
+        for doc_id in doc_ids:
+            entries += self.index_document_routing(doc_id, await self._document_collection(doc_id))
+        logger.info(f"🧭 Routing index rebuilt: {len(doc_ids)} documents, {entries} entries.")
+        return {"documents": len(doc_ids), "entries": entries}
+
+    async def search_documents_two_stage(self, query: str, limit: int = 5, where: dict = None,
+                                         sphere: str = None, top_docs: int = 8, date_range=None) -> list[dict]:
+        """
+        Two-level retrieval:
+        1. Search the document-level routing index (parent centroids + summaries).
+        2. Run chunk search restricted to the top-N documents.
+        Falls back to flat search when the routing index has no candidates (e.g. not backfilled).
+        """
+        query_embedding = await asyncio.to_thread(self.embed_query, query)
+
+        conditions = [{"status": "active"}]
+        if where:
+            conditions.append(where)
+        if sphere:
+            conditions.append({"sphere": sphere})
+        if date_range:
+            from src.core.gazette_shards import date_to_ts
+            conditions.append({"$or": [
+                {"publication_ts": 0},
+                {"$and": [
+                    {"publication_ts": {"$gte": date_to_ts(date_range[0])}},
+                    {"publication_ts": {"$lte": date_to_ts(date_range[1])}}
+                ]}
+            ]})
+        routing_where = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+        doc_ids: List[str] = []
+        try:
+            routing = self.get_routing_collection()
+            results = await asyncio.to_thread(
+                routing.query,
+                query_embeddings=[query_embedding],
+                n_results=top_docs * 3, # Several parents per document
+                where=routing_where,
+                include=["metadatas"]
+            )
+            for meta in (results["metadatas"][0] if results and results["metadatas"] else []):
+                doc_id = meta.get("original_doc_id")
+                if doc_id and doc_id not in doc_ids:
+                    doc_ids.append(doc_id)
+                if len(doc_ids) >= top_docs:
+                    break
+        except Exception as e:
+            logger.warning(f"Routing stage failed ({e}). Falling back to flat search.")
+
+        if not doc_ids:
+            return await self.search_documents(query, limit=limit, where=where, sphere=sphere,
+                                               query_embedding=query_embedding, date_range=date_range)
+
+        doc_filter = {"original_doc_id": {"$in": doc_ids}}
+        chunk_where = {"$and": [where, doc_filter]} if where else doc_filter
+        return await self.search_documents(query, limit=limit, where=chunk_where, sphere=sphere,
+                                           query_embedding=query_embedding, date_range=date_range)
 
     async def get_all_documents(self, limit: int = 50, offset: int = 0) -> list[dict]:
         """
@@ -841,9 +1532,28 @@ class DatabaseManager:
             # PersistentClient doesn't have a simple 'reset' method exposed easily on client?
             # client.reset() is only for in-memory or if ALLOW_RESET is set.
             # Safer to delete the collection and recreate.
-            self.chroma_client.delete_collection("sentinela_documents")
-            # Recreate empty
-            self.chroma_client.get_or_create_collection("sentinela_documents")
+            self.chroma_client.delete_collection(self.COLLECTION_NAME)
+            try:
+                self.chroma_client.delete_collection(self.ROUTING_COLLECTION_NAME)
+            except Exception:
+                pass # Routing index may not exist yet
+            
+            # Gazette shards (hot and cold) + registry
+            for shard in await self.list_vector_shards():
+                client = self.cold_chroma_client if shard["location"] == "cold" else self.chroma_client
+                try:
+                    client.delete_collection(shard["name"])
+                except Exception:
+                    pass
+            await self._sqlite_connection.execute("DELETE FROM vector_shards")
+            await self._sqlite_connection.execute("UPDATE documents SET vector_collection = NULL")
+            await self._sqlite_connection.commit()
+            self._cold_shards = set()
+            
+            # Recreate empty (with the current HNSW profile)
+            self._collection_space = None
+            self.get_collection()
+            await self.bump_corpus_generation()
             logger.warning("⚠️ Vector Store fully reset by admin request.")
             return True
         except Exception as e:
@@ -868,6 +1578,9 @@ class DatabaseManager:
                 await cursor.execute("DELETE FROM documents_fts")
                 await cursor.execute("DELETE FROM audit_logs") # Clean logs too
                 await cursor.execute("DELETE FROM users") # Clean users
+                await cursor.execute("DELETE FROM answer_cache")
+                await cursor.execute("DELETE FROM chat_session_messages")
+                await cursor.execute("DELETE FROM chat_sessions")
             
             await self._sqlite_connection.commit()
             
@@ -885,6 +1598,9 @@ class DatabaseManager:
             await self.get_sqlite()
             
         try:
+            # Resolve the chunk collection (gazette shard) before the SQLite row disappears
+            doc_collection = await self._document_collection(doc_id)
+            
             # 1. Delete from SQLite (Transactions)
             # 'doc_parents' has ON DELETE CASCADE in definition, so it should auto-delete.
             # 'documents_fts' needs manual deletion because it's a virtual table without FK constraints usually.
@@ -909,24 +1625,143 @@ class DatabaseManager:
                 
             # 2. Delete from ChromaDB
             # We now reliably save 'original_doc_id' in metadata.
-            collection = self.chroma_client.get_or_create_collection("sentinela_documents")
+            collection = self.get_collection()
             
             try:
                 # Try delete by metadata (Best Modern Method)
                 collection.delete(where={"original_doc_id": doc_id})
+                if doc_collection.name != collection.name:
+                    doc_collection.delete(where={"original_doc_id": doc_id})
+                self.get_routing_collection().delete(where={"original_doc_id": doc_id})
                 logger.info(f"Vectors for {doc_id} deleted from ChromaDB.")
             except Exception as e:
                 logger.error(f"Chroma metadata delete failed: {e}. Trying fallback.")
                 # Fallback: Delete potential IDs if metadata failed
                 potential_ids = [f"{doc_id}_micro_{i}" for i in range(5000)] # Adjusted naming convention
                 collection.delete(ids=potential_ids)
-                
+            
+            await self.bump_corpus_generation()
             return True
             
         except Exception as e:
             logger.error(f"Atomic Delete failed for {doc_id}: {e}")
             return False
 
+    async def index_legal_citations(self, doc_id: str, doc: Dict[str, Any] = None) -> int:
+        """
+        Maps (law, article, paragraph, inciso) -> parent chunk for a legal document.
+        Lets the chat answer explicit citations ('Art. 5º, XI da CF') without vector search.
+        """
+        from src.core.legal_citations import LEGAL_DOC_TYPES, law_id_for_document, extract_provisions
+
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+        doc = doc or await self.get_document_by_id(doc_id)
+        if not doc or doc.get("doc_type") not in LEGAL_DOC_TYPES:
+            return 0
+
+        law_id = law_id_for_document(doc.get("filename"), doc.get("ementa"), doc.get("doc_type"), doc.get("sphere"))
+        if not law_id:
+            logger.info(f"Citation index: could not identify the law for {doc_id} ({doc.get('filename')}).")
+            return 0
+
+        rows = []
+        async with self._sqlite_connection.execute(
+            "SELECT id, text_content FROM doc_parents WHERE doc_id = ? ORDER BY parent_index", (doc_id,)
+        ) as cursor:
+            for parent_id, text in await cursor.fetchall():
+                article, provisions = extract_provisions(text)
+                if not article:
+                    continue
+                for paragraph, inciso in provisions:
+                    rows.append((law_id, article, paragraph, inciso, parent_id, doc_id))
+
+        await self._sqlite_connection.execute("DELETE FROM legal_citations WHERE doc_id = ?", (doc_id,))
+        if rows:
+            await self._sqlite_connection.executemany(
+                "INSERT INTO legal_citations (law_id, article, paragraph, inciso, parent_id, doc_id) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        await self._sqlite_connection.commit()
+        logger.info(f"⚖️ Citation index: {len(rows)} dispositivos de {law_id} mapeados para {doc_id}.")
+        return len(rows)
+
+    async def rebuild_citation_index(self) -> Dict[str, int]:
+        """Rebuilds the citation index for every active legal document."""
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+        async with self._sqlite_connection.execute("SELECT id FROM documents WHERE status = 'active'") as cursor:
+            doc_ids = [row[0] for row in await cursor.fetchall()]
+
+        documents, provisions = 0, 0
+        for doc_id in doc_ids:
+            count = await self.index_legal_citations(doc_id)
+            if count:
+                documents += 1
+                provisions += count
+        return {"documents": documents, "provisions": provisions}
+
+    async def resolve_citations(self, citations: list, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Direct lookup of cited provisions. Returns context docs (parent text + document metadata)
+        in the same shape as the retrieval pipeline, most specific match first.
+        An inciso/paragraph that is not indexed falls back to the whole article.
+        """
+        if not self._sqlite_connection:
+            await self.get_sqlite()
+
+        results = []
+        seen_parents = set()
+        for citation in citations:
+            async with self._sqlite_connection.execute(
+                """
+                SELECT lc.parent_id, lc.paragraph, lc.inciso, p.text_content, p.parent_index,
+                       d.id, d.filename, d.source, d.publication_date, d.doc_type, d.sphere, d.url
+                FROM legal_citations lc
+                JOIN doc_parents p ON p.id = lc.parent_id
+                JOIN documents d ON d.id = lc.doc_id
+                WHERE lc.law_id = ? AND lc.article = ? AND d.status = 'active'
+                ORDER BY p.parent_index
+                """,
+                (citation.law_id, citation.article)
+            ) as cursor:
+                rows = [dict(row) for row in await cursor.fetchall()]
+            if not rows:
+                continue
+
+            def specificity(row):
+                if citation.inciso and row["inciso"] == citation.inciso and row["paragraph"] == citation.paragraph:
+                    return 3
+                if citation.inciso and row["inciso"] == citation.inciso and not citation.paragraph:
+                    return 3
+                if citation.paragraph and row["paragraph"] == citation.paragraph and not row["inciso"]:
+                    return 2
+                return 1 if not row["paragraph"] and not row["inciso"] else 0
+
+            best = max(specificity(r) for r in rows)
+            for row in rows:
+                if specificity(row) != best or row["parent_id"] in seen_parents:
+                    continue
+                seen_parents.add(row["parent_id"])
+                results.append({
+                    "content": row["text_content"],
+                    "metadata": {
+                        "original_doc_id": row["id"],
+                        "parent_id": row["parent_id"],
+                        "parent_index": row["parent_index"],
+                        "filename": row["filename"],
+                        "source": row["source"],
+                        "publication_date": row["publication_date"] or "Data não informada",
+                        "doc_type": row["doc_type"],
+                        "sphere": row["sphere"],
+                        "url": row["url"] or "",
+                        "citation": citation.label(),
+                        "retrieval_strategy": "citation_lookup"
+                    },
+                    "score": 1.0
+                })
+        return results[:limit]
+
     async def save_parent_chunk(self, doc_id: str, parent_index: int, text: str, parent_type: str) -> str:
         """
         Saves a Macro Chunk (Parent) to SQLite.
@@ -0,0 +1,34 @@
+import numpy as np
+from typing import List
+
+
+def mmr_select(relevance: np.ndarray, embeddings: np.ndarray, k: int, lambda_: float = 0.7) -> List[int]:
+    """
+    Maximal Marginal Relevance over reranked candidates.
+    score(i) = lambda * relevance(i) - (1 - lambda) * max_sim(i, selected)
+
+    relevance: (n,) reranker scores (0-1). embeddings: (n, dim) L2-normalized.
+    Returns the selected indices in pick order. lambda=1 is pure relevance.
+    """
+    n = len(relevance)
+    if n == 0:
+        return []
+    k = min(k, n)
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = embeddings @ embeddings.T # Cosine matrix, computed once
+
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of each candidate to anything already selected
+    max_sim = similarity[selected[0]].copy()
+    candidates = np.ones(n, dtype=bool)
+    candidates[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_ * relevance - (1 - lambda_) * max_sim
+        scores[~candidates] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        candidates[best] = False
+        max_sim = np.maximum(max_sim, similarity[best])
+    return selected
@@ -0,0 +1,63 @@
+import logging
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SentenceEmbedder:
+    """
+    Shared multilingual sentence embedder (semantic chunking, context compression).
+    Loaded once per process instead of once per call.
+    """
+
+    _model_name = "paraphrase-multilingual-MiniLM-L12-v2"
+    _model = None
+    _failed_at = 0.0
+    _retry_after = 600 # Seconds before retrying a failed load (offline hosts)
+
+    @classmethod
+    def get_model(cls):
+        """
+        Lazy loader for the model.
+        A failed load is remembered for a while so callers fail fast instead of retrying per request.
+        """
+        import time
+        if cls._model is None and cls._failed_at and time.monotonic() - cls._failed_at < cls._retry_after:
+            raise RuntimeError(f"Sentence embedder unavailable (load failed {int(time.monotonic() - cls._failed_at)}s ago).")
+        if cls._model is None:
+            from sentence_transformers import SentenceTransformer
+            import torch
+
+            device = "cpu"
+            if torch.cuda.is_available():
+                device = "cuda"
+            elif torch.backends.mps.is_available():
+                device = "mps"
+
+            logger.info(f"⏳ Loading sentence embedder: {cls._model_name}...")
+            try:
+                cls._model = SentenceTransformer(cls._model_name, device=device)
+            except Exception:
+                cls._failed_at = time.monotonic()
+                raise
+            logger.info("✅ Sentence embedder loaded.")
+        return cls._model
+
+    @classmethod
+    def encode(cls, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Returns L2-normalized embeddings (n, dim): cosine similarity is a plain dot product.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = cls.get_model().encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+embedder = SentenceEmbedder()
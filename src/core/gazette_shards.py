@@ -0,0 +1,78 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple, Any
+
+# Diários Oficiais são particionados em coleções por período (ano ou trimestre).
+# Ex: sentinela_gazettes_2024 | sentinela_gazettes_2024q3
+SHARD_PREFIX = "sentinela_gazettes_"
+GRANULARITIES = {"year", "quarter"}
+
+
+def parse_date(value: Any) -> Optional[date]:
+    """
+    Parses ISO dates coming from the API, Querido Diário or the intent engine.
+    Accepts 'AAAA-MM-DD', 'AAAA-MM-DDTHH:MM:SS', 'AAAA-MM', 'AAAA' and date objects.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    text = str(value).strip()
+    if not text or text.lower() in {"null", "none", "unknown"}:
+        return None
+
+    m = re.match(r"^(\d{4})(?:-(\d{1,2}))?(?:-(\d{1,2}))?", text)
+    if not m:
+        return None
+    try:
+        return date(int(m.group(1)), int(m.group(2) or 1), int(m.group(3) or 1))
+    except ValueError:
+        return None
+
+
+def date_to_ts(d: date) -> int:
+    """Integer form (AAAAMMDD) used as Chroma metadata for $gte/$lte range filters."""
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def shard_for(d: date, granularity: str = "year") -> Tuple[str, date, date]:
+    """
+    Returns (collection_name, period_start, period_end) of the shard holding a publication date.
+    """
+    if granularity == "quarter":
+        quarter = (d.month - 1) // 3 + 1
+        start = date(d.year, 3 * (quarter - 1) + 1, 1)
+        next_start = date(d.year + 1, 1, 1) if quarter == 4 else date(d.year, 3 * quarter + 1, 1)
+        return f"{SHARD_PREFIX}{d.year}q{quarter}", start, next_start - timedelta(days=1)
+    return f"{SHARD_PREFIX}{d.year}", date(d.year, 1, 1), date(d.year, 12, 31)
+
+
+def normalize_date_range(start: Any = None, end: Any = None) -> Optional[Tuple[date, date]]:
+    """
+    Builds a closed [start, end] range from optional bounds.
+    A bare year as end ('2023') is expanded to the end of that year.
+    Returns None when no bound is usable.
+    """
+    start_d = parse_date(start)
+    end_d = parse_date(end)
+    if not start_d and not end_d:
+        return None
+
+    if end_d and re.match(r"^\d{4}$", str(end).strip()):
+        end_d = date(end_d.year, 12, 31)
+    elif end_d and re.match(r"^\d{4}-\d{1,2}$", str(end).strip()):
+        next_month = date(end_d.year + (end_d.month // 12), end_d.month % 12 + 1, 1)
+        end_d = next_month - timedelta(days=1)
+
+    start_d = start_d or date(1900, 1, 1)
+    end_d = end_d or date.today()
+    if start_d > end_d:
+        start_d, end_d = end_d, start_d
+    return start_d, end_d
+
+
+def overlaps(period_start: date, period_end: date, date_range: Tuple[date, date]) -> bool:
+    return period_start <= date_range[1] and period_end >= date_range[0]
@@ -0,0 +1,151 @@
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# Conditional import: sem Pillow as imagens seguem sem pré-processamento
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PROFILES = ("photo", "document")
+
+
+class ImagePipeline:
+    """
+    Prepares images for the vision model off the event loop (asyncio.to_thread).
+    Applies EXIF orientation and downscales to the model's native input size (JPEG decoded
+    at reduced scale via draft(), so a 12 MP photo never lands in memory at full size).
+    The "document" profile adds grayscale + autocontrast and splits very tall scans into
+    horizontal strips. Encoded payloads are cached by content hash (LRU bounded in bytes).
+    """
+
+    def __init__(self):
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _config() -> Tuple[int, int, bool, int]:
+        from src.core.settings_manager import settings_manager
+        return (
+            settings_manager.vision_max_side,
+            settings_manager.vision_max_tiles,
+            settings_manager.vision_document_enhance,
+            settings_manager.image_cache_mb * 1024 * 1024,
+        )
+
+    async def prepare(self, images: List[str], profile: str = "photo") -> List[str]:
+        """File paths or base64 (optionally data: URLs) -> base64 payloads for Ollama."""
+        if profile not in IMAGE_PROFILES:
+            raise ValueError(f"Unknown image profile: {profile}")
+        prepared: List[str] = []
+        for source in images:
+            prepared.extend(await asyncio.to_thread(self._prepare_one, source, profile))
+        return prepared
+
+    # --- Leitura ---
+    @staticmethod
+    def _read(source: str) -> Optional[bytes]:
+        if source.startswith("data:"):
+            source = source.split(",", 1)[-1] # Ollama espera base64 puro, sem o prefixo data:
+        else:
+            try:
+                with open(source, "rb") as f:
+                    return f.read()
+            except OSError:
+                pass # Não é caminho: tratamos como base64
+        try:
+            return base64.b64decode(source, validate=True)
+        except ValueError:
+            return None
+
+    def _prepare_one(self, source: str, profile: str) -> List[str]:
+        raw = self._read(source)
+        if raw is None:
+            return [source] # Formato desconhecido: repassa como veio (comportamento anterior)
+
+        max_side, max_tiles, enhance, cache_bytes = self._config()
+        key = hashlib.sha256(raw).hexdigest() + f":{profile}:{max_side}:{max_tiles}:{int(enhance)}"
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return list(self._cache[key])
+            self.stats["misses"] += 1
+
+        if Image is None:
+            encoded = [base64.b64encode(raw).decode("utf-8")]
+        else:
+            try:
+                encoded = self._transform(raw, profile, max_side, max_tiles, enhance)
+            except Exception as e:
+                logger.warning(f"⚠️ Pré-processamento de imagem falhou ({e}). Enviando original.")
+                encoded = [base64.b64encode(raw).decode("utf-8")]
+
+        self._remember(key, encoded, cache_bytes)
+        return encoded
+
+    def _remember(self, key: str, encoded: List[str], cache_bytes: int):
+        size = sum(len(e) for e in encoded)
+        if size > cache_bytes:
+            return
+        with self._lock:
+            self._cache[key] = encoded
+            self._cache_bytes += size
+            while self._cache_bytes > cache_bytes and self._cache:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= sum(len(e) for e in evicted)
+
+    # --- Transformação ---
+    @staticmethod
+    def tile_count(size: Tuple[int, int], max_tiles: int) -> int:
+        """Strips for a tall scan (a single downscale would make its text illegible)."""
+        width, height = size
+        if height <= width * 1.5 or max_tiles <= 1:
+            return 1
+        # Cada faixa é ~ quadrada (largura x largura); mais faixas que isso não ganham resolução
+        return max(1, min(max_tiles, round(height / width)))
+
+    def _transform(self, raw: bytes, profile: str, max_side: int, max_tiles: int, enhance: bool) -> List[str]:
+        image = Image.open(io.BytesIO(raw))
+        upright = image.size[::-1] if image.getexif().get(0x0112) in (5, 6, 7, 8) else image.size # Girada pelo EXIF
+        tiles = self.tile_count(upright, max_tiles) if profile == "document" else 1
+
+        # JPEG: decodifica já reduzido (1/2, 1/4, 1/8) em vez de carregar a resolução cheia
+        scale = max(image.size) / (max_side * tiles)
+        if scale > 1:
+            image.draft("RGB", (int(image.size[0] / scale), int(image.size[1] / scale)))
+
+        image = ImageOps.exif_transpose(image)
+        if profile == "document" and enhance:
+            image = ImageOps.autocontrast(image.convert("L"), cutoff=1)
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        parts = []
+        width, height = image.size
+        for i in range(tiles):
+            part = image.crop((0, height * i // tiles, width, height * (i + 1) // tiles)) if tiles > 1 else image
+            part = part.copy()
+            part.thumbnail((max_side, max_side), Image.LANCZOS)
+            buffer = io.BytesIO()
+            part.save(buffer, format="JPEG", quality=85, optimize=True)
+            parts.append(base64.b64encode(buffer.getvalue()).decode("utf-8"))
+        return parts
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+image_pipeline = ImagePipeline()
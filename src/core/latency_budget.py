@@ -0,0 +1,48 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Orçamento padrão por estágio da recuperação (ms). 0 = sem limite.
+DEFAULT_STAGE_BUDGETS_MS = {
+    "vector": 1500,
+    "keyword": 800,
+    "rerank": 2000,
+    "expansion": 800,
+}
+
+
+class LatencyBudget:
+    """
+    Per-request deadlines for the retrieval stages.
+    A stage that exceeds its budget is abandoned and replaced by its fallback (e.g. fused order
+    instead of cross-encoder order), so time-to-first-token stays bounded. Degradations are
+    recorded for the reasoning payload and the audit log.
+    Blocking work must run in a thread (asyncio.to_thread) for the deadline to be enforceable.
+    """
+
+    def __init__(self, budgets_ms: Optional[Dict[str, float]] = None):
+        self.budgets_ms = dict(DEFAULT_STAGE_BUDGETS_MS)
+        self.budgets_ms.update(budgets_ms or {})
+        self.timings_ms: Dict[str, float] = {}
+        self.degraded: List[Dict[str, Any]] = []
+
+    async def run(self, stage: str, awaitable: Awaitable, fallback: Callable[[], Any], fallback_name: str) -> Any:
+        budget_ms = float(self.budgets_ms.get(stage) or 0)
+        started = time.perf_counter()
+        try:
+            if budget_ms > 0:
+                result = await asyncio.wait_for(awaitable, budget_ms / 1000)
+            else:
+                result = await awaitable
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ Estágio '{stage}' excedeu {budget_ms:.0f}ms: degradando para '{fallback_name}'.")
+            self.degraded.append({"stage": stage, "budget_ms": budget_ms, "fallback": fallback_name})
+            result = fallback()
+        self.timings_ms[stage] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def report(self) -> Dict[str, Any]:
+        return {"stage_ms": self.timings_ms, "degraded": self.degraded}
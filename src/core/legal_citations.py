@@ -0,0 +1,233 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# Identificadores canônicos de normas: "cf", "ce", "lom", "lei:12651", "lc:140", "decreto:6514", "dl:3365"
+# Apelidos populares usados pelos cidadãos (Tinguá / temas ambientais e de transparência)
+LAW_ALIASES = {
+    "codigo florestal": "lei:12651",
+    "estatuto da cidade": "lei:10257",
+    "lei de acesso a informacao": "lei:12527",
+    "lai": "lei:12527",
+    "lgpd": "lei:13709",
+    "eca": "lei:8069",
+    "estatuto da crianca e do adolescente": "lei:8069",
+    "lei de crimes ambientais": "lei:9605",
+    "snuc": "lei:9985",
+    "lei de licitacoes": "lei:14133",
+    "lei de responsabilidade fiscal": "lc:101",
+    "lrf": "lc:101",
+}
+
+LEGAL_DOC_TYPES = {
+    "lei", "legislacao", "legislation", "lei_ordinaria", "lei_complementar",
+    "constituicao", "decreto", "medida_provisoria"
+}
+
+_NUMBER = r"(?:n[º°o\.]*\s*)?(\d{1,3}(?:\.\d{3})+|\d+)"
+_LAW_PATTERNS = [
+    (re.compile(r"\bconstituicao\s+(?:do\s+)?estad", re.I), "ce"),
+    (re.compile(r"\blei\s+organica", re.I), "lom"),
+    (re.compile(r"\b(?:constituicao(?:\s+federal|\s+da\s+republica)?|crfb|cf)\b(?:\s*/?\s*(?:19)?88)?", re.I), "cf"),
+    (re.compile(r"\b(?:lei\s+complementar|lcp?)\s*(?:federal\s+|estadual\s+|municipal\s+)?" + _NUMBER, re.I), "lc"),
+    (re.compile(r"\bdecreto[\s-]+lei\s*" + _NUMBER, re.I), "dl"),
+    (re.compile(r"\bdecreto\s*(?:federal\s+|estadual\s+|municipal\s+)?" + _NUMBER, re.I), "decreto"),
+    (re.compile(r"\blei\s*(?:federal\s+|estadual\s+|municipal\s+|ordinaria\s+)?" + _NUMBER, re.I), "lei"),
+]
+# Nomes de arquivo do Planalto: l12651.htm, lcp140.htm, d6514.htm, del3365.htm
+_PLANALTO_FILE = re.compile(r"^(lcp|del|l|d)(\d+)", re.I)
+_PLANALTO_KIND = {"l": "lei", "lcp": "lc", "d": "decreto", "del": "dl"}
+
+_ARTICLE = re.compile(r"\bart(?:igo)?s?\.?\s*(\d+)\s*[º°o]?(?:-([A-Z])\b)?", re.I)
+_PLURAL_ARTICLE = re.compile(r"art(?:igo)?s", re.I)
+# Demais itens de uma lista de artigos: "arts. 5º, 6º e 7º"
+_ARTICLE_LIST_ITEM = re.compile(r"\s*(?:,\s*(?:e\s+|ou\s+)?|e\s+|ou\s+)(\d+)\s*[º°o]?(?:-([A-Z])\b)?", re.I)
+# "cf." minúsculo seguido de outra norma é o "conforme" ("art. 37 cf. a Lei 8.666"), não a Constituição
+_CONFORME = re.compile(r"\.\s*(?:(?:a|o|as|os|ao|aos|na|no|nas|nos)\s+)?")
+_PARAGRAPH = re.compile(r"§\s*(\d+)|par[áa]grafo\s+([úu]nico|\d+)", re.I)
+_INCISO = re.compile(r"\binc(?:iso|\.)?\s+([IVXLCDM]+)\b", re.I)
+
+# Marcadores dentro do texto de um artigo
+_TEXT_PARAGRAPH = re.compile(r"§\s*(\d+)|par[áa]grafo\s+[úu]nico", re.I)
+_TEXT_INCISO = re.compile(r"(?:^|[\s;:.])([IVXLCDM]+)\s*[-–—]\s", re.M)
+
+
+@dataclass(frozen=True)
+class Citation:
+    law_id: str
+    article: str
+    paragraph: Optional[str] = None # "1", "2"... ou "unico"
+    inciso: Optional[str] = None # Romano em maiúsculas: "XI"
+
+    def label(self) -> str:
+        parts = [f"Art. {self.article}"]
+        if self.paragraph:
+            parts.append("Parágrafo único" if self.paragraph == "unico" else f"§ {self.paragraph}")
+        if self.inciso:
+            parts.append(f"inciso {self.inciso}")
+        return f"{', '.join(parts)} ({self.law_id})"
+
+
+def _fold(text: str) -> str:
+    """Lowercase-insensitive matching without accents (Constituição -> constituicao)."""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).replace("_", " ")
+
+
+def _law_mentions(folded: str) -> List[Tuple[int, int, str]]:
+    """
+    Every law mentioned in an accent-folded text as (start, end, law_id), in text order.
+    Overlapping matches keep the most specific pattern ('decreto-lei 3365' is not also 'lei 3365').
+    """
+    found: List[Tuple[int, int, str]] = []
+
+    def add(start: int, end: int, law_id: str):
+        if all(end <= s or start >= e for s, e, _ in found):
+            found.append((start, end, law_id))
+
+    for pattern, kind in _LAW_PATTERNS:
+        for m in pattern.finditer(folded):
+            add(m.start(), m.end(), f"{kind}:{m.group(1).replace('.', '')}" if m.groups() else kind)
+
+    lowered = folded.lower()
+    for alias, law_id in LAW_ALIASES.items():
+        for m in re.finditer(rf"\b{re.escape(alias)}\b", lowered):
+            add(m.start(), m.end(), law_id)
+
+    mention_starts = {s for s, _, _ in found}
+
+    def is_conforme(start: int, end: int) -> bool:
+        if folded[start:end] != "cf":
+            return False
+        m = _CONFORME.match(folded, end)
+        return bool(m) and m.end() in mention_starts
+
+    return sorted((s, e, law_id) for s, e, law_id in found if not is_conforme(s, e))
+
+
+def normalize_law_id(text: str) -> Optional[str]:
+    """
+    Extracts the canonical identifier of the first law mentioned in a text.
+    'Lei nº 12.651/2012' -> 'lei:12651' | 'CF/88' -> 'cf' | 'Código Florestal' -> 'lei:12651'
+    """
+    if not text:
+        return None
+    mentions = _law_mentions(_fold(text))
+    return mentions[0][2] if mentions else None
+
+
+def law_id_for_document(filename: str, ementa: str = "", doc_type: str = "", sphere: str = "") -> Optional[str]:
+    """
+    Infers which law an indexed document holds (filename, ementa and admin classification).
+    """
+    if doc_type == "constituicao":
+        return {"estadual": "ce", "municipal": "lom"}.get(sphere, "cf")
+
+    m = _PLANALTO_FILE.match((filename or "").strip())
+    if m:
+        return f"{_PLANALTO_KIND[m.group(1).lower()]}:{m.group(2)}"
+
+    return normalize_law_id(f"{filename or ''} {ementa or ''}")
+
+
+def _bind_law(mentions: List[Tuple[int, int, str]], start: int, end: int, next_start: int) -> Optional[str]:
+    """
+    Law of the article at [start, end): the mention right after it (before the next article)
+    wins; otherwise the nearest one before or after, if they agree. Ambiguous -> None.
+    """
+    own = [law for s, _, law in mentions if end <= s < next_start]
+    if own:
+        return own[0] # "art. 4 da Lei 12.651"
+    before = [law for s, e, law in mentions if e <= start]
+    after = [law for s, _, law in mentions if s >= end]
+    preceding = before[-1] if before else None
+    following = after[0] if after else None
+    if preceding and following and preceding != following:
+        return None # "Lei 12.651 ... art. 4 e art. 5 da CF": não dá para saber a qual norma o art. 4 pertence
+    return preceding or following
+
+
+def parse_citations(query: str) -> List[Citation]:
+    """
+    Finds explicit provision citations in a question.
+    'Art. 5º, inciso XI da Constituição' -> [Citation('cf', '5', None, 'XI')]
+    Each article is bound to its own law ('art. 4 da Lei 12.651 e art. 5 da CF' -> two laws);
+    lists are expanded ('arts. 5º e 6º da CF' -> Art. 5 and Art. 6).
+    Citations without an identifiable (or with an ambiguous) law are ignored: every law has an Art. 5.
+    """
+    if not query:
+        return []
+    folded = _fold(query)
+    mentions = _law_mentions(folded)
+    if not mentions:
+        return []
+
+    matches = list(_ARTICLE.finditer(folded))
+    citations = []
+    for i, m in enumerate(matches):
+        next_start = matches[i + 1].start() if i + 1 < len(matches) else len(folded)
+        articles = [m.group(1) + (f"-{m.group(2).upper()}" if m.group(2) else "")]
+        end = m.end()
+        if _PLURAL_ARTICLE.match(m.group(0)):
+            # "arts. 5º e 6º": one citation per article, all bound to the law after the list
+            item = _ARTICLE_LIST_ITEM.match(folded, end)
+            while item and item.end() <= next_start:
+                articles.append(item.group(1) + (f"-{item.group(2).upper()}" if item.group(2) else ""))
+                end = item.end()
+                item = _ARTICLE_LIST_ITEM.match(folded, end)
+        law_id = _bind_law(mentions, m.start(), end, next_start)
+        if not law_id:
+            continue
+
+        paragraph = inciso = None
+        if len(articles) == 1:
+            # Qualifiers after the article (up to the next one); the first article also looks behind
+            # ("inciso XI do art. 5º"). A list of articles has no single owner for them.
+            start = 0 if i == 0 else m.end()
+            segment = folded[start:next_start].replace(m.group(0), " ", 1)
+
+            p = _PARAGRAPH.search(segment)
+            if p:
+                paragraph = p.group(1) or p.group(2)
+                paragraph = "unico" if paragraph.lower() == "unico" else paragraph
+
+            inc = _INCISO.search(segment)
+            if inc:
+                inciso = inc.group(1).upper()
+
+        for article in articles:
+            citation = Citation(law_id, article, paragraph, inciso)
+            if citation not in citations:
+                citations.append(citation)
+    return citations
+
+
+def extract_provisions(text: str) -> Tuple[Optional[str], List[Tuple[Optional[str], Optional[str]]]]:
+    """
+    Reads an article chunk (parent) and lists the provisions it contains.
+    Returns (article, [(paragraph, inciso), ...]) where (None, None) is the article itself.
+    Incisos found after a paragraph marker belong to that paragraph.
+    """
+    m = _ARTICLE.search(text[:300] if text else "")
+    if not m:
+        return None, []
+    article = m.group(1) + (f"-{m.group(2).upper()}" if m.group(2) else "")
+    body = text[m.end():]
+
+    provisions = [(None, None)]
+    markers = sorted(
+        [(p.start(), "paragraph", p) for p in _TEXT_PARAGRAPH.finditer(body)] +
+        [(i.start(1), "inciso", i) for i in _TEXT_INCISO.finditer(body)],
+        key=lambda x: x[0]
+    )
+    current_paragraph = None
+    for _, kind, match in markers:
+        if kind == "paragraph":
+            current_paragraph = match.group(1) or "unico"
+            entry = (current_paragraph, None)
+        else:
+            entry = (current_paragraph, match.group(1).upper())
+        if entry not in provisions:
+            provisions.append(entry)
+    return article, provisions
@@ -1,27 +1,70 @@
 import httpx
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Union
 from datetime import datetime
 import json
-import base64
 from src.config import settings
 from src.core.settings_manager import settings_manager
+from src.core.ollama_pool import BackendPool, NoBackendAvailable
+from src.core.llm_metrics import extract_stats, llm_metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
+TimeoutType = Union[float, httpx.Timeout, None]
+
 class GemmaClient:
     """
     Unified client for Gemma (Text + Vision) via Ollama.
+    Calls are balanced across the configured Ollama nodes (OLLAMA_URLS), each with one pooled
+    httpx.AsyncClient (keep-alive, bounded connections) opened in the app startup and closed
+    on shutdown. Non-stream calls are retried on another node when one fails.
     """
     
     def __init__(self):
-        self.base_url = settings.OLLAMA_URL
+        self.urls = settings.ollama_urls()
+        self.base_url = self.urls[0]
         # Dynamic model binding
         self.timeout = settings.LLM_TIMEOUT
+        self.backends = BackendPool(self.urls, lambda url: self._build_client(url))
         
     @property
     def model(self):
         return settings_manager.llm_model
+
+    def _build_client(self, base_url: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(self.timeout, connect=settings.LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE,
+                keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY
+            )
+        )
+
+    async def start(self):
+        """Opens the connection pools and runs a first health probe (app startup)."""
+        await self.backends.probe_all()
+        healthy = sum(1 for b in self.backends.backends if b.state == "closed")
+        logger.info(f"🔌 Ollama: {healthy}/{len(self.urls)} backends saudáveis ({settings.OLLAMA_MAX_CONNECTIONS} conexões cada).")
+
+    async def close(self):
+        """Closes every backend connection pool (app shutdown)."""
+        await self.backends.close()
+        logger.info("🔌 Ollama pools fechados.")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled client of the primary backend (single-node setups, admin probes)."""
+        return self.backends.backends[0].client
+
+    def _timeout(self, timeout: TimeoutType):
+        """Per-call override: seconds (read timeout) or a full httpx.Timeout."""
+        if timeout is None:
+            return httpx.USE_CLIENT_DEFAULT
+        if isinstance(timeout, httpx.Timeout):
+            return timeout
+        return httpx.Timeout(timeout, connect=settings.LLM_CONNECT_TIMEOUT)
         
 
     # generate_stream handles streaming responses
@@ -32,65 +75,153 @@ class GemmaClient:
         system_prompt: Optional[str] = None,
         temperature: float = 0.3,
         top_k: int = 40,
-        num_ctx: int = 8192
+        num_ctx: Optional[int] = None,
+        model: Optional[str] = None,
+        timeout: TimeoutType = None,
+        priority: str = "interactive",
+        slot=None,
+        history: Optional[List[Dict[str, str]]] = None,
+        json_mode: bool = False,
+        image_profile: str = "photo"
     ):
         """
         Generates completion from Ollama as a stream of tokens.
+        `slot` is an admission already granted by llm_scheduler (callers that must be admitted
+        before emitting their own events); otherwise one is acquired in the `priority` lane.
+        `history` holds earlier turns as chat messages, sent between the system prompt and `prompt`.
         """
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
+        # Turnos anteriores como mensagens de chat (prefixo estável entre turnos -> reuso do KV cache)
+        messages.extend(history or [])
         
         user_msg = {"role": "user", "content": prompt}
         
         if images:
-            processed_images = []
-            for img in images:
-                if not img.startswith("data:"): 
-                    try:
-                        with open(img, "rb") as f:
-                            encoded = base64.b64encode(f.read()).decode("utf-8")
-                            processed_images.append(encoded)
-                    except Exception:
-                        processed_images.append(img)
-                else:
-                    processed_images.append(img)
-            user_msg["images"] = processed_images
+            # Downscale/EXIF/cache fora do event loop (src/core/image_pipeline.py)
+            from src.core.image_pipeline import image_pipeline
+            user_msg["images"] = await image_pipeline.prepare(images, profile=image_profile)
             
         messages.append(user_msg)
         
         payload = {
-            "model": self.model,
+            "model": model or self.model,
             "messages": messages,
             "stream": True,
             "options": {
                 "temperature": temperature,
                 "top_k": top_k,
-                "num_ctx": num_ctx
+                "num_ctx": num_ctx or settings_manager.num_ctx # Valor único: trocá-lo recarrega o runner do Ollama
             }
         }
+        if settings_manager.llm_keep_alive:
+            payload["keep_alive"] = settings_manager.llm_keep_alive # Modelo (e KV cache) fixo na memória
+        if json_mode:
+            payload["format"] = "json"
+
+        from src.core.llm_scheduler import llm_scheduler
+        if slot is None:
+            slot = await llm_scheduler.acquire(priority)
+        async with slot:
+            async for chunk in self._stream_with_failover(payload, timeout):
+                yield chunk
+
+    async def generate_json_fields(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        is_complete: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+        temperature: float = 0.1,
+        num_ctx: Optional[int] = None,
+        model: Optional[str] = None,
+        priority: str = "intent"
+    ) -> Dict[str, Any]:
+        """
+        JSON-mode generation parsed while it streams.
+        `on_field(key, value)` fires as each top-level field closes; once `is_complete(fields)`
+        holds the stream is closed, which makes Ollama stop generating the remaining fields.
+        Raises ValueError if no field could be parsed.
+        """
+        from contextlib import aclosing
+        from src.utils.incremental_json import IncrementalJSONObject
+        
+        parser = IncrementalJSONObject()
+        stopped_early = False
+        stream = self.generate_stream(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            num_ctx=num_ctx,
+            model=model,
+            priority=priority,
+            json_mode=True
+        )
+        async with aclosing(stream):
+            async for chunk in stream:
+                for key, value in parser.feed(chunk["content"]):
+                    if on_field:
+                        on_field(key, value)
+                if parser.complete or (is_complete and is_complete(parser.fields)):
+                    stopped_early = not chunk.get("done")
+                    break
+        
+        fields = dict(parser.fields)
+        if not parser.complete and not stopped_early:
+            try:
+                fields = {**json.loads(parser.text), **fields} # Objeto que o parser não fechou (ex: truncado)
+            except ValueError:
+                pass
+        if not fields:
+            raise ValueError("JSON stream produced no fields.")
+        if stopped_early:
+            logger.debug(f"JSON stream closed early after {len(fields)} fields.")
+        return fields
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+    async def _stream_with_failover(self, payload: Dict[str, Any], timeout: TimeoutType):
+        from src.core.load_controller import load_controller
+        tried = set()
+        while True:
+            backend = self.backends.pick(payload["model"], exclude=tried)
+            tried.add(backend.url)
+            started = False
             try:
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/api/chat",
-                    json=payload
-                ) as response:
-                    response.raise_for_status()
-                    async for line in response.aiter_lines():
-                        if not line:
-                            continue
-                        chunk = json.loads(line)
-                        if "message" in chunk:
-                            yield {
-                                "content": chunk["message"]["content"],
-                                "done": chunk.get("done", False)
-                            }
-            except httpx.ConnectError:
-                logger.error(f"Could not connect to Ollama at {self.base_url}")
-                raise ConnectionError("Ollama service unreachable. Ensure it is running.")
+                with load_controller.llm_call(), backend.track():
+                    async with backend.client.stream(
+                        "POST",
+                        "/api/chat",
+                        json=payload,
+                        timeout=self._timeout(timeout)
+                    ) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            chunk = json.loads(line)
+                            if "message" in chunk:
+                                started = True
+                                event = {
+                                    "content": chunk["message"]["content"],
+                                    "done": chunk.get("done", False)
+                                }
+                                if chunk.get("done"):
+                                    # Último chunk: contagens e tempos da chamada
+                                    event["stats"] = extract_stats(chunk)
+                                    llm_metrics.record(event["stats"])
+                                yield event
+                backend.record_success()
+                return
             except Exception as e:
+                if self._is_backend_failure(e):
+                    backend.record_failure()
+                # Só dá para trocar de backend antes do primeiro token
+                if not started and self._is_backend_failure(e) and self._has_alternative(payload["model"], tried):
+                    logger.warning(f"⚠️ Ollama {backend.url} falhou ({e!r}); tentando outro backend.")
+                    continue
+                if isinstance(e, httpx.ConnectError):
+                    logger.error(f"Could not connect to Ollama at {backend.url}")
+                    raise ConnectionError("Ollama service unreachable. Ensure it is running.")
                 logger.error(f"LLM streaming failed: {str(e)}")
                 raise
 
@@ -101,75 +232,115 @@ class GemmaClient:
         system_prompt: Optional[str] = None,
         temperature: float = 0.3,
         top_k: int = 40,
-        num_ctx: int = 8192,
-        json_mode: bool = False
+        num_ctx: Optional[int] = None,
+        json_mode: bool = False,
+        model: Optional[str] = None,
+        timeout: TimeoutType = None,
+        priority: str = "interactive",
+        history: Optional[List[Dict[str, str]]] = None,
+        image_profile: str = "photo"
     ) -> Dict[str, Any]:
         """
         Generates completion from Ollama.
+        `model` overrides the configured chat model (e.g. a small intent model).
+        `timeout` overrides the pool's timeouts for this call.
+        `priority` is the llm_scheduler lane (interactive > intent > ingestion).
+        `history` holds earlier turns as chat messages ({"role", "content"}), sent between
+        the system prompt and `prompt`.
+        `image_profile` selects the image preprocessing ("photo" or "document").
         """
         
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
+        # Turnos anteriores como mensagens de chat (prefixo estável entre turnos -> reuso do KV cache)
+        messages.extend(history or [])
         
         user_msg = {"role": "user", "content": prompt}
         
         # Handle images
         if images:
-            processed_images = []
-            for img in images:
-                if not img.startswith("data:"): 
-                    try:
-                        with open(img, "rb") as f:
-                            encoded = base64.b64encode(f.read()).decode("utf-8")
-                            processed_images.append(encoded)
-                    except Exception:
-                        processed_images.append(img)
-                else:
-                    processed_images.append(img)
-            
-            user_msg["images"] = processed_images
+            # Downscale/EXIF/cache fora do event loop (src/core/image_pipeline.py)
+            from src.core.image_pipeline import image_pipeline
+            user_msg["images"] = await image_pipeline.prepare(images, profile=image_profile)
             
         messages.append(user_msg)
         
         payload = {
-            "model": self.model,
+            "model": model or self.model,
             "messages": messages,
             "stream": False,
             "options": {
                 "temperature": temperature,
                 "top_k": top_k,
-                "num_ctx": num_ctx
+                "num_ctx": num_ctx or settings_manager.num_ctx # Valor único: trocá-lo recarrega o runner do Ollama
             }
         }
+        if settings_manager.llm_keep_alive:
+            payload["keep_alive"] = settings_manager.llm_keep_alive # Modelo (e KV cache) fixo na memória
         
         if json_mode:
             payload["format"] = "json"
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        from src.core.llm_scheduler import llm_scheduler
+        async with await llm_scheduler.acquire(priority):
+            return await self._generate_with_failover(payload, timeout)
+
+    async def _generate_with_failover(self, payload: Dict[str, Any], timeout: TimeoutType) -> Dict[str, Any]:
+        from src.core.load_controller import load_controller
+        tried = set()
+        while True:
+            backend = self.backends.pick(payload["model"], exclude=tried)
+            tried.add(backend.url)
             try:
                 # Debug logging for URL and Model validation
-                logger.info(f"📤 Calling Ollama: {self.base_url}/api/chat | Model: {payload.get('model')}")
+                logger.info(f"📤 Calling Ollama: {backend.url}/api/chat | Model: {payload.get('model')}")
                 # logger.debug(f"Payload: {json.dumps(payload)[:200]}...") # Partial log for safety
 
-                response = await client.post(
-                    f"{self.base_url}/api/chat",
-                    json=payload
-                )
+                with load_controller.llm_call(), backend.track():
+                    response = await backend.client.post(
+                        "/api/chat",
+                        json=payload,
+                        timeout=self._timeout(timeout)
+                    )
                 response.raise_for_status()
                 data = response.json()
+                backend.record_success()
                 
+                stats = extract_stats(data)
+                llm_metrics.record(stats)
                 return {
                     "content": data["message"]["content"],
                     "model": data["model"],
                     "timestamp": datetime.utcnow().isoformat(),
-                    "done": data["done"]
+                    "done": data["done"],
+                    "stats": stats
                 }
-            except httpx.ConnectError:
-                logger.error(f"Could not connect to Ollama at {self.base_url}")
-                raise ConnectionError("Ollama service unreachable. Ensure it is running.")
             except Exception as e:
+                if self._is_backend_failure(e):
+                    backend.record_failure()
+                    # Chamada sem stream é idempotente: repete em outro backend
+                    if self._has_alternative(payload["model"], tried):
+                        logger.warning(f"⚠️ Ollama {backend.url} falhou ({e!r}); repetindo em outro backend.")
+                        continue
+                if isinstance(e, httpx.ConnectError):
+                    logger.error(f"Could not connect to Ollama at {backend.url}")
+                    raise ConnectionError("Ollama service unreachable. Ensure it is running.")
                 logger.error(f"LLM generation failed: {repr(e)}")
                 raise
 
+    @staticmethod
+    def _is_backend_failure(error: Exception) -> bool:
+        """Node-level failures (connection, timeout, 5xx) count against the circuit; 4xx do not."""
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+        return isinstance(error, (httpx.TransportError, NoBackendAvailable))
+
+    def _has_alternative(self, model: str, tried: set) -> bool:
+        try:
+            self.backends.pick(model, exclude=tried)
+            return True
+        except NoBackendAvailable:
+            return False
+
 llm_client = GemmaClient()
@@ -0,0 +1,117 @@
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+COLD_LOAD_MS = 500 # load_duration acima disso = modelo foi (re)carregado na memória
+
+
+def extract_stats(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Ollama's final response fields (durations in ns) -> ms, token counts and rates.
+    Returns None when the payload carries no stats (e.g. intermediate stream chunks).
+    """
+    if "eval_count" not in data and "prompt_eval_count" not in data:
+        return None
+    ms = lambda key: round((data.get(key) or 0) / 1e6, 1)
+    stats = {
+        "model": data.get("model"),
+        "prompt_tokens": int(data.get("prompt_eval_count") or 0),
+        "prompt_eval_ms": ms("prompt_eval_duration"),
+        "output_tokens": int(data.get("eval_count") or 0),
+        "eval_ms": ms("eval_duration"),
+        "load_ms": ms("load_duration"),
+        "total_ms": ms("total_duration"),
+    }
+    stats["tokens_per_s"] = round(stats["output_tokens"] / (stats["eval_ms"] / 1000), 1) if stats["eval_ms"] else 0.0
+    stats["prefill_tokens_per_s"] = round(stats["prompt_tokens"] / (stats["prompt_eval_ms"] / 1000), 1) if stats["prompt_eval_ms"] else 0.0
+    stats["cold_load"] = stats["load_ms"] >= COLD_LOAD_MS
+    return stats
+
+
+class LLMMetrics:
+    """
+    Per-model aggregates of Ollama call statistics: decode throughput, prefill cost and cold loads.
+    Totals since startup plus a window of recent calls (for current averages).
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self.started_at = time.time()
+
+    def record(self, stats: Optional[Dict[str, Any]]):
+        if not stats:
+            return
+        model = stats.get("model") or "unknown"
+        entry = self._models.setdefault(model, {
+            "calls": 0, "prompt_tokens": 0, "output_tokens": 0,
+            "prompt_eval_ms": 0.0, "eval_ms": 0.0, "load_ms": 0.0, "cold_loads": 0,
+            "recent": deque(maxlen=self.window)
+        })
+        entry["calls"] += 1
+        entry["prompt_tokens"] += stats["prompt_tokens"]
+        entry["output_tokens"] += stats["output_tokens"]
+        entry["prompt_eval_ms"] += stats["prompt_eval_ms"]
+        entry["eval_ms"] += stats["eval_ms"]
+        entry["load_ms"] += stats["load_ms"]
+        entry["cold_loads"] += 1 if stats["cold_load"] else 0
+        entry["recent"].append(stats)
+        if stats["cold_load"]:
+            logger.info(f"🧊 {model}: carga a frio de {stats['load_ms']:.0f}ms.")
+
+    def record_prefix_reuse(self, prompt_tokens_est: int, stats: Optional[Dict[str, Any]],
+                            exact_count: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        KV-cache reuse of one call. Ollama's prompt_eval_count only counts the tokens it had to
+        prefill, so (prompt size - prefilled) ~ tokens served from the cached prefix.
+        Only meaningful when the prompt was counted with the model's own tokenizer (`exact_count`):
+        the char-based estimate overshoots and would report reuse even on a cold cache.
+        """
+        if not exact_count or not stats or not stats.get("prompt_tokens"):
+            return None
+        prefilled = stats["prompt_tokens"]
+        reused = max(0, int(prompt_tokens_est) - prefilled)
+        ms_per_token = stats["prompt_eval_ms"] / prefilled
+        report = {
+            "prompt_tokens_est": int(prompt_tokens_est),
+            "prefilled_tokens": prefilled,
+            "reused_tokens_est": reused,
+            "prefill_saved_ms_est": round(reused * ms_per_token, 1),
+        }
+        entry = self._models.get(stats.get("model") or "unknown")
+        if entry is not None:
+            entry["reused_tokens_est"] = entry.get("reused_tokens_est", 0) + reused
+            entry["prefill_saved_ms_est"] = entry.get("prefill_saved_ms_est", 0.0) + report["prefill_saved_ms_est"]
+        return report
+
+    def snapshot(self) -> Dict[str, Any]:
+        models = {}
+        for model, entry in self._models.items():
+            recent = list(entry["recent"])
+            recent_prompt = [s["prompt_tokens"] for s in recent]
+            models[model] = {
+                "calls": entry["calls"],
+                "cold_loads": entry["cold_loads"],
+                "prompt_tokens": entry["prompt_tokens"],
+                "output_tokens": entry["output_tokens"],
+                "tokens_per_s": round(entry["output_tokens"] / (entry["eval_ms"] / 1000), 1) if entry["eval_ms"] else 0.0,
+                "prefill_tokens_per_s": round(entry["prompt_tokens"] / (entry["prompt_eval_ms"] / 1000), 1) if entry["prompt_eval_ms"] else 0.0,
+                # Custo de prefill: quanto cada 1k tokens de prompt acrescenta antes do 1º token
+                "prefill_ms_per_1k_tokens": round(entry["prompt_eval_ms"] / entry["prompt_tokens"] * 1000, 1) if entry["prompt_tokens"] else 0.0,
+                "recent_avg_prompt_tokens": round(sum(recent_prompt) / len(recent_prompt), 1) if recent_prompt else 0.0,
+                "recent_max_prompt_tokens": max(recent_prompt) if recent_prompt else 0,
+                "recent_avg_total_ms": round(sum(s["total_ms"] for s in recent) / len(recent), 1) if recent else 0.0,
+                # Reuso do prefixo (modo stable_prefix)
+                "prefix_reused_tokens_est": entry.get("reused_tokens_est", 0),
+                "prefill_saved_ms_est": round(entry.get("prefill_saved_ms_est", 0.0), 1),
+            }
+        return {"since": self.started_at, "models": models}
+
+    def reset(self):
+        self._models.clear()
+        self.started_at = time.time()
+
+llm_metrics = LLMMetrics()
@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Faixas de prioridade (menor = mais prioritária)
+LANES = ("interactive", "intent", "ingestion")
+LANE_PRIORITY = {lane: i for i, lane in enumerate(LANES)}
+
+DEFAULT_LANE_LIMITS = {"interactive": 4, "intent": 2, "ingestion": 1}
+DEFAULT_QUEUE_TIMEOUTS = {"interactive": 20.0, "intent": 10.0, "ingestion": 600.0}
+
+
+class LLMQueueTimeout(Exception):
+    """Admission rejected: the lane's queue timeout expired. Maps to HTTP 503 + Retry-After."""
+
+    def __init__(self, lane: str, waited: float, retry_after: int):
+        super().__init__(f"Fila do LLM ({lane}) excedeu {waited:.1f}s.")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class LLMSlot:
+    """Admission ticket; release() is idempotent. Usable as an async context manager."""
+
+    def __init__(self, scheduler: "LLMScheduler", lane: str):
+        self.scheduler = scheduler
+        self.lane = lane
+        self.started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.scheduler._release(self.lane, time.monotonic() - self.started)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+class LLMScheduler:
+    """
+    Admission control for LLM calls.
+    A global concurrency cap (llm_max_concurrency) shared by priority lanes, each with its own
+    limit: a freed slot goes to the highest-priority waiter whose lane still has room, so bulk
+    ingestion can never take the slots interactive chats need. Waiters give up after the
+    lane's queue timeout (LLMQueueTimeout -> 503 with Retry-After).
+    """
+
+    def __init__(self):
+        self._running = {lane: 0 for lane in LANES}
+        self._waiters: List[List[Any]] = [] # [priority, seq, lane, future]
+        self._seq = itertools.count()
+        self._service_seconds = 5.0 # EWMA da duração de uma chamada (estimativa do Retry-After)
+        self._metrics = {
+            lane: {"granted": 0, "rejected": 0, "waits_ms": deque(maxlen=200)} for lane in LANES
+        }
+
+    # --- Config ---
+    @staticmethod
+    def _config():
+        from src.core.settings_manager import settings_manager
+        limits = dict(DEFAULT_LANE_LIMITS)
+        limits.update(settings_manager.llm_lane_limits)
+        timeouts = dict(DEFAULT_QUEUE_TIMEOUTS)
+        timeouts.update(settings_manager.llm_queue_timeouts)
+        return settings_manager.llm_max_concurrency, limits, timeouts
+
+    def _can_run(self, lane: str, capacity: int, limits: Dict[str, int]) -> bool:
+        return sum(self._running.values()) < capacity and self._running[lane] < limits.get(lane, 1)
+
+    # --- Admissão ---
+    async def acquire(self, lane: str = "interactive") -> LLMSlot:
+        if lane not in LANE_PRIORITY:
+            raise ValueError(f"Unknown LLM lane: {lane}")
+        capacity, limits, timeouts = self._config()
+        started = time.monotonic()
+
+        # Caminho rápido: há vaga e ninguém de prioridade igual ou maior esperando por ela
+        ahead = any(w[0] <= LANE_PRIORITY[lane] and self._can_run(w[2], capacity, limits) for w in self._waiters)
+        if not ahead and self._can_run(lane, capacity, limits):
+            return self._grant(lane, started)
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = [LANE_PRIORITY[lane], next(self._seq), lane, future]
+        self._waiters.append(waiter)
+        self._waiters.sort(key=lambda w: (w[0], w[1]))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeouts[lane])
+        except asyncio.TimeoutError:
+            self._remove(waiter)
+            if future.done() and not future.cancelled(): # Vaga concedida no mesmo instante
+                return self._slot_for(lane, started)
+            self._metrics[lane]["rejected"] += 1
+            waited = time.monotonic() - started
+            logger.warning(f"🚦 LLM {lane}: fila excedeu {timeouts[lane]:.0f}s, requisição recusada.")
+            raise LLMQueueTimeout(lane, waited, self.retry_after(lane))
+        except asyncio.CancelledError:
+            self._remove(waiter)
+            if future.done() and not future.cancelled():
+                self._release(lane, 0.0) # Cliente desistiu depois de receber a vaga
+            raise
+        return self._slot_for(lane, started)
+
+    def _grant(self, lane: str, started: float) -> LLMSlot:
+        self._running[lane] += 1
+        return self._slot_for(lane, started)
+
+    def _slot_for(self, lane: str, started: float) -> LLMSlot:
+        self._metrics[lane]["granted"] += 1
+        self._metrics[lane]["waits_ms"].append((time.monotonic() - started) * 1000)
+        return LLMSlot(self, lane)
+
+    def _remove(self, waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+
+    def _release(self, lane: str, service_seconds: float):
+        self._running[lane] = max(0, self._running[lane] - 1)
+        if service_seconds > 0:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * service_seconds
+        self._dispatch()
+
+    def _dispatch(self):
+        capacity, limits, _ = self._config()
+        for waiter in list(self._waiters):
+            _, _, lane, future = waiter
+            if future.done():
+                self._remove(waiter)
+                continue
+            if self._can_run(lane, capacity, limits):
+                self._running[lane] += 1 # Vaga reservada antes de acordar o waiter
+                self._remove(waiter)
+                future.set_result(True)
+
+    # --- Métricas ---
+    def retry_after(self, lane: str) -> int:
+        """Seconds until a slot is likely free: queue ahead x mean call duration / capacity."""
+        capacity, _, _ = self._config()
+        queued = sum(1 for w in self._waiters if w[0] <= LANE_PRIORITY[lane]) + 1
+        return int(min(120, max(1, math.ceil(queued * self._service_seconds / max(capacity, 1)))))
+
+    def snapshot(self) -> Dict[str, Any]:
+        capacity, limits, timeouts = self._config()
+        lanes = {}
+        for lane in LANES:
+            waits = sorted(self._metrics[lane]["waits_ms"])
+            lanes[lane] = {
+                "running": self._running[lane],
+                "queued": sum(1 for w in self._waiters if w[2] == lane),
+                "limit": limits.get(lane),
+                "queue_timeout_s": timeouts.get(lane),
+                "granted": self._metrics[lane]["granted"],
+                "rejected": self._metrics[lane]["rejected"],
+                "wait_ms_avg": round(sum(waits) / len(waits), 1) if waits else 0.0,
+                "wait_ms_p95": round(waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+            }
+        return {"capacity": capacity, "service_seconds_ewma": round(self._service_seconds, 2), "lanes": lanes}
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Degraus de qualidade, do completo ao modo de sobrevivência.
+# None = usa o valor configurado em settings_manager.
+QUALITY_TIERS: List[Dict[str, Any]] = [
+    {"name": "full", "rag_top_k": None, "rerank_pool": None, "context_slots": 5, "num_ctx_cap": None, "shed_model": False},
+    {"name": "reduced", "rag_top_k": 25, "rerank_pool": 12, "context_slots": 4, "num_ctx_cap": 6144, "shed_model": False},
+    {"name": "lean", "rag_top_k": 15, "rerank_pool": 8, "context_slots": 3, "num_ctx_cap": 4096, "shed_model": False},
+    {"name": "survival", "rag_top_k": 8, "rerank_pool": 5, "context_slots": 2, "num_ctx_cap": 4096, "shed_model": True},
+]
+
+# Limiares por sinal: índice do primeiro limiar ultrapassado = degrau mínimo exigido
+PRESSURE_THRESHOLDS = {
+    "queue_depth": (4, 8, 16), # Requisições de chat em andamento
+    "loop_lag_ms": (100, 250, 500), # Atraso do event loop (média móvel)
+}
+
+# Chamadas simultâneas ao Ollama, em múltiplos do paralelismo configurado (llm_max_concurrency):
+# abaixo da capacidade, gerações em paralelo são o estado normal (OLLAMA_NUM_PARALLEL >= 2)
+LLM_INFLIGHT_FACTORS = (1, 2, 4)
+
+
+class LoadController:
+    """
+    Load-adaptive quality tiers for the chat pipeline.
+    Watches chat queue depth, event-loop lag and Ollama concurrency; steps down immediately
+    to the tier the pressure requires and steps back up one tier at a time once the load has
+    stayed lower for `recovery_seconds` (hysteresis avoids flapping).
+    """
+
+    def __init__(self, recovery_seconds: float = 30.0, sample_interval: float = 0.5):
+        self.recovery_seconds = recovery_seconds
+        self.sample_interval = sample_interval
+        self.queue_depth = 0
+        self.llm_inflight = 0
+        self.loop_lag_ms = 0.0
+        self.tier_index = 0
+        self._calm_since: Optional[float] = None
+        self.transitions: deque = deque(maxlen=50)
+
+    # --- Sinais ---
+    def request_started(self):
+        self.queue_depth += 1
+
+    def request_finished(self):
+        self.queue_depth = max(0, self.queue_depth - 1)
+
+    @contextmanager
+    def llm_call(self):
+        self.llm_inflight += 1
+        try:
+            yield
+        finally:
+            self.llm_inflight = max(0, self.llm_inflight - 1)
+
+    def signals(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self.queue_depth,
+            "loop_lag_ms": round(self.loop_lag_ms, 1),
+            "llm_inflight": self.llm_inflight,
+        }
+
+    @staticmethod
+    def pressure_thresholds() -> Dict[str, Tuple[float, ...]]:
+        from src.core.settings_manager import settings_manager
+        parallel = max(1, settings_manager.llm_max_concurrency)
+        return {**PRESSURE_THRESHOLDS, "llm_inflight": tuple(parallel * f for f in LLM_INFLIGHT_FACTORS)}
+
+    def target_tier(self) -> int:
+        target = 0
+        thresholds = self.pressure_thresholds()
+        for name, value in self.signals().items():
+            level = sum(1 for limit in thresholds[name] if value >= limit)
+            target = max(target, level)
+        return min(target, len(QUALITY_TIERS) - 1)
+
+    # --- Controle ---
+    def _move(self, new_index: int, reason: str):
+        old = QUALITY_TIERS[self.tier_index]["name"]
+        self.tier_index = new_index
+        new = QUALITY_TIERS[new_index]["name"]
+        self.transitions.append({"at": time.time(), "from": old, "to": new, "reason": reason, "signals": self.signals()})
+        log = logger.warning if reason == "pressure" else logger.info
+        log(f"🎚️ Tier de qualidade: {old} -> {new} ({reason}, {self.signals()})")
+
+    def evaluate(self, now: Optional[float] = None) -> Dict[str, Any]:
+        from src.core.settings_manager import settings_manager
+        if not settings_manager.load_adaptive_enabled:
+            if self.tier_index:
+                self._move(0, "disabled")
+            return QUALITY_TIERS[0]
+
+        now = time.monotonic() if now is None else now
+        target = self.target_tier()
+        if target > self.tier_index:
+            self._move(target, "pressure") # Desce direto: a fila não espera
+            self._calm_since = None
+        elif target < self.tier_index:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.recovery_seconds:
+                self._move(self.tier_index - 1, "recovery") # Sobe um degrau por vez
+                self._calm_since = now
+        else:
+            self._calm_since = None
+        return QUALITY_TIERS[self.tier_index]
+
+    def current_tier(self) -> Dict[str, Any]:
+        return self.evaluate()
+
+    async def monitor(self):
+        """Background task: samples event-loop lag (EWMA) and re-evaluates the tier."""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.sample_interval)
+            lag_ms = max(0.0, (time.perf_counter() - started - self.sample_interval) * 1000)
+            self.loop_lag_ms = 0.7 * self.loop_lag_ms + 0.3 * lag_ms
+            try:
+                self.evaluate()
+            except Exception as e:
+                logger.error(f"Load controller evaluation failed: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "tier": QUALITY_TIERS[self.tier_index]["name"],
+            "signals": self.signals(),
+            "thresholds": self.pressure_thresholds(),
+            "tiers": QUALITY_TIERS,
+            "transitions": list(self.transitions),
+        }
+
+load_controller = LoadController()
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase + single spaces: trivially different spellings of a query share one entry."""
+    return " ".join((text or "").lower().split())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ModelCache:
+    """
+    Two-level cache for model outputs (query embeddings, cross-encoder scores).
+    L1: in-memory LRU. L2: SQLite file (survives restarts), bounded by row count with
+    least-recently-used eviction. Values are float32 vectors stored as BLOBs.
+    Synchronous on purpose: callers (embed_query, reranker) are synchronous model code.
+    """
+
+    EVICT_EVERY = 500 # Inserts between L2 size checks
+
+    def __init__(self, path: Optional[Path] = None, memory_entries: int = 5000, max_rows: int = 200000):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path is None:
+                from src.config import settings
+                self.path = settings.MODEL_CACHE_DB_PATH
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS model_cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_model_cache_last_used ON model_cache(last_used)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(namespace: str, *parts: str) -> str:
+        return namespace + ":" + "|".join(parts)
+
+    def _remember(self, key: str, value: np.ndarray):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Returns the cached values for the keys found (memory first, then disk)."""
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.stats["memory_hits"] += 1
+                else:
+                    missing.append(key)
+
+            if missing:
+                try:
+                    conn = self._db()
+                    for start in range(0, len(missing), 500): # SQLite variable limit
+                        batch = missing[start:start + 500]
+                        rows = conn.execute(
+                            f"SELECT key, value FROM model_cache WHERE key IN ({','.join('?' * len(batch))})", batch
+                        ).fetchall()
+                        for key, blob in rows:
+                            value = np.frombuffer(blob, dtype=np.float32)
+                            found[key] = value
+                            self._remember(key, value)
+                        if rows:
+                            conn.executemany(
+                                "UPDATE model_cache SET last_used = ? WHERE key = ?",
+                                [(time.time(), key) for key, _ in rows]
+                            )
+                    conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ Model cache (disco) indisponível: {e}")
+                self.stats["disk_hits"] += sum(1 for k in missing if k in found)
+                self.stats["misses"] += sum(1 for k in missing if k not in found)
+        return found
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            rows = []
+            for key, value in items.items():
+                value = np.asarray(value, dtype=np.float32).ravel()
+                self._remember(key, value)
+                rows.append((key, value.tobytes(), now))
+            try:
+                conn = self._db()
+                conn.executemany("INSERT OR REPLACE INTO model_cache (key, value, last_used) VALUES (?, ?, ?)", rows)
+                conn.commit()
+                self._inserts += len(rows)
+                if self._inserts >= self.EVICT_EVERY:
+                    self._inserts = 0
+                    self._evict(conn)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Falha ao gravar no model cache: {e}")
+
+    def put(self, key: str, value: np.ndarray):
+        self.put_many({key: value})
+
+    def _evict(self, conn: sqlite3.Connection):
+        (count,) = conn.execute("SELECT COUNT(*) FROM model_cache").fetchone()
+        excess = count - self.max_rows
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM model_cache WHERE key IN (SELECT key FROM model_cache ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+            conn.commit()
+            logger.info(f"🧹 Model cache: {excess} entradas antigas removidas.")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            try:
+                conn = self._db()
+                conn.execute("DELETE FROM model_cache")
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Falha ao limpar o model cache: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _build_cache() -> ModelCache:
+    from src.core.settings_manager import settings_manager
+    return ModelCache(
+        memory_entries=settings_manager.model_cache_memory_entries,
+        max_rows=settings_manager.model_cache_max_rows
+    )
+
+model_cache = _build_cache()
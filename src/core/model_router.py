@@ -0,0 +1,99 @@
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Limiares padrão: qualquer sinal acima do limite manda o turno para o modelo grande.
+# O tamanho do contexto conta pelos tokens empacotados, não pelo nº de documentos: um turno de RAG
+# normal sempre preenche os slots de contexto ("docs" segue nos sinais; limiar só se configurado).
+DEFAULT_ROUTING_THRESHOLDS = {
+    "ambiguity": 0.5, # ambiguity_score da intenção
+    "context_tokens": 2500, # Tokens de contexto recuperado (após o ContextPacker)
+    "history_turns": 6, # Perguntas anteriores na conversa
+    "message_words": 60, # Tamanho da pergunta
+}
+
+
+class ModelRouter:
+    """
+    Per-turn choice between the small and the large generation model.
+    Simple civic questions (no legal reference, little context, short conversation, clear
+    intent) go to the small model; any signal above its threshold keeps the large one.
+    Every decision carries its signals and reasons for the reasoning payload / audit log.
+    """
+
+    def __init__(self):
+        self.counts = {"small": 0, "large": 0}
+        self.recent: deque = deque(maxlen=50)
+
+    @staticmethod
+    def _config():
+        from src.core.settings_manager import settings_manager
+        thresholds = dict(DEFAULT_ROUTING_THRESHOLDS)
+        thresholds.update(settings_manager.model_routing_thresholds)
+        return settings_manager.model_routing_small_model, settings_manager.llm_model, thresholds
+
+    @staticmethod
+    def signals(intent_data: Dict[str, Any], context_docs: List[Dict[str, Any]],
+                history: Optional[List[Any]], message: str, has_images: bool = False) -> Dict[str, Any]:
+        from src.core.prompt_builder import has_legal_reference
+        from src.core.token_budget import TokenCounter
+
+        history = history or []
+        try:
+            ambiguity = float(intent_data.get("ambiguity_score") or 0.0)
+        except (TypeError, ValueError):
+            ambiguity = 0.0
+        return {
+            "ambiguity": ambiguity,
+            "docs": len(context_docs),
+            "context_tokens": sum(TokenCounter.count(d.get("content", "")) for d in context_docs),
+            "history_turns": sum(1 for m in history if m.role == "user"),
+            "session_summary": any(m.role == "system" for m in history), # Conversa longa já compactada
+            "message_words": len((message or "").split()),
+            "legal": has_legal_reference(message) or bool(intent_data.get("citation_lookup")),
+            "images": has_images,
+        }
+
+    @staticmethod
+    def _model_available(model: str) -> bool:
+        """False only when every probed backend is known to lack the model."""
+        from src.core.llm_client import llm_client
+        return llm_client.backends.has_model(model)
+
+    def route(self, signals: Dict[str, Any]) -> Dict[str, Any]:
+        small_model, large_model, thresholds = self._config()
+        reasons = [name for name, limit in thresholds.items() if name in signals and signals[name] > limit]
+        if signals.get("legal"):
+            reasons.append("legal")
+        if signals.get("session_summary"):
+            reasons.append("session_summary")
+        if signals.get("images"):
+            reasons.append("images") # Visão fica no modelo grande
+        if not reasons and not self._model_available(small_model):
+            reasons.append("small_model_unavailable")
+
+        route = "large" if reasons else "small"
+        decision = {
+            "route": route,
+            "model": large_model if reasons else small_model,
+            "reasons": reasons,
+            "signals": signals,
+        }
+        self.counts[route] += 1
+        self.recent.append({"route": route, "reasons": reasons})
+        logger.info(f"🧭 Roteamento de modelo: {decision['model']} ({', '.join(reasons) or 'pergunta simples'})")
+        return decision
+
+    def snapshot(self) -> Dict[str, Any]:
+        small_model, large_model, thresholds = self._config()
+        return {
+            "small_model": small_model,
+            "large_model": large_model,
+            "thresholds": thresholds,
+            "counts": dict(self.counts),
+            "recent": list(self.recent),
+        }
+
+model_router = ModelRouter()
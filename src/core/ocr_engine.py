@@ -32,10 +32,12 @@ class OCREngine:
         self, 
         file_path: str,
         doc_type: DocumentType = "auto",
-        enable_validation: bool = True
+        enable_validation: bool = True,
+        image_profile: str = "photo"
     ) -> Dict[str, Any]:
         """
         Executes Vision Logic for images/fallbacks.
+        `image_profile="document"` enhances and tiles document photos before the vision call.
         """
         start_time = datetime.now()
         
@@ -54,7 +56,9 @@ class OCREngine:
              try:
                  vision_response = await llm_client.generate(
                     prompt="Descreva esta imagem com detalhes e transcreva qualquer texto visível.",
-                    images=[file_path]
+                    images=[file_path],
+                    image_profile=image_profile,
+                    priority="ingestion" # Não disputa vaga com os chats
                  )
                  ocr_result = {
                      "text": vision_response["content"],
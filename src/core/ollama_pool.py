@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaBackend:
+    """
+    One Ollama node: its pooled HTTP client, in-flight counter, known models and circuit breaker.
+    Circuit: `failure_threshold` consecutive failures open it for `cooldown` seconds; after that
+    a single trial request (half-open) decides whether it closes again.
+    """
+
+    def __init__(self, url: str, build_client: Callable[[str], httpx.AsyncClient],
+                 failure_threshold: int = 3, cooldown: float = 30.0):
+        self.url = url.rstrip("/")
+        self._build_client = build_client
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.outstanding = 0
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.installed_models: Optional[Set[str]] = None # None = desconhecido (ainda não sondado)
+        self.loaded_models: Set[str] = set()
+        self.last_probe: Optional[float] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled client, rebuilt if the event loop changed (connections are bound to their loop)."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = self._build_client(self.url)
+            self._client_loop = loop
+        return self._client
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+
+    # --- Circuit breaker ---
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial_in_flight)
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"✅ Ollama {self.url} recuperado: circuito fechado.")
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"🔌 Ollama {self.url} fora do ar ({self.failures} falhas): circuito aberto por {self.cooldown:.0f}s.")
+            self.opened_at = time.monotonic()
+
+    @contextmanager
+    def track(self):
+        trial = self.state == "half_open"
+        if trial:
+            self._trial_in_flight = True
+        self.outstanding += 1
+        try:
+            yield
+        finally:
+            self.outstanding -= 1
+            if trial:
+                self._trial_in_flight = False
+
+    # --- Modelos ---
+    def affinity(self, model: str) -> int:
+        """2 = model already loaded in memory, 1 = installed (or unknown), 0 = known to be missing."""
+        if model in self.loaded_models:
+            return 2
+        if self.installed_models is None or model in self.installed_models:
+            return 1
+        return 0
+
+    async def probe(self, timeout: float = 3.0) -> bool:
+        """Active health check: installed models (/api/tags) and loaded ones (/api/ps)."""
+        try:
+            tags = await self.client.get("/api/tags", timeout=timeout)
+            tags.raise_for_status()
+            self.installed_models = {m["name"] for m in tags.json().get("models", [])}
+            try:
+                ps = await self.client.get("/api/ps", timeout=timeout)
+                ps.raise_for_status()
+                self.loaded_models = {m["name"] for m in ps.json().get("models", [])}
+            except Exception:
+                self.loaded_models = set() # Ollama antigo sem /api/ps
+            self.record_success()
+            return True
+        except Exception as e:
+            logger.debug(f"Probe failed for {self.url}: {e}")
+            self.record_failure()
+            return False
+        finally:
+            self.last_probe = time.time()
+
+    def snapshot(self) -> Dict:
+        return {
+            "url": self.url,
+            "state": self.state,
+            "outstanding": self.outstanding,
+            "failures": self.failures,
+            "loaded_models": sorted(self.loaded_models),
+            "installed_models": sorted(self.installed_models) if self.installed_models is not None else None,
+            "last_probe": self.last_probe,
+        }
+
+
+class NoBackendAvailable(ConnectionError):
+    pass
+
+
+class BackendPool:
+    """
+    Routes LLM calls across several Ollama nodes: least outstanding requests among the
+    healthy backends with the best model affinity (loaded > installed > missing).
+    """
+
+    def __init__(self, urls: List[str], build_client: Callable[[str], httpx.AsyncClient]):
+        self.backends = [OllamaBackend(url, build_client) for url in urls]
+
+    def pick(self, model: str, exclude: Optional[Set[str]] = None) -> OllamaBackend:
+        exclude = exclude or set()
+        candidates = [b for b in self.backends if b.url not in exclude and b.available()]
+        if not candidates:
+            raise NoBackendAvailable("Nenhum backend Ollama disponível (todos com circuito aberto).")
+        with_model = [b for b in candidates if b.affinity(model) > 0] or candidates
+        return min(with_model, key=lambda b: (-b.affinity(model), b.outstanding))
+
+    def has_model(self, model: str) -> bool:
+        """False only when every probed backend is known to lack the model."""
+        return any(b.affinity(model) > 0 for b in self.backends)
+
+    async def probe_all(self):
+        await asyncio.gather(*(b.probe() for b in self.backends))
+
+    async def monitor(self, interval: float = 15.0):
+        """Background task: periodic health probes (also refreshes model affinity)."""
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"Ollama health probe failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.close()
+
+    def snapshot(self) -> List[Dict]:
+        return [b.snapshot() for b in self.backends]
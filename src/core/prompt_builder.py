@@ -4,6 +4,13 @@ from src.core.settings_manager import settings_manager
 
 PROMPT_FILE = settings.BASE_DIR / "sentinela_prompt_v2.md"
 
+LEGAL_PATTERN = r"\b(lei|decreto|artigo|inciso|constituição|portaria|stf|jurisprudência)\b"
+
+def has_legal_reference(text: str) -> bool:
+    """Regex fallback for legal questions (also a model-routing signal)."""
+    import re
+    return bool(re.search(LEGAL_PATTERN, (text or "").lower()))
+
 class DynamicPromptManager:
     """
     Slices the monolithic markdown prompt into logical components and 
@@ -24,15 +31,11 @@ class DynamicPromptManager:
         
         return ""
 
-    def build_prompt(self, intent_data: dict, context_docs: list) -> str:
+    def _sections(self, raw_text: str) -> dict:
         """
-        Builds a lean system prompt based on conversational needs.
+        Slices the markdown prompt by ### headers. Returns {name: (trigger_rule, lines)}
+        in file order.
         """
-        raw_text = self._get_raw_prompt()
-        if not raw_text:
-            return ""
-
-        # Slicing logic based on markdown headers and HTML triggers
         sections = {}
         section_triggers = {}
         current_section = "CORE"
@@ -54,39 +57,39 @@ class DynamicPromptManager:
                     sections[current_section] = []
                 sections[current_section].append(line)
 
-        # Reassemble based on logic
-        final_prompt_parts = []
-        
+        return {name: (section_triggers.get(name, "always"), sec_lines) for name, sec_lines in sections.items()}
+
+    def _should_include(self, rule: str, intent_data: dict, context_docs: list) -> bool:
         search_needed = intent_data.get("search_needed", False)
         sphere = intent_data.get("sphere", "unknown")
         keywords_str = " ".join(intent_data.get("keywords", [])).lower()
         has_docs = len(context_docs) > 0
         
         # Regex fallback for legal
-        import re
-        legal_pattern = r"\b(lei|decreto|artigo|inciso|constituição|portaria|stf|jurisprudência)\b"
-        user_msg = intent_data.get("user_message", "").lower()
-        has_legal_regex = bool(re.search(legal_pattern, user_msg))
-
-        for sec_name, sec_lines in sections.items():
-            rule = section_triggers.get(sec_name, "always")
-            
-            should_include = False
-            if rule == "always":
-                should_include = True
-            elif rule == "search=true":
-                if search_needed or has_docs:
-                    should_include = True
-            elif rule == "intent=legal":
-                if sphere != "unknown" or has_docs or has_legal_regex:
-                    should_include = True
-            elif rule == "intent=imagination":
-                if "imagina" in keywords_str or "simula" in keywords_str or "como seria" in keywords_str:
-                    should_include = True
-            else:
-                should_include = True # fallback
-                
-            if should_include:
+        has_legal_regex = has_legal_reference(intent_data.get("user_message", ""))
+
+        if rule == "always":
+            return True
+        elif rule == "search=true":
+            return bool(search_needed or has_docs)
+        elif rule == "intent=legal":
+            return bool(sphere != "unknown" or has_docs or has_legal_regex)
+        elif rule == "intent=imagination":
+            return "imagina" in keywords_str or "simula" in keywords_str or "como seria" in keywords_str
+        return True # fallback
+
+    def build_prompt(self, intent_data: dict, context_docs: list) -> str:
+        """
+        Builds a lean system prompt based on conversational needs.
+        """
+        raw_text = self._get_raw_prompt()
+        if not raw_text:
+            return ""
+
+        # Reassemble based on logic
+        final_prompt_parts = []
+        for rule, sec_lines in self._sections(raw_text).values():
+            if self._should_include(rule, intent_data, context_docs):
                 final_prompt_parts.extend(sec_lines)
 
         # Fallback if somehow slicing failed (e.g., user removed all headers)
@@ -95,4 +98,25 @@ class DynamicPromptManager:
 
         return "\n".join(final_prompt_parts)
 
+    def build_stable_parts(self, intent_data: dict, context_docs: list) -> tuple:
+        """
+        Split for KV-cache reuse: (static_prefix, volatile_instructions).
+        The prefix holds only the "always" sections, so it is byte-identical on every turn;
+        sections triggered by the current intent go to the volatile tail, after the history.
+        """
+        raw_text = self._get_raw_prompt()
+        if not raw_text:
+            return "", ""
+
+        static_parts, volatile_parts = [], []
+        for rule, sec_lines in self._sections(raw_text).values():
+            if rule == "always":
+                static_parts.extend(sec_lines)
+            elif self._should_include(rule, intent_data, context_docs):
+                volatile_parts.extend(sec_lines)
+
+        if not static_parts and not volatile_parts:
+            return raw_text, ""
+        return "\n".join(static_parts).strip(), "\n".join(volatile_parts).strip()
+
 dynamic_prompt_builder = DynamicPromptManager()
@@ -35,14 +35,7 @@ class Reranker:
         return cls._model
 
     @classmethod
-    def rerank(cls, query: str, documents: List[str], top_k: int = 5) -> List[Dict[str, Any]]:
-        """
-        Reranks a list of document strings based on the query.
-        Returns sorted indices and scores.
-        """
-        if not documents:
-            return []
-            
+    def _predict(cls, query: str, documents: List[str]) -> List[float]:
         model = cls.get_model()
         
         # Prepare pairs [ [query, doc1], [query, doc2], ... ]
@@ -52,7 +45,43 @@ class Reranker:
         scores = model.predict(pairs)
         
         # Apply Sigmoid to normalize logits to 0-1 probability
-        scores = torch.sigmoid(torch.tensor(scores)).numpy()
+        return [float(x) for x in torch.sigmoid(torch.tensor(scores)).numpy()]
+
+    @classmethod
+    def score_pairs(cls, query: str, documents: List[str]) -> List[float]:
+        """
+        Cross-encoder score per document. Pairs scored before (same query, chunk and model)
+        come from the model cache; only the new ones go through the model.
+        """
+        from src.core.settings_manager import settings_manager
+        if not settings_manager.model_cache_enabled:
+            return cls._predict(query, documents)
+        
+        from src.core.model_cache import model_cache, text_hash
+        query_hash = text_hash(" ".join(query.split())) # Cased model: only whitespace is normalized
+        keys = [model_cache.make_key("rerank", cls._model_name, query_hash, text_hash(doc)) for doc in documents]
+        cached = model_cache.get_many(keys)
+        
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        if missing:
+            fresh = cls._predict(query, [documents[i] for i in missing])
+            new_entries = {}
+            for i, score in zip(missing, fresh):
+                new_entries[keys[i]] = [score]
+                cached[keys[i]] = [score]
+            model_cache.put_many(new_entries)
+        return [float(cached[key][0]) for key in keys]
+
+    @classmethod
+    def rerank(cls, query: str, documents: List[str], top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Reranks a list of document strings based on the query.
+        Returns sorted indices and scores.
+        """
+        if not documents:
+            return []
+            
+        scores = cls.score_pairs(query, documents)
         
         # Sort by score descending
         # Zip with original index to keep track
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import re
+import secrets
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCRATCHPAD_BLOCK = re.compile(r"<SCRATCHPAD[^>]*>(.*?)</SCRATCHPAD>", re.DOTALL | re.IGNORECASE)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "Você mantém o resumo de uma conversa entre um cidadão e o assistente Sentinela. "
+    "Atualize o resumo existente com os novos turnos, em português, em no máximo 8 frases. "
+    "Preserve fatos, perguntas em aberto, documentos e dispositivos legais citados. "
+    "Não invente nada. Responda apenas com o resumo."
+)
+
+
+def split_scratchpad(text: str):
+    """Separates a <SCRATCHPAD> note from the visible answer: (answer, note or None)."""
+    match = SCRATCHPAD_BLOCK.search(text or "")
+    if not match:
+        return text, None
+    note = re.sub(r"[{<>]", "", match.group(1).strip())[:1000]
+    return (text[:match.start()] + text[match.end():]).strip(), note
+
+
+class SessionStore:
+    """
+    Server-side chat sessions keyed by an opaque id (bound to the anonymized user).
+    Stores the turns and the scratchpad so clients send only the new message. Once the
+    uncompacted turns exceed `session_compaction_tokens`, the older ones are folded into a
+    rolling summary (small model, extractive fallback) and deleted; the model only ever sees
+    summary + the most recent turns, so prompt size stays flat over long conversations.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._tasks = set()
+
+    @staticmethod
+    async def _conn():
+        from src.core.database import db_manager
+        return await db_manager.get_sqlite()
+
+    # --- Ciclo de vida ---
+    async def create(self, user_hash: str) -> str:
+        session_id = secrets.token_urlsafe(24)
+        now = time.time()
+        conn = await self._conn()
+        await self.purge_expired()
+        await conn.execute(
+            "INSERT INTO chat_sessions (id, user_hash, summary, scratchpad, created_at, updated_at) VALUES (?, ?, '', NULL, ?, ?)",
+            (session_id, user_hash, now, now)
+        )
+        await conn.commit()
+        return session_id
+
+    async def load(self, session_id: str, user_hash: str) -> Optional[Dict[str, Any]]:
+        """Summary, scratchpad and uncompacted turns; None if unknown, expired or owned by someone else."""
+        from src.core.settings_manager import settings_manager
+        conn = await self._conn()
+        async with conn.execute(
+            "SELECT id, summary, scratchpad, updated_at FROM chat_sessions WHERE id = ? AND user_hash = ?",
+            (session_id, user_hash)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None or time.time() - row["updated_at"] > settings_manager.session_ttl_hours * 3600:
+            return None
+        async with conn.execute(
+            "SELECT role, content FROM chat_session_messages WHERE session_id = ? ORDER BY id",
+            (session_id,)
+        ) as cursor:
+            messages = [{"role": r["role"], "content": r["content"]} for r in await cursor.fetchall()]
+        return {"id": row["id"], "summary": row["summary"] or "", "scratchpad": row["scratchpad"], "messages": messages}
+
+    @staticmethod
+    def history(session: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Model-facing history: the rolling summary (as a system message) + the recent turns."""
+        history = []
+        if session["summary"]:
+            history.append({"role": "system", "content": f"RESUMO DA CONVERSA ATÉ AQUI: {session['summary']}"})
+        return history + session["messages"]
+
+    async def append_turn(self, session_id: str, user_text: str, assistant_text: str,
+                          scratchpad: Optional[str] = None):
+        from src.core.token_budget import TokenCounter
+        now = time.time()
+        conn = await self._conn()
+        await conn.executemany(
+            "INSERT INTO chat_session_messages (session_id, role, content, tokens, created_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (session_id, "user", user_text, TokenCounter.count(user_text), now),
+                (session_id, "assistant", assistant_text, TokenCounter.count(assistant_text), now),
+            ]
+        )
+        if scratchpad is not None:
+            await conn.execute("UPDATE chat_sessions SET scratchpad = ?, updated_at = ? WHERE id = ?", (scratchpad, now, session_id))
+        else:
+            await conn.execute("UPDATE chat_sessions SET updated_at = ? WHERE id = ?", (now, session_id))
+        await conn.commit()
+
+    async def delete(self, session_id: str, user_hash: str) -> bool:
+        conn = await self._conn()
+        cursor = await conn.execute("DELETE FROM chat_sessions WHERE id = ? AND user_hash = ?", (session_id, user_hash))
+        deleted = cursor.rowcount > 0
+        if deleted:
+            await conn.execute("DELETE FROM chat_session_messages WHERE session_id = ?", (session_id,))
+        await conn.commit()
+        self._locks.pop(session_id, None)
+        return deleted
+
+    async def purge_expired(self):
+        from src.core.settings_manager import settings_manager
+        conn = await self._conn()
+        cutoff = time.time() - settings_manager.session_ttl_hours * 3600
+        await conn.execute(
+            "DELETE FROM chat_session_messages WHERE session_id IN (SELECT id FROM chat_sessions WHERE updated_at < ?)",
+            (cutoff,)
+        )
+        await conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (cutoff,))
+        await conn.commit()
+
+    # --- Compactação ---
+    def schedule_compaction(self, session_id: str):
+        """Compacts after the response is delivered: summarizing never adds latency to a turn."""
+        task = asyncio.create_task(self._compact_safely(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _compact_safely(self, session_id: str):
+        try:
+            await self.compact(session_id)
+        except Exception as e:
+            logger.error(f"Session compaction failed ({session_id[:8]}): {e}")
+
+    async def compact(self, session_id: str) -> bool:
+        """Folds the older turns into the summary once the uncompacted ones exceed the threshold."""
+        from src.core.settings_manager import settings_manager
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            conn = await self._conn()
+            async with conn.execute(
+                "SELECT id, role, content, tokens FROM chat_session_messages WHERE session_id = ? ORDER BY id",
+                (session_id,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+            if sum(r["tokens"] or 0 for r in rows) <= settings_manager.session_compaction_tokens:
+                return False
+            keep = max(0, settings_manager.session_recent_messages)
+            older = rows[:len(rows) - keep] if keep else rows
+            if not older:
+                return False
+
+            async with conn.execute("SELECT summary FROM chat_sessions WHERE id = ?", (session_id,)) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                return False
+            turns = [{"role": r["role"], "content": r["content"]} for r in older]
+            summary = await self.summarize(row["summary"] or "", turns)
+
+            await conn.execute("UPDATE chat_sessions SET summary = ? WHERE id = ?", (summary, session_id))
+            await conn.execute(
+                "DELETE FROM chat_session_messages WHERE session_id = ? AND id <= ?",
+                (session_id, older[-1]["id"])
+            )
+            await conn.commit()
+            logger.info(f"🗜️ Sessão {session_id[:8]}: {len(older)} mensagens compactadas no resumo.")
+            return True
+
+    @staticmethod
+    def _render(turns: List[Dict[str, str]]) -> str:
+        return "\n".join(f"{'USUÁRIO' if t['role'] == 'user' else 'ASSISTENTE'}: {t['content']}" for t in turns)
+
+    async def summarize(self, previous: str, turns: List[Dict[str, str]]) -> str:
+        from src.core.llm_client import llm_client
+        from src.core.settings_manager import settings_manager
+        from src.core.token_budget import TokenCounter
+
+        budget = settings_manager.session_summary_tokens
+        prompt = f"RESUMO ATUAL:\n{previous or '(vazio)'}\n\nNOVOS TURNOS:\n{self._render(turns)}\n\nRESUMO ATUALIZADO:"
+        try:
+            response = await llm_client.generate(
+                prompt=prompt,
+                system_prompt=SUMMARY_SYSTEM_PROMPT,
+                temperature=0.1,
+                model=settings_manager.intent_model,
+                priority="ingestion" # Trabalho de fundo: nunca disputa vaga com chats
+            )
+            summary = (response.get("content") or "").strip()
+            if summary:
+                return TokenCounter.truncate(summary, budget)
+        except Exception as e:
+            logger.warning(f"⚠️ Resumo da sessão via LLM falhou ({e}). Usando resumo extrativo.")
+        return self.extractive_summary(previous, turns, budget)
+
+    @staticmethod
+    def extractive_summary(previous: str, turns: List[Dict[str, str]], budget_tokens: int) -> str:
+        """Fallback: the user's questions (first sentence of each answer) appended to the old summary, newest kept."""
+        from src.core.token_budget import TokenCounter
+        lines = []
+        for turn in turns:
+            content = " ".join(turn["content"].split())
+            if turn["role"] == "user":
+                lines.append(f"Usuário perguntou: {content[:200]}")
+            else:
+                first_sentence = re.split(r"(?<=[.!?])\s", content, maxsplit=1)[0]
+                lines.append(f"Assistente respondeu: {first_sentence[:200]}")
+        parts = [p for p in [previous] + lines if p]
+        while len(parts) > 1 and TokenCounter.count(" ".join(parts)) > budget_tokens:
+            parts.pop(0) # Descarta o mais antigo primeiro
+        return TokenCounter.truncate(" ".join(parts), budget_tokens)
+
+session_store = SessionStore()
@@ -14,19 +14,76 @@ DEFAULT_SETTINGS = {
     "vision_model": "llava",
     "llm_temperature": 0.1,
     "llm_top_k": 40, # Generation sampling
-    "llm_num_ctx": 8192, # Context Window (Tokens)
+    "llm_num_ctx": 8192, # Context Window (Tokens) - único valor enviado ao Ollama (intenção e resposta)
+    "dynamic_num_ctx": False, # Opt-in: menor degrau (2k/4k/8k...) por prompt; cada troca recarrega o runner
+    "context_output_reserve": 1024, # Tokens reservados para a resposta
+    "history_budget_ratio": 0.25, # Fração do contexto reservada ao histórico da conversa
+    "context_tokenizer": "google/gemma-3-27b-it", # Tokenizer HF (cache local); sem ele, estimativa por caracteres
     "system_prompt": "", # Empty means use default from file
+    "prompt_assembly_mode": "dynamic", # dynamic | stable_prefix (prefixo byte-idêntico entre turnos: reuso do KV cache do Ollama)
+    "llm_keep_alive": "30m", # Tempo que o Ollama mantém o modelo carregado ("" = padrão do servidor)
+    "model_routing_enabled": True, # Turnos simples vão ao modelo pequeno (sinais e limiares em model_router.py)
+    "model_routing_small_model": "gemma3:4b",
+    "model_routing_thresholds": {}, # Ex: {"context_tokens": 2000}; sinal acima do limite mantém o modelo grande
+    "vision_max_side": 896, # Lado máximo enviado ao modelo de visão (entrada nativa do Gemma 3)
+    "vision_max_tiles": 4, # Faixas máximas para digitalizações longas (perfil document)
+    "vision_document_enhance": True, # Escala de cinza + autocontraste em fotos de documentos
+    "image_cache_mb": 64, # Cache das imagens já codificadas (hash do conteúdo)
+    "session_compaction_tokens": 1500, # Turnos não compactados acima disso viram resumo (sessões server-side)
+    "session_recent_messages": 6, # Mensagens recentes mantidas literais após a compactação
+    "session_summary_tokens": 400, # Teto do resumo acumulado da sessão
+    "session_ttl_hours": 72, # Sessões sem atividade expiram
+    "chat_pipeline_mode": "two_pass", # two_pass | small_model (intenção no intent_model) | single_pass (sem chamada de intenção)
+    "intent_streaming": True, # JSON da intenção lido durante o stream: busca por keywords antecipada e parada precoce
+    "intent_model": "gemma3:1b", # Modelo pequeno usado no modo small_model
+    "local_intent_enabled": True, # Intent engine local (kNN + regras) antes do LLM
+    "local_intent_threshold": 0.7, # Fração mínima dos votos kNN no rótulo vencedor
+    "local_intent_min_similarity": 0.6, # Similaridade mínima com o exemplo mais próximo
+    "load_adaptive_enabled": True, # Degraus de qualidade conforme fila, lag do event loop e concorrência no Ollama
+    "load_shed_model": "gemma3:12b", # Modelo menor usado no degrau "survival"
+    "llm_max_concurrency": 4, # Chamadas simultâneas ao LLM (todas as faixas)
+    "llm_lane_limits": {}, # Ex: {"ingestion": 2}; padrões em llm_scheduler.py (interactive > intent > ingestion)
+    "llm_queue_timeouts": {}, # Segundos na fila antes do 503 (padrões em llm_scheduler.py)
     
     # Decisão / Escuta Ativa
     "active_listening_threshold": 0.85, # Ambiguity score to trigger confirmation (increased to be less sensitive)
     "min_relevance_score": 0.4, # Minimum partial score to context inclusion
     "rag_top_k": 50, # Number of documents to retrieve
+    "retrieval_mode": "flat", # flat | two_stage (documento -> chunks; requer índice de roteamento)
+    "speculative_retrieval": False, # Busca vetorial da mensagem crua em paralelo à extração de intenção
+    "speculative_similarity_threshold": 0.85, # Similaridade mínima mensagem x formal_query para reaproveitar
+    "routing_top_docs": 8, # Documentos mantidos pelo 1º estágio do two_stage
+    "gazette_partitioning": "year", # year | quarter | off (shards de Diários Oficiais por período)
+    "gazette_default_lookback_years": 0, # Opt-in: sem período explícito, só shards dos últimos N anos (0 = todos)
+    "mmr_enabled": True, # Diversifica os 5 slots de contexto (Maximal Marginal Relevance)
+    "mmr_lambda": 0.7, # 1.0 = só relevância; menor = mais diversidade
+    "mmr_candidate_pool": 20, # Candidatos do reranker considerados pelo MMR
+    "context_compression": True, # Mantém só as frases do parent relevantes à pergunta
+    "compression_keep_ratio": 0.4, # Fração de caracteres preservada por parent comprimido
+    "citation_lookup_enabled": True, # "Art. 5º, XI da CF" -> busca direta no índice de dispositivos (sem RAG)
+    "latency_budgets_ms": {}, # Ex: {"rerank": 1200}; estágio que estoura degrada (padrões em latency_budget.py, 0 = sem limite)
+    
+    # Cache de Respostas (invalidado por geração do corpus)
+    "answer_cache_enabled": True,
+    "answer_cache_ttl_hours": 24,
+    "answer_cache_max_entries": 2000,
+    "answer_cache_similarity": 0.95, # Similaridade mínima para reaproveitar pergunta quase idêntica
+    "request_coalescing": True, # Perguntas idênticas simultâneas compartilham uma única geração
+    
+    # Cache de Modelos (embeddings de consulta e scores do cross-encoder; memória + SQLite)
+    "model_cache_enabled": True,
+    "model_cache_memory_entries": 5000, # LRU em memória (L1)
+    "model_cache_max_rows": 200000, # Limite do arquivo SQLite (L2), despejo por último uso
     
     # OCR & Ingestion (Requires Re-indexing)
     "ocr_validation_threshold": 80.0, # Tesseract confidence to trigger Vision fallback
     "chunk_size": 3000,
     "chunk_overlap": 500,
     
+    # Índice Vetorial (HNSW) - space/M/construction_ef exigem recriar a coleção
+    "vector_index_profile": "balanced", # small | balanced | high_recall
+    "vector_index_overrides": {}, # Ex: {"search_ef": 96} (gerado por scripts/tune_hnsw.py)
+    
     # Sistema
     "context_window_size": 20, # Message History (Legacy/User View)
     
@@ -37,16 +94,18 @@ DEFAULT_SETTINGS = {
         "1. INTEGRAÇÃO DE CONTEXTO: Se houver 'CONTEXTO DA CONVERSA RECENTE', você DEVE mesclar o assunto da conversa com a mensagem atual para encontrar a intenção. Mensagens curtas como 'sobre a obra' tornam-se 'sobre a obra da CEDAE em Tinguá' graças ao contexto.\n"
         "2. AMBIGUIDADE (Regra de Ouro): Se a mensagem atual pode ser entendida lendo o histórico da conversa, `ambiguity_score` DEVE SER 0.1. SÓ DÊ um score > 0.85 se a mensagem for totalmente ininteligível mesmo com o histórico.\n"
         "3. ESFERA: Use 'municipal' se o contexto mencionar uma cidade. Senão, 'unknown'.\n"
-        "4. PALAVRAS-CHAVE: Extraia 2 a 5 termos absolutos para pesquisa (ex: ['CEDAE', 'obra', 'Tinguá']).\n\n"
-        "FORMATO DE SAÍDA OBRIGATÓRIO (APENAS JSON):\n"
+        "4. PALAVRAS-CHAVE: Extraia 2 a 5 termos absolutos para pesquisa (ex: ['CEDAE', 'obra', 'Tinguá']).\n"
+        "5. PERÍODO: Se o usuário mencionar datas ou períodos ('em 2023', 'desde março de 2024'), preencha `date_range` com datas ISO (AAAA-MM-DD). Senão, deixe null.\n\n"
+        "FORMATO DE SAÍDA OBRIGATÓRIO (APENAS JSON, NESTA ORDEM DE CAMPOS):\n"
         "{\n"
         '  "search_needed": true,\n'
         '  "is_confirmation": false,\n'
+        '  "sphere": "unknown",\n'
+        '  "date_range": {"start": null, "end": null},\n'
         '  "keywords": ["termo1", "termo2"],\n'
         '  "formal_query": "frase completa e clara com base no histórico",\n'
-        '  "understood_intent": "resumo",\n'
-        '  "sphere": "unknown",\n'
-        '  "ambiguity_score": 0.1\n'
+        '  "ambiguity_score": 0.1,\n'
+        '  "understood_intent": "resumo"\n'
         "}"
     )
 }
@@ -152,4 +211,208 @@ class SettingsManager:
     def chunk_overlap(self) -> int:
         return int(self._settings.get("chunk_overlap", 500))
 
+    @property
+    def retrieval_mode(self) -> str:
+        return self._settings.get("retrieval_mode", "flat")
+
+    @property
+    def speculative_retrieval(self) -> bool:
+        return bool(self._settings.get("speculative_retrieval", False))
+
+    @property
+    def speculative_similarity_threshold(self) -> float:
+        return float(self._settings.get("speculative_similarity_threshold", 0.85))
+
+    @property
+    def routing_top_docs(self) -> int:
+        return int(self._settings.get("routing_top_docs", 8))
+
+    @property
+    def gazette_partitioning(self) -> str:
+        return self._settings.get("gazette_partitioning", "year")
+
+    @property
+    def gazette_default_lookback_years(self) -> int:
+        return int(self._settings.get("gazette_default_lookback_years", 0))
+
+    @property
+    def intent_streaming(self) -> bool:
+        return bool(self._settings.get("intent_streaming", True))
+
+    @property
+    def chat_pipeline_mode(self) -> str:
+        return self._settings.get("chat_pipeline_mode", "two_pass")
+
+    @property
+    def intent_model(self) -> str:
+        return self._settings.get("intent_model", "gemma3:1b")
+
+    @property
+    def local_intent_enabled(self) -> bool:
+        return bool(self._settings.get("local_intent_enabled", True))
+
+    @property
+    def local_intent_threshold(self) -> float:
+        return float(self._settings.get("local_intent_threshold", 0.7))
+
+    @property
+    def local_intent_min_similarity(self) -> float:
+        return float(self._settings.get("local_intent_min_similarity", 0.6))
+
+    @property
+    def dynamic_num_ctx(self) -> bool:
+        return bool(self._settings.get("dynamic_num_ctx", False))
+
+    @property
+    def context_output_reserve(self) -> int:
+        return int(self._settings.get("context_output_reserve", 1024))
+
+    @property
+    def history_budget_ratio(self) -> float:
+        return float(self._settings.get("history_budget_ratio", 0.25))
+
+    @property
+    def context_tokenizer(self) -> str:
+        return self._settings.get("context_tokenizer", "google/gemma-3-27b-it")
+
+    @property
+    def mmr_enabled(self) -> bool:
+        return bool(self._settings.get("mmr_enabled", True))
+
+    @property
+    def mmr_lambda(self) -> float:
+        return float(self._settings.get("mmr_lambda", 0.7))
+
+    @property
+    def mmr_candidate_pool(self) -> int:
+        return int(self._settings.get("mmr_candidate_pool", 20))
+
+    @property
+    def context_compression(self) -> bool:
+        return bool(self._settings.get("context_compression", True))
+
+    @property
+    def compression_keep_ratio(self) -> float:
+        return float(self._settings.get("compression_keep_ratio", 0.4))
+
+    @property
+    def citation_lookup_enabled(self) -> bool:
+        return bool(self._settings.get("citation_lookup_enabled", True))
+
+    @property
+    def answer_cache_enabled(self) -> bool:
+        return bool(self._settings.get("answer_cache_enabled", True))
+
+    @property
+    def answer_cache_ttl_hours(self) -> float:
+        return float(self._settings.get("answer_cache_ttl_hours", 24))
+
+    @property
+    def answer_cache_max_entries(self) -> int:
+        return int(self._settings.get("answer_cache_max_entries", 2000))
+
+    @property
+    def answer_cache_similarity(self) -> float:
+        return float(self._settings.get("answer_cache_similarity", 0.95))
+
+    @property
+    def request_coalescing(self) -> bool:
+        return bool(self._settings.get("request_coalescing", True))
+
+    @property
+    def model_cache_enabled(self) -> bool:
+        return bool(self._settings.get("model_cache_enabled", True))
+
+    @property
+    def model_cache_memory_entries(self) -> int:
+        return int(self._settings.get("model_cache_memory_entries", 5000))
+
+    @property
+    def model_cache_max_rows(self) -> int:
+        return int(self._settings.get("model_cache_max_rows", 200000))
+
+    @property
+    def latency_budgets_ms(self) -> Dict[str, Any]:
+        return dict(self._settings.get("latency_budgets_ms") or {})
+
+    @property
+    def load_adaptive_enabled(self) -> bool:
+        return bool(self._settings.get("load_adaptive_enabled", True))
+
+    @property
+    def load_shed_model(self) -> str:
+        return self._settings.get("load_shed_model", "gemma3:12b")
+
+    @property
+    def llm_max_concurrency(self) -> int:
+        return int(self._settings.get("llm_max_concurrency", 4))
+
+    @property
+    def llm_lane_limits(self) -> Dict[str, Any]:
+        return dict(self._settings.get("llm_lane_limits") or {})
+
+    @property
+    def llm_queue_timeouts(self) -> Dict[str, Any]:
+        return dict(self._settings.get("llm_queue_timeouts") or {})
+
+    @property
+    def prompt_assembly_mode(self) -> str:
+        return self._settings.get("prompt_assembly_mode", "dynamic")
+
+    @property
+    def llm_keep_alive(self) -> str:
+        return self._settings.get("llm_keep_alive", "30m")
+
+    @property
+    def model_routing_enabled(self) -> bool:
+        return bool(self._settings.get("model_routing_enabled", True))
+
+    @property
+    def model_routing_small_model(self) -> str:
+        return self._settings.get("model_routing_small_model", "gemma3:4b")
+
+    @property
+    def model_routing_thresholds(self) -> Dict[str, Any]:
+        return dict(self._settings.get("model_routing_thresholds") or {})
+
+    @property
+    def vision_max_side(self) -> int:
+        return int(self._settings.get("vision_max_side", 896))
+
+    @property
+    def vision_max_tiles(self) -> int:
+        return int(self._settings.get("vision_max_tiles", 4))
+
+    @property
+    def vision_document_enhance(self) -> bool:
+        return bool(self._settings.get("vision_document_enhance", True))
+
+    @property
+    def image_cache_mb(self) -> int:
+        return int(self._settings.get("image_cache_mb", 64))
+
+    @property
+    def session_compaction_tokens(self) -> int:
+        return int(self._settings.get("session_compaction_tokens", 1500))
+
+    @property
+    def session_recent_messages(self) -> int:
+        return int(self._settings.get("session_recent_messages", 6))
+
+    @property
+    def session_summary_tokens(self) -> int:
+        return int(self._settings.get("session_summary_tokens", 400))
+
+    @property
+    def session_ttl_hours(self) -> float:
+        return float(self._settings.get("session_ttl_hours", 72))
+
+    @property
+    def vector_index_profile(self) -> str:
+        return self._settings.get("vector_index_profile", "balanced")
+
+    @property
+    def vector_index_overrides(self) -> Dict[str, Any]:
+        return dict(self._settings.get("vector_index_overrides") or {})
+
 settings_manager = SettingsManager()
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StreamBroadcast:
+    """
+    Fans out one async iterator (e.g. an NDJSON token stream) to many subscribers.
+    The source is consumed by a background task, so the generation keeps going even if the
+    client that started it disconnects. Late subscribers replay the events from the start.
+    """
+
+    def __init__(self, source: AsyncIterator[Any]):
+        self._events: List[Any] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._cond = asyncio.Condition()
+        self._callbacks: List[Callable[[], None]] = []
+        self._task = asyncio.create_task(self._pump(source))
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def on_complete(self, callback: Callable[[], None]):
+        if self._done:
+            callback()
+        else:
+            self._callbacks.append(callback)
+
+    async def _pump(self, source: AsyncIterator[Any]):
+        try:
+            async for event in source:
+                async with self._cond:
+                    self._events.append(event)
+                    self._cond.notify_all()
+        except Exception as e:
+            logger.error(f"❌ Stream compartilhado falhou: {e}")
+            self._error = e
+        finally:
+            async with self._cond:
+                self._done = True
+                self._cond.notify_all()
+            for callback in self._callbacks:
+                callback()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: index < len(self._events) or self._done)
+                pending = self._events[index:]
+                finished = self._done
+            for event in pending:
+                yield event
+            index += len(pending)
+            if finished and index >= len(self._events):
+                if self._error:
+                    raise self._error
+                return
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller (leader) runs the work,
+    the others await its result. Stream results (StreamBroadcast) keep the flight open until
+    the stream ends, so requests arriving mid-generation still join it.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def _forget(self, key: str, flight: asyncio.Future):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Returns (result, shared). shared=True when the result came from another caller's flight.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            # shield: um seguidor que desiste não cancela o trabalho do líder
+            return await asyncio.shield(flight), True
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._forget(key, flight)
+            if isinstance(e, asyncio.CancelledError):
+                flight.cancel()
+            else:
+                flight.set_exception(e)
+                flight.exception() # Marca como lida (sem seguidores não há quem a receba)
+            raise
+
+        flight.set_result(result)
+        if isinstance(result, StreamBroadcast):
+            result.on_complete(lambda: self._forget(key, flight))
+        else:
+            self._forget(key, flight)
+        return result, False
@@ -0,0 +1,147 @@
+import logging
+import math
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Degraus de num_ctx: o KV cache do Ollama é alocado pelo num_ctx pedido, não pelo prompt real.
+NUM_CTX_LADDER = (2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+# Gemma (SentencePiece, 256k vocab) fica em ~3.5-4 chars/token em português.
+# A estimativa usa 3.2 para errar para cima (nunca estourar o contexto).
+FALLBACK_CHARS_PER_TOKEN = 3.2
+
+
+class TokenCounter:
+    """
+    Counts tokens with the tokenizer of the configured Gemma model.
+    The tokenizer is loaded lazily and only from the local Hugging Face cache
+    (no downloads in the request path); without it a conservative char-based estimate is used.
+    """
+
+    _tokenizer = None
+    _tokenizer_name = None
+    _load_failed = False
+
+    @classmethod
+    def get_tokenizer(cls):
+        from src.core.settings_manager import settings_manager
+        name = settings_manager.context_tokenizer
+        if name != cls._tokenizer_name:
+            cls._tokenizer, cls._tokenizer_name, cls._load_failed = None, name, False
+
+        if cls._tokenizer is None and not cls._load_failed and name:
+            try:
+                from transformers import AutoTokenizer
+                cls._tokenizer = AutoTokenizer.from_pretrained(name, local_files_only=True)
+                logger.info(f"🔢 Tokenizer carregado: {name}")
+            except Exception as e:
+                cls._load_failed = True
+                logger.warning(f"⚠️ Tokenizer '{name}' indisponível localmente ({type(e).__name__}). Usando estimativa por caracteres.")
+        return cls._tokenizer
+
+    @classmethod
+    def is_exact(cls) -> bool:
+        """True when counts come from the model's tokenizer rather than the char-based estimate."""
+        return cls.get_tokenizer() is not None
+
+    @classmethod
+    def count(cls, text: str) -> int:
+        if not text:
+            return 0
+        tokenizer = cls.get_tokenizer()
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False))
+        return math.ceil(len(text) / FALLBACK_CHARS_PER_TOKEN)
+
+    @classmethod
+    def truncate(cls, text: str, max_tokens: int) -> str:
+        """Cuts text to at most max_tokens (prefix)."""
+        if max_tokens <= 0:
+            return ""
+        tokenizer = cls.get_tokenizer()
+        if tokenizer is not None:
+            ids = tokenizer.encode(text, add_special_tokens=False)
+            return text if len(ids) <= max_tokens else tokenizer.decode(ids[:max_tokens])
+        return text[:int(max_tokens * FALLBACK_CHARS_PER_TOKEN)]
+
+
+def select_num_ctx(required_tokens: int, max_ctx: int) -> int:
+    """Smallest ladder step holding the request, capped at the configured maximum."""
+    for step in NUM_CTX_LADDER:
+        if step >= required_tokens:
+            return min(step, max_ctx)
+    return max_ctx
+
+
+def focus_window(text: str, focus: Optional[str], max_tokens: int) -> str:
+    """
+    Truncates a parent around the micro chunk that matched the query, growing the window
+    symmetrically. Without a locatable focus the beginning of the parent is kept.
+    """
+    if TokenCounter.count(text) <= max_tokens:
+        return text
+
+    start = text.find(focus[:200]) if focus else -1
+    if start < 0:
+        return TokenCounter.truncate(text, max_tokens) + " [...]"
+
+    # Approximate the window in characters and tighten until it fits
+    ratio = len(text) / max(TokenCounter.count(text), 1)
+    width = int(max_tokens * ratio)
+    while width > 0:
+        center = start + min(len(focus), width) // 2
+        lo = max(0, center - width // 2)
+        hi = min(len(text), lo + width)
+        lo = max(0, hi - width)
+        window = ("[...] " if lo > 0 else "") + text[lo:hi] + (" [...]" if hi < len(text) else "")
+        if TokenCounter.count(window) <= max_tokens:
+            return window
+        width = int(width * 0.9)
+    return ""
+
+
+class ContextPacker:
+    """
+    Fills a token budget with retrieved documents in relevance order.
+    Documents that do not fit entirely are cut around their matched micro chunk;
+    the rest is dropped once less than min_doc_tokens remain.
+    """
+
+    def __init__(self, min_doc_tokens: int = 120):
+        self.min_doc_tokens = min_doc_tokens
+
+    def pack(self, docs: List[Dict[str, Any]], budget_tokens: int, header_tokens: int = 60) -> Tuple[List[Dict[str, Any]], int]:
+        packed = []
+        used = 0
+        for doc in sorted(docs, key=lambda d: d.get("score", 0), reverse=True):
+            remaining = budget_tokens - used - header_tokens
+            if remaining < self.min_doc_tokens:
+                break
+            content = doc["content"]
+            tokens = TokenCounter.count(content)
+            if tokens > remaining:
+                content = focus_window(content, doc.get("match"), remaining)
+                if not content:
+                    continue
+                tokens = TokenCounter.count(content)
+            packed_doc = doc.copy()
+            packed_doc["content"] = content
+            packed.append(packed_doc)
+            used += tokens + header_tokens
+        return packed, used
+
+    def trim_history(self, messages: List[Any], budget_tokens: int) -> List[Any]:
+        """Keeps the most recent messages that fit in the budget."""
+        kept = []
+        used = 0
+        for msg in reversed(messages or []):
+            tokens = TokenCounter.count(msg.content) + 4
+            if used + tokens > budget_tokens:
+                break
+            kept.append(msg)
+            used += tokens
+        return list(reversed(kept))
+
+
+context_packer = ContextPacker()
@@ -0,0 +1,65 @@
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Perfis HNSW para a coleção vetorial.
+# space / M / construction_ef só têm efeito na CRIAÇÃO da coleção (exigem reindexação).
+# search_ef controla o trade-off recall x latência em tempo de consulta.
+HNSW_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Corpus pequeno (< 50k micro chunks): grafo enxuto, build rápido
+    "small": {"space": "cosine", "M": 16, "construction_ef": 100, "search_ef": 64},
+    # Padrão: anos de diários oficiais em um único nó
+    "balanced": {"space": "cosine", "M": 32, "construction_ef": 200, "search_ef": 128},
+    # Corpus grande (> 1M micro chunks) ou recall prioritário
+    "high_recall": {"space": "cosine", "M": 48, "construction_ef": 400, "search_ef": 256},
+}
+
+DEFAULT_PROFILE = "balanced"
+VALID_SPACES = {"cosine", "l2", "ip"}
+
+
+def resolve_profile(name: Optional[str] = None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Returns the effective HNSW parameters: named profile + per-deployment overrides
+    (usually written by scripts/tune_hnsw.py).
+    """
+    if name not in HNSW_PROFILES:
+        if name:
+            logger.warning(f"⚠️ Perfil HNSW '{name}' desconhecido. Usando '{DEFAULT_PROFILE}'.")
+        name = DEFAULT_PROFILE
+
+    params = HNSW_PROFILES[name].copy()
+    for key, value in (overrides or {}).items():
+        if key in params:
+            params[key] = value
+
+    if params["space"] not in VALID_SPACES:
+        logger.warning(f"⚠️ Espaço HNSW inválido '{params['space']}'. Usando 'cosine'.")
+        params["space"] = "cosine"
+    return params
+
+
+def collection_metadata(name: Optional[str] = None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Builds the Chroma collection metadata (hnsw:* keys) for a profile.
+    """
+    params = resolve_profile(name, overrides)
+    return {
+        "hnsw:space": params["space"],
+        "hnsw:M": int(params["M"]),
+        "hnsw:construction_ef": int(params["construction_ef"]),
+        "hnsw:search_ef": int(params["search_ef"]),
+    }
+
+
+def distance_to_similarity(distance: float, space: str) -> float:
+    """
+    Converts a Chroma distance into a similarity in [0, 1] (approx.) for the given space.
+    - cosine: distance = 1 - cos
+    - ip: distance = 1 - dot (embeddings normalizados => dot == cos)
+    - l2: distance = ||a - b||² (normalizados => 2 - 2cos)
+    """
+    if space == "l2":
+        return 1 - (distance / 2)
+    return 1 - distance
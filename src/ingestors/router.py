@@ -128,7 +128,8 @@ class IngestionRouter:
             if Path(file_path).suffix.lower() in [".jpg", ".jpeg", ".png", ".webp"]:
                 logger.info("Texto insuficiente no Docling. Tentando Gemma Vision Fallback.")
                 # Call OCR Engine for Vision logic (reusing existing code)
-                vision_result = await ocr_engine.process_document(file_path, doc_type="foto_denuncia")
+                # Foto de documento: escala de cinza + contraste e faixas para digitalizações longas
+                vision_result = await ocr_engine.process_document(file_path, doc_type="foto_denuncia", image_profile="document")
                 return {
                     "extracted_text": vision_result.get("extracted_text"),
                     "ocr_method": vision_result.get("ocr_method"),
@@ -68,13 +68,26 @@ async def startup_event():
     _ = db_manager.chroma_client
     await db_manager.get_sqlite()
     
+    # Pools de conexão com os nós Ollama (keep-alive compartilhado por todos os turnos)
+    from src.core.llm_client import llm_client
+    await llm_client.start()
+    
     # Background Maintenance
     import asyncio
     from src.utils.maintenance import cleanup_stale_uploads_periodically
     asyncio.create_task(cleanup_stale_uploads_periodically())
+    
+    # Load-adaptive quality tiers (lag do event loop + reavaliação periódica)
+    from src.core.load_controller import load_controller
+    asyncio.create_task(load_controller.monitor())
+    
+    # Health probes dos backends Ollama (circuit breaker + afinidade de modelo)
+    asyncio.create_task(llm_client.backends.monitor())
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    from src.core.llm_client import llm_client
+    await llm_client.close()
     await db_manager.close()
 
 @app.get("/", include_in_schema=False)
@@ -265,6 +265,145 @@ async def purge_vector_cache():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/vector/routing/rebuild", dependencies=[Depends(require_permission("manage_users"))])
+async def rebuild_routing_index():
+    """
+    Rebuilds the document-level routing index (two-stage retrieval) for all active documents.
+    """
+    try:
+        result = await db_manager.rebuild_routing_index()
+        return {"status": "success", "message": f"Índice de roteamento reconstruído ({result['documents']} documentos).", "details": result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/citations/rebuild", dependencies=[Depends(require_permission("manage_users"))])
+async def rebuild_citation_index():
+    """
+    Rebuilds the legal citation index (law/article/paragraph/inciso -> parent chunk).
+    """
+    try:
+        result = await db_manager.rebuild_citation_index()
+        return {"status": "success", "message": f"Índice de citações reconstruído ({result['provisions']} dispositivos).", "details": result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/answer-cache/clear", dependencies=[Depends(require_permission("manage_users"))])
+async def clear_answer_cache():
+    """
+    Drops every cached chat answer (e.g. after editing the system prompt).
+    """
+    try:
+        from src.core.answer_cache import answer_cache
+        count = await answer_cache.clear()
+        return {"status": "success", "message": f"{count} respostas removidas do cache."}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/model-cache/clear", dependencies=[Depends(require_permission("manage_users"))])
+async def clear_model_cache():
+    """
+    Drops cached query embeddings and rerank scores (e.g. after swapping a model).
+    """
+    try:
+        from src.core.model_cache import model_cache
+        stats = dict(model_cache.stats)
+        model_cache.clear()
+        return {"status": "success", "stats": stats}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/load", dependencies=[Depends(require_permission("view_analytics"))])
+async def get_load_status():
+    """
+    Current quality tier, load signals and recent tier transitions.
+    """
+    from src.core.load_controller import load_controller
+    load_controller.evaluate()
+    return load_controller.snapshot()
+
+@router.get("/llm/backends", dependencies=[Depends(require_permission("view_analytics"))])
+async def get_llm_backends():
+    """
+    Ollama nodes: circuit state, in-flight requests and loaded/installed models.
+    """
+    from src.core.llm_client import llm_client
+    return {"backends": llm_client.backends.snapshot()}
+
+@router.get("/llm/metrics", dependencies=[Depends(require_permission("view_analytics"))])
+async def get_llm_metrics():
+    """
+    Per-model Ollama statistics: decode tokens/s, prefill cost, prompt sizes and cold loads.
+    """
+    from src.core.llm_metrics import llm_metrics
+    return llm_metrics.snapshot()
+
+@router.get("/llm/routing", dependencies=[Depends(require_permission("view_analytics"))])
+async def get_model_routing():
+    """
+    Small/large model routing: thresholds in effect, decision counts and recent reasons.
+    """
+    from src.core.model_router import model_router
+    return model_router.snapshot()
+
+@router.get("/llm/scheduler", dependencies=[Depends(require_permission("view_analytics"))])
+async def get_llm_scheduler():
+    """
+    LLM admission lanes: running/queued calls, limits, rejections and queue wait times.
+    """
+    from src.core.llm_scheduler import llm_scheduler
+    return llm_scheduler.snapshot()
+
+class ShardCompactRequest(BaseModel):
+    year: int
+
+@router.get("/vector/shards", dependencies=[Depends(require_permission("manage_users"))])
+async def list_vector_shards():
+    """
+    Lists the time-partitioned gazette collections (period, hot/cold, chunk count).
+    """
+    try:
+        shards = await db_manager.list_vector_shards()
+        return {"status": "success", "shards": shards}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/vector/shards/compact", dependencies=[Depends(require_permission("manage_users"))])
+async def compact_vector_shards(request: ShardCompactRequest):
+    """
+    Merges the quarterly gazette shards of a closed year into one yearly shard.
+    """
+    if request.year >= date.today().year:
+        raise HTTPException(status_code=400, detail="Só é possível compactar anos já encerrados.")
+    try:
+        result = await db_manager.compact_gazette_shards(request.year)
+        return {"status": "success", "message": f"{len(result['merged'])} shards compactados.", "details": result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/vector/shards/migrate-legacy", dependencies=[Depends(require_permission("manage_users"))])
+async def migrate_legacy_gazettes():
+    """
+    Moves gazettes indexed before partitioning from the main collection into their period shards.
+    """
+    try:
+        result = await db_manager.migrate_legacy_gazettes()
+        return {"status": "success", "message": f"{result['documents']} diários migrados.", "details": result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/vector/shards/{name}/offload", dependencies=[Depends(require_permission("manage_users"))])
+async def offload_vector_shard(name: str):
+    """
+    Moves an old gazette shard to cold storage. It is only searched for explicit date ranges.
+    """
+    try:
+        result = await db_manager.offload_gazette_shard(name)
+        return {"status": "success", "message": f"Shard {name} movido para armazenamento frio.", "details": result}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # --- Staging Area (Quarentena) ---
 
 @router.get("/staging", dependencies=[Depends(require_permission("moderate_alerts"))])
@@ -5,9 +5,12 @@ from typing import List, Optional
 from src.core.llm_client import llm_client
 from src.utils.security import anonymize_user
 from src.utils.privacy import pii_scrubber
+from src.core.single_flight import SingleFlight
+from src.core.llm_scheduler import LLMQueueTimeout
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
+chat_flights = SingleFlight()
 
 class Message(BaseModel):
     role: str # 'user' or 'assistant'
@@ -19,27 +22,200 @@ class ChatRequest(BaseModel):
     fingerprint: Optional[str] = None # Device fingerprint
     history: Optional[List[Message]] = None
     scratchpad: Optional[str] = None # Session Memory Notepad
+    session_id: Optional[str] = None # Sessão server-side (POST /sessions): dispensa history/scratchpad
     images: Optional[List[str]] = None
     # Active Listening Fields
     confirmation_mode: bool = False
     pending_intent: Optional[str] = None
+    # Filtro de período (ISO) - ex: Diários Oficiais de um ano específico
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
     stream: bool = True # Default to Premium Streaming
 
-async def interpret_intent(message: str, history: Optional[List[Message]] = None, scratchpad: Optional[str] = None) -> dict:
+# Palavras sem valor de busca (modo single_pass extrai keywords localmente)
+PT_STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "de", "do", "da", "dos", "das", "em", "no", "na", "nos", "nas",
+    "e", "ou", "que", "qual", "quais", "quem", "como", "onde", "quando", "por", "para", "pra", "com",
+    "sem", "sobre", "se", "me", "eu", "voce", "você", "é", "foi", "ser", "tem", "há", "ao", "aos",
+    "isso", "isto", "esse", "essa", "este", "esta", "meu", "minha", "seu", "sua", "mais", "muito",
+    "fala", "diz", "dizer", "saber", "quero", "gostaria", "pode", "poderia", "existe", "alguma", "algum"
+}
+
+def single_pass_intent(message: str, history: Optional[List[Message]] = None) -> dict:
+    """
+    Intenção sem chamada ao LLM (chat_pipeline_mode = 'single_pass').
+    A busca usa a própria mensagem (+ a última pergunta do usuário, para follow-ups curtos);
+    a resolução de referências fica com o modelo de resposta, numa única geração.
+    """
+    import re
+    query = message
+    if history and len(message.split()) <= 6:
+        previous = [m.content for m in history if m.role == "user"]
+        if previous:
+            query = f"{previous[-1]} {message}"
+    
+    words = re.findall(r"[\wÀ-ÿ]+", query.lower())
+    keywords = list(dict.fromkeys(w for w in words if w not in PT_STOPWORDS and len(w) > 2))[:8]
+    return {
+        "search_needed": True,
+        "is_confirmation": False,
+        "keywords": keywords,
+        "formal_query": query,
+        "understood_intent": message,
+        "sphere": "unknown",
+        "ambiguity_score": 0.0,
+        "pipeline_mode": "single_pass"
+    }
+
+def vector_search(db_manager, settings_manager, query: str, where: Optional[dict] = None, date_range=None,
+                  limit: Optional[int] = None):
+    """Vector search coroutine for the configured retrieval mode (flat | two_stage)."""
+    limit = limit or settings_manager.rag_top_k
+    if settings_manager.retrieval_mode == "two_stage":
+        # Documento -> Chunks: custo cresce com nº de docs relevantes, não com o corpus
+        return db_manager.search_documents_two_stage(
+            query,
+            limit=limit,
+            where=where,
+            top_docs=settings_manager.routing_top_docs,
+            date_range=date_range
+        )
+    return db_manager.search_documents(
+        query, 
+        limit=limit,
+        where=where,
+        date_range=date_range
+    )
+
+def query_similarity(a: str, b: str) -> float:
+    """Cosine between two queries (shared embedder); token Jaccard when the embedder is unavailable."""
+    if a.strip().lower() == b.strip().lower():
+        return 1.0
+    try:
+        from src.core.embedder import embedder
+        vectors = embedder.encode([a, b])
+        return float(vectors[0] @ vectors[1])
+    except Exception:
+        import re
+        ta = set(re.findall(r"[\wÀ-ÿ]+", a.lower())) - PT_STOPWORDS
+        tb = set(re.findall(r"[\wÀ-ÿ]+", b.lower())) - PT_STOPWORDS
+        return len(ta & tb) / len(ta | tb) if ta | tb else 0.0
+
+async def _tracked(coro):
+    """
+    Counts the request in the load controller's queue depth while the pipeline runs and,
+    for streams, again from the first to the last NDJSON line. A stream dropped before its
+    body starts is never counted twice, so it cannot leave the queue depth raised.
+    """
+    from fastapi.responses import StreamingResponse
+    from src.core.load_controller import load_controller
+    
+    load_controller.request_started()
+    try:
+        response = await coro
+    finally:
+        load_controller.request_finished()
+    if not isinstance(response, StreamingResponse):
+        return response
+    
+    body = response.body_iterator
+    async def tracked_stream():
+        load_controller.request_started()
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            load_controller.request_finished()
+    response.body_iterator = tracked_stream()
+    return response
+
+async def _timed(coro):
+    """Runs a coroutine and returns (result, elapsed_seconds)."""
+    import time
+    start = time.perf_counter()
+    result = await coro
+    return result, time.perf_counter() - start
+
+# Campos da intenção que o pipeline usa; `understood_intent` só importa para a pergunta de esclarecimento
+INTENT_PIPELINE_FIELDS = ("search_needed", "is_confirmation", "sphere", "date_range", "keywords", "formal_query", "ambiguity_score")
+
+def intent_fields_complete(fields: dict) -> bool:
+    """True once the streamed intent holds everything the pipeline acts on (stop generating there)."""
+    from src.core.settings_manager import settings_manager
+    if not all(key in fields for key in INTENT_PIPELINE_FIELDS):
+        return False
+    try:
+        ambiguous = float(fields["ambiguity_score"]) > settings_manager.active_listening_threshold
+    except (TypeError, ValueError):
+        ambiguous = True
+    return not ambiguous or "understood_intent" in fields
+
+def resolve_date_range(request: ChatRequest, intent_data: dict):
+    """Turn period: the UI filter takes precedence over the range extracted by the intent."""
+    from src.core.gazette_shards import normalize_date_range
+    intent_range = intent_data.get("date_range") or {}
+    if not isinstance(intent_range, dict):
+        intent_range = {}
+    return normalize_date_range(
+        request.date_from or intent_range.get("start"),
+        request.date_to or intent_range.get("end")
+    )
+
+def keyword_search_args(request: ChatRequest, intent_data: dict, final_query: str) -> tuple:
+    """(FTS query, sphere filter, date range) for the keyword stage; shared by the early and the regular search."""
+    search_keywords = intent_data.get("keywords") or (final_query or "").split()
+    keyword_query_str = " ".join(map(str, search_keywords)) if isinstance(search_keywords, list) else str(search_keywords)
+    sphere = intent_data.get("sphere", "unknown")
+    return keyword_query_str, sphere if sphere != "unknown" else None, resolve_date_range(request, intent_data)
+
+def _discard_task(task):
+    """Cancels a background search nobody will await; its error (if any) is consumed, not logged as unretrieved."""
+    if task:
+        task.cancel()
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+def _discard_early_search(early_keyword: dict):
+    _discard_task(early_keyword.pop("task", None))
+
+async def interpret_intent(message: str, history: Optional[List[Message]] = None, scratchpad: Optional[str] = None,
+                           on_field=None) -> dict:
     """
     Motor Silencioso de Raciocínio (Backend).
     Função: Extrair termos de busca para o RAG e detectar se precisa de busca.
     NÃO gera texto de conversa. Usa o histórico para disambiguação de contexto.
+    
+    Modo (settings_manager.chat_pipeline_mode):
+    - two_pass: modelo principal em JSON mode, depois a resposta (padrão).
+    - small_model: a extração roda num modelo pequeno (intent_model).
+    - single_pass: sem chamada de intenção; uma única geração por turno.
+    Nos dois primeiros, o intent engine local responde antes quando está confiante.
+    Com intent_streaming, o JSON é lido enquanto é gerado: `on_field(key, value)` recebe cada
+    campo ao fechar e a geração é interrompida quando os campos do pipeline estão completos.
     """
     
     # Prompt focado puramente em lógica e extração de dados
     from src.core.settings_manager import settings_manager
+    pipeline_mode = settings_manager.chat_pipeline_mode
+    if pipeline_mode == "single_pass":
+        return single_pass_intent(message, history)
+    
+    # Fast path local (kNN + regras): cumprimentos e perguntas autossuficientes dispensam o LLM
+    if settings_manager.local_intent_enabled:
+        from src.reasoning.intent_engine import intent_engine
+        local_intent = await intent_engine.interpret(message, history)
+        if local_intent:
+            return local_intent
+    
+    intent_model = settings_manager.intent_model if pipeline_mode == "small_model" else None
     system_prompt = settings_manager.intent_prompt
     
     history_str = ""
     if history:
         history_str = "CONTEXTO DA CONVERSA RECENTE:\n"
         for msg in history:
+            if msg.role == "system": # Resumo de sessão compactada
+                history_str += f"{msg.content}\n"
+                continue
             role_name = "USUÁRIO" if msg.role == "user" else "ASSISTENTE"
             history_str += f"{role_name}: {msg.content}\n"
         history_str += "\n"
@@ -51,12 +227,24 @@ async def interpret_intent(message: str, history: Optional[List[Message]] = None
     prompt = f"{scratchpad_str}{history_str}Input usuário: '{message}'"
     
     try:
+        if settings_manager.intent_streaming:
+            return await llm_client.generate_json_fields(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                is_complete=intent_fields_complete,
+                on_field=on_field,
+                temperature=0.1,
+                model=intent_model,
+                priority="intent"
+            )
         # Force JSON mode
         response = await llm_client.generate(
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.1, # Temperatura baixa para precisão lógica
-            json_mode=True
+            json_mode=True,
+            model=intent_model,
+            priority="intent"
         )
         import json
         return json.loads(response["content"])
@@ -70,6 +258,123 @@ async def interpret_intent(message: str, history: Optional[List[Message]] = None
             "ambiguity_score": 0.0
         }
 
+async def serve_cached_answer(request: ChatRequest, cached: dict, intent_data: dict, user_hash: str, db_manager):
+    """
+    Replays a cached answer in the same formats as a generated one (NDJSON stream or JSON).
+    """
+    import json
+    from datetime import datetime
+    from fastapi.responses import StreamingResponse
+    
+    intent_data["answer_cache"] = {"hit": True, "match": cached["match"], "similarity": round(cached["similarity"], 3)}
+    audit_details = json.dumps({"intent": intent_data, "cache_hit": True, "rag_count": len(cached["citations"])}, default=str)
+    
+    async def log_hit(action: str):
+        await db_manager.log_audit(
+            action=action,
+            user_hash=user_hash,
+            query_text=request.message,
+            response_text=cached["response"],
+            sources_json=json.dumps(cached["citations"], default=str),
+            confidence_score=1.0,
+            details=audit_details
+        )
+    
+    if request.stream:
+        async def event_generator():
+            if cached["citations"]:
+                yield json.dumps({"type": "citations", "data": cached["citations"]}) + "\n"
+            yield json.dumps({"type": "reasoning", "data": {"intent": intent_data, "system_prompt": ""}}) + "\n"
+            text = cached["response"]
+            for i in range(0, len(text), 48):
+                yield json.dumps({"type": "token", "content": text[i:i + 48]}) + "\n"
+            await log_hit("chat_cache_hit_stream")
+            yield json.dumps({"type": "done", "status": "complete", "cached": True}) + "\n"
+        return StreamingResponse(event_generator(), media_type="application/x-ndjson")
+    
+    await log_hit("chat_cache_hit_standard")
+    return {
+        "response": cached["response"],
+        "metadata": {
+            "model": "answer_cache",
+            "timestamp": datetime.utcnow().isoformat(),
+            "citations": cached["citations"],
+            "cached": True
+        }
+    }
+
+def coalesce_key(request: ChatRequest, runtime_settings: dict) -> str:
+    """
+    Identity of a chat turn for single-flight: scrubbed message, response format, period
+    filter and the full runtime settings (model, sampling, prompts...).
+    """
+    import hashlib
+    import json
+    payload = json.dumps(
+        [request.message.strip().lower(), request.stream, request.date_from, request.date_to, runtime_settings],
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+async def _log_coalesced(request: ChatRequest, user_hash: str, action: str, response_text: str, citations: list):
+    """Audit entry for a follower served by another request's generation."""
+    import json
+    from src.core.database import db_manager
+    await db_manager.log_audit(
+        action=action,
+        user_hash=user_hash,
+        query_text=request.message,
+        response_text=pii_scrubber.scrub(response_text),
+        sources_json=json.dumps(citations, default=str),
+        confidence_score=0.0,
+        details=json.dumps({"coalesced": True, "rag_count": len(citations)})
+    )
+
+async def serve_coalesced(request: ChatRequest, user_hash: str):
+    """
+    Single-flight: identical concurrent turns share one retrieval + generation.
+    The leader's NDJSON stream is fanned out to every subscriber.
+    """
+    import copy
+    import json
+    from fastapi.responses import StreamingResponse
+    from src.core.settings_manager import settings_manager
+    from src.core.single_flight import StreamBroadcast
+    
+    async def lead():
+        response = await _tracked(run_chat_pipeline(request, user_hash))
+        if isinstance(response, StreamingResponse):
+            return StreamBroadcast(response.body_iterator)
+        return response
+    
+    result, shared = await chat_flights.do(coalesce_key(request, settings_manager.get_all()), lead)
+    
+    if isinstance(result, StreamBroadcast):
+        if not shared:
+            return StreamingResponse(result.subscribe(), media_type="application/x-ndjson")
+        
+        logger.info("🔗 Requisição idêntica em andamento: assinando o stream existente.")
+        async def follower_stream():
+            text, citations = "", []
+            async for line in result.subscribe():
+                event = json.loads(line)
+                if event.get("type") == "token":
+                    text += event["content"]
+                elif event.get("type") == "citations":
+                    citations = event["data"]
+                yield line
+            await _log_coalesced(request, user_hash, "chat_coalesced_stream", text, citations)
+        return StreamingResponse(follower_stream(), media_type="application/x-ndjson")
+    
+    if isinstance(result, dict):
+        # Cada requisição recebe a sua cópia: metadados por requisição (ex: session_id) não vazam entre elas
+        result = copy.deepcopy(result)
+    if shared and isinstance(result, dict) and "response" in result:
+        logger.info("🔗 Requisição idêntica em andamento: resposta compartilhada.")
+        await _log_coalesced(request, user_hash, "chat_coalesced_standard", result["response"],
+                             result.get("metadata", {}).get("citations", []))
+    return result
+
 @router.post("/")
 async def chat_endpoint(request: ChatRequest):
     """
@@ -78,10 +383,6 @@ async def chat_endpoint(request: ChatRequest):
     For now, we default to streaming if client accepts text/event-stream, 
     but to keep it simple for this prototype, we'll return a StreamingResponse.
     """
-    from fastapi.responses import StreamingResponse
-    import json
-    import asyncio
-    from src.core.database import db_manager
     from src.core.settings_manager import settings_manager
 
     # 1. Identity Resolution (Fingerprint Priority)
@@ -92,9 +393,170 @@ async def chat_endpoint(request: ChatRequest):
     clean_message = pii_scrubber.scrub(request.message)
     request.message = clean_message
     
+    # 3. Sessão server-side: histórico (resumo + turnos recentes) e bloco de notas vêm do servidor
+    session = None
+    if request.session_id:
+        from src.core.session_store import session_store
+        session = await session_store.load(request.session_id, user_hash)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Sessão não encontrada ou expirada.")
+        request.history = [Message(**m) for m in session_store.history(session)]
+        if request.scratchpad is None:
+            request.scratchpad = session["scratchpad"]
+    
+    # 4. Single-flight: só turnos autossuficientes (sem histórico, imagens ou memória de sessão)
+    if (settings_manager.request_coalescing
+            and not request.history and not request.images and not request.scratchpad
+            and not request.confirmation_mode):
+        response = await serve_coalesced(request, user_hash)
+    else:
+        response = await _tracked(run_chat_pipeline(request, user_hash))
+    
+    if session is not None:
+        response = await _persist_session_turn(session["id"], clean_message, response)
+    return response
+
+async def _persist_session_turn(session_id: str, user_text: str, response):
+    """
+    Appends the turn to the server-side session once the answer is complete
+    (for streams: after the 'done' event), then schedules compaction in the background.
+    """
+    import json
+    from fastapi.responses import StreamingResponse
+    from src.core.session_store import session_store, split_scratchpad
+    
+    async def persist(answer: str, scratchpad):
+        try:
+            await session_store.append_turn(session_id, user_text, pii_scrubber.scrub(answer), scratchpad)
+            session_store.schedule_compaction(session_id)
+        except Exception as e:
+            logger.error(f"Failed to persist session turn: {e}")
+    
+    if not isinstance(response, StreamingResponse):
+        if isinstance(response, dict) and "response" in response:
+            answer, note = split_scratchpad(response["response"])
+            await persist(answer, pii_scrubber.scrub(note) if note else None)
+            response.setdefault("metadata", {})["session_id"] = session_id
+        return response
+    
+    body = response.body_iterator
+    async def persist_after_stream():
+        text, note, complete = "", None, False
+        async for chunk in body:
+            line = chunk.decode() if isinstance(chunk, bytes) else chunk
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = {}
+            if event.get("type") == "token":
+                text += event["content"]
+            elif event.get("type") == "scratchpad_update":
+                note = event["content"]
+            elif event.get("type") == "done":
+                complete = True
+            yield chunk
+        if complete: # Cliente que desistiu no meio não grava meia resposta
+            await persist(text, note)
+    response.body_iterator = persist_after_stream()
+    return response
+
+class SessionRequest(BaseModel):
+    user_id: str
+    fingerprint: Optional[str] = None
+
+@router.post("/sessions")
+async def create_session(request: SessionRequest):
+    """Opens a server-side conversation; send its session_id instead of history/scratchpad."""
+    from src.core.session_store import session_store
+    user_hash = anonymize_user(request.fingerprint or request.user_id)
+    return {"session_id": await session_store.create(user_hash)}
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str, user_id: str, fingerprint: Optional[str] = None):
+    from src.core.session_store import session_store
+    if not await session_store.delete(session_id, anonymize_user(fingerprint or user_id)):
+        raise HTTPException(status_code=404, detail="Sessão não encontrada.")
+    return {"status": "deleted"}
+
+async def run_chat_pipeline(request: ChatRequest, user_hash: str):
+    """
+    Intent -> retrieval -> generation for an already scrubbed request.
+    """
+    from fastapi.responses import StreamingResponse
+    import json
+    import asyncio
+    from src.core.database import db_manager
+    from src.core.settings_manager import settings_manager
+    from src.core.load_controller import load_controller
+
+    speculative_task = None
+    early_keyword = {}
     try:
+        # --- LOAD TIER ---
+        # Sob carga: menos candidatos, menos reranking, contexto menor e (no limite) modelo menor
+        tier = load_controller.current_tier()
+        retrieval_top_k = min(settings_manager.rag_top_k, tier["rag_top_k"] or settings_manager.rag_top_k)
+        generation_model = None
+        if tier["shed_model"]:
+            if llm_client.backends.has_model(settings_manager.load_shed_model):
+                generation_model = settings_manager.load_shed_model
+            else:
+                # Sem o modelo de contingência em nenhum backend: o Ollama responderia 404 em todo pico
+                logger.warning(f"Modelo de contingência {settings_manager.load_shed_model} indisponível: mantendo {settings_manager.llm_model}.")
+        
+        # --- CITATION SHORT-CIRCUIT ---
+        # Perguntas que citam um dispositivo exato ("Art. 5º, XI da CF") vão direto ao índice estruturado:
+        # sem extração de intenção, busca vetorial, FTS ou reranking.
+        citation_docs = []
+        if settings_manager.citation_lookup_enabled and not request.confirmation_mode:
+            from src.core.legal_citations import parse_citations
+            citations = parse_citations(request.message)
+            if citations:
+                citation_docs = await db_manager.resolve_citations(citations, limit=5)
+        
+        # --- SPECULATIVE RETRIEVAL ---
+        # A busca vetorial da mensagem crua (já sem PII) começa em t=0, em paralelo à intenção.
+        import time
+        speculative_range = None
+        if settings_manager.speculative_retrieval and not citation_docs and not request.confirmation_mode:
+            from src.core.gazette_shards import normalize_date_range
+            speculative_range = normalize_date_range(request.date_from, request.date_to)
+            speculative_task = asyncio.create_task(_timed(
+                vector_search(db_manager, settings_manager, request.message, date_range=speculative_range, limit=retrieval_top_k)
+            ))
+        intent_started = time.perf_counter()
+        
         # --- SILENT ENGINE ANALYTICS ---
-        intent_data = await interpret_intent(request.message, request.history, request.scratchpad)
+        if citation_docs:
+            logger.info(f"⚖️ Citação resolvida diretamente: {[c.label() for c in citations]}")
+            intent_data = {
+                "search_needed": True,
+                "is_confirmation": False,
+                "keywords": [],
+                "formal_query": request.message,
+                "understood_intent": "Consulta a dispositivo legal: " + "; ".join(c.label() for c in citations),
+                "sphere": "unknown",
+                "ambiguity_score": 0.0,
+                "citation_lookup": True
+            }
+        else:
+            # Busca por palavras-chave disparada assim que o array `keywords` fecha no stream da intenção
+            # (sphere e date_range vêm antes no schema); reaproveitada se os argumentos finais baterem.
+            partial_intent = {}
+            def on_intent_field(key, value):
+                partial_intent[key] = value
+                if (key == "keywords" and value and "task" not in early_keyword
+                        and partial_intent.get("search_needed", True) and not partial_intent.get("is_confirmation")):
+                    args = keyword_search_args(request, partial_intent, request.message)
+                    task = asyncio.create_task(db_manager.search_documents_keyword(
+                        args[0], limit=retrieval_top_k, sphere=args[1], date_range=args[2]
+                    ))
+                    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                    early_keyword.update(args=args, task=task)
+            intent_data = await interpret_intent(request.message, request.history, request.scratchpad,
+                                                 on_field=on_intent_field)
+        
+        intent_seconds = time.perf_counter() - intent_started
         
         # Decide Query Final e Esfera
         final_query = intent_data.get("formal_query", request.message)
@@ -123,6 +585,7 @@ async def chat_endpoint(request: ChatRequest):
                     "trigger": "ambiguity_threshold_exceeded"
                 })
              )
+             _discard_early_search(early_keyword)
 
              # Return a structured JSON response immediately (no stream for this interruption)
              return {
@@ -143,7 +606,36 @@ async def chat_endpoint(request: ChatRequest):
         context_docs = []
         citation_metadata = []
         
-        if search_needed and not is_confirmation:
+        # --- ANSWER CACHE ---
+        # Só turnos sem histórico/imagens: a resposta depende apenas da pergunta e do corpus
+        cache_eligible = (
+            settings_manager.answer_cache_enabled
+            and not request.history and not request.images and not request.scratchpad
+            and not is_confirmation
+        )
+        cache_range = resolve_date_range(request, intent_data)
+        if cache_eligible:
+            cached = None
+            try:
+                from src.core.answer_cache import answer_cache
+                cached = await answer_cache.lookup(final_query, intent_sphere, cache_range)
+            except Exception as e:
+                logger.warning(f"⚠️ Answer cache indisponível: {e}")
+            if cached:
+                _discard_task(speculative_task)
+                _discard_early_search(early_keyword)
+                logger.info(f"♻️ Resposta servida do cache ({cached['match']}, sim={cached['similarity']:.2f})")
+                return await serve_cached_answer(request, cached, intent_data, user_hash, db_manager)
+        
+        if speculative_task and (citation_docs or not search_needed or is_confirmation):
+            _discard_task(speculative_task)
+            intent_data["speculative"] = {"used": False, "reason": "no_search"}
+        if citation_docs or not search_needed or is_confirmation:
+            _discard_early_search(early_keyword)
+        
+        if citation_docs:
+            context_docs = citation_docs
+        elif search_needed and not is_confirmation:
             # 0. HyDE Strategy (DISABLED per User Request)
             # User opted for Keyword Extraction strategy instead of Hallucinated Vectors for now.
             hyde_vector_query = final_query
@@ -152,13 +644,6 @@ async def chat_endpoint(request: ChatRequest):
             vector_candidates = []
             keyword_candidates = []
             
-            # Extract Keywords from Intent (created by Gemma)
-            # If model failed to return list, fallback to splitting formal_query
-            search_keywords = intent_data.get("keywords", [])
-            if not search_keywords and final_query:
-                # Fallback: simple split if no keywords returned
-                search_keywords = final_query.split()
-            
             # A. Vector Search
             keyword_candidates = []
             
@@ -168,23 +653,73 @@ async def chat_endpoint(request: ChatRequest):
             if intent_sphere != "unknown":
                 where_filter = {"sphere": intent_sphere}
             
-            vector_task = db_manager.search_documents(
-                hyde_vector_query, 
-                limit=settings_manager.rag_top_k,
-                where=where_filter
-            )
+            # Período: filtro explícito da UI tem prioridade sobre o extraído pela intenção
+            date_range = cache_range
+            
+            if speculative_task:
+                # Reaproveita a busca especulativa se a intenção não mudou a consulta; senão, busca delta
+                similarity = await asyncio.to_thread(query_similarity, request.message, hyde_vector_query)
+                wait_started = time.perf_counter()
+                try:
+                    spec_candidates, spec_seconds = await speculative_task
+                except Exception as e:
+                    logger.warning(f"⚠️ Busca especulativa falhou: {e}")
+                    spec_candidates, spec_seconds = [], 0.0
+                waited = time.perf_counter() - wait_started
+                
+                if where_filter:
+                    spec_candidates = [c for c in spec_candidates if c["metadata"].get("sphere") == intent_sphere]
+                
+                hit = (
+                    bool(spec_candidates)
+                    and similarity >= settings_manager.speculative_similarity_threshold
+                    and date_range == speculative_range
+                )
+                if hit:
+                    async def reuse_speculative():
+                        return spec_candidates
+                    vector_task = reuse_speculative()
+                else:
+                    async def delta_search():
+                        fresh = await vector_search(db_manager, settings_manager, hyde_vector_query, where_filter, date_range, retrieval_top_k)
+                        return fresh + spec_candidates # Duplicados saem no dedupe por conteúdo
+                    vector_task = delta_search()
+                
+                intent_data["speculative"] = {
+                    "used": True,
+                    "hit": hit,
+                    "similarity": round(similarity, 3),
+                    "intent_ms": round(intent_seconds * 1000, 1),
+                    "retrieval_ms": round(spec_seconds * 1000, 1),
+                    # Sem especulação a busca começaria só depois da intenção
+                    "saved_ms": round(max(spec_seconds - waited, 0.0) * 1000, 1) if hit else 0.0
+                }
+            else:
+                vector_task = vector_search(db_manager, settings_manager, hyde_vector_query, where_filter, date_range, retrieval_top_k)
             # B. Keyword Search
             # B. Keyword Search
-            # Ensure keywords is a string for FTS
-            keyword_query_str = " ".join(search_keywords) if isinstance(search_keywords, list) else str(search_keywords)
+            # Keywords da intenção (fallback: formal_query quebrada em termos) como string para o FTS
+            keyword_args = keyword_search_args(request, intent_data, final_query)
+            if early_keyword.get("args") == keyword_args:
+                keyword_task = early_keyword.pop("task") # Já disparada durante o stream da intenção
+                intent_data["early_keyword_search"] = True
+            else:
+                _discard_early_search(early_keyword)
+                keyword_task = db_manager.search_documents_keyword(
+                    keyword_args[0], 
+                    limit=retrieval_top_k,
+                    sphere=keyword_args[1],
+                    date_range=keyword_args[2]
+                )
             
-            keyword_task = db_manager.search_documents_keyword(
-                keyword_query_str, 
-                limit=settings_manager.rag_top_k,
-                sphere=intent_sphere if intent_sphere != "unknown" else None
-            )
+            # Orçamento de latência por estágio: estágio lento degrada em vez de segurar a resposta
+            from src.core.latency_budget import LatencyBudget
+            latency = LatencyBudget(settings_manager.latency_budgets_ms)
             
-            vector_candidates, keyword_candidates = await asyncio.gather(vector_task, keyword_task)
+            vector_candidates, keyword_candidates = await asyncio.gather(
+                latency.run("vector", vector_task, list, "keyword_only"),
+                latency.run("keyword", keyword_task, list, "vector_only")
+            )
             
             # Process Keyword Docs
             from src.utils.text_processing import text_splitter
@@ -214,43 +749,178 @@ async def chat_endpoint(request: ChatRequest):
             if deduped_list:
                  from src.core.reranker import reranker
                  candidate_texts = [d["content"] for d in deduped_list]
-                 ranked_indices = reranker.rerank(final_query, candidate_texts, top_k=5)
+                 context_slots = tier["context_slots"]
+                 pool_size = settings_manager.mmr_candidate_pool if settings_manager.mmr_enabled else context_slots
+                 if tier["rerank_pool"]:
+                     pool_size = max(context_slots, min(pool_size, tier["rerank_pool"]))
+                     candidate_texts = candidate_texts[:max(tier["rerank_pool"] * 2, context_slots)] # Cross-encoder só nos primeiros da fusão
+                 
+                 def fused_order():
+                     # Sem cross-encoder: ordem da fusão (score vetorial / keyword)
+                     order = sorted(range(len(deduped_list)), key=lambda i: deduped_list[i].get("score", 0), reverse=True)
+                     return [{"index": i, "score": deduped_list[i].get("score", 0), "content": deduped_list[i]["content"]}
+                             for i in order[:pool_size]]
+                 
+                 ranked_indices = await latency.run(
+                     "rerank",
+                     asyncio.to_thread(reranker.rerank, final_query, candidate_texts, top_k=pool_size),
+                     fused_order, "fused_order"
+                 )
+                 
+                 # D.1 MMR: cada slot deve trazer informação nova (atos republicados em várias edições)
+                 if settings_manager.mmr_enabled and len(ranked_indices) > context_slots:
+                     try:
+                         import numpy as np
+                         from src.core.diversity import mmr_select
+                         from src.core.embedder import embedder
+                         
+                         # Um candidato por parent (o de maior score) antes de diversificar
+                         pool, pool_keys = [], set()
+                         for item in ranked_indices:
+                             meta = deduped_list[item["index"]]["metadata"]
+                             key = meta.get("parent_id") or f"{meta.get('original_doc_id')}_{meta.get('chunk_index')}"
+                             if key not in pool_keys:
+                                 pool_keys.add(key)
+                                 pool.append(item)
+                         
+                         vectors = await asyncio.to_thread(embedder.encode, [item["content"] for item in pool])
+                         order = mmr_select(
+                             np.array([item["score"] for item in pool]),
+                             vectors,
+                             k=context_slots,
+                             lambda_=settings_manager.mmr_lambda
+                         )
+                         ranked_indices = [pool[i] for i in order]
+                     except Exception as e:
+                         logger.warning(f"⚠️ MMR indisponível, usando ordem do reranker: {e}")
+                         ranked_indices = ranked_indices[:context_slots]
                  
+                 selected = []
                  seen_primary_keys = set()
                  for item in ranked_indices:
                      chunk_doc = deduped_list[item["index"]]
+                     parent_id = chunk_doc["metadata"].get("parent_id")
+                     dedupe_key = parent_id if parent_id else f"{chunk_doc['metadata'].get('original_doc_id')}_{chunk_doc['metadata'].get('chunk_index')}"
+                     if dedupe_key not in seen_primary_keys:
+                         seen_primary_keys.add(dedupe_key)
+                         selected.append((item, chunk_doc))
+                 
+                 async def expand(item, chunk_doc):
                      original_doc_id = chunk_doc["metadata"].get("original_doc_id")
                      chunk_index = chunk_doc["metadata"].get("chunk_index")
                      parent_id = chunk_doc["metadata"].get("parent_id")
+                     retrieved_content = None
+                     strategy_name = "raw_chunk"
                      
-                     dedupe_key = parent_id if parent_id else f"{original_doc_id}_{chunk_index}"
-                     
-                     if dedupe_key not in seen_primary_keys:
-                         seen_primary_keys.add(dedupe_key)
-                         retrieved_content = None
-                         strategy_name = "raw_chunk"
+                     if parent_id:
+                         retrieved_content = await db_manager.get_parent_content(parent_id)
+                         strategy_name = "parent_retrieval"
+                         
+                     if not retrieved_content and original_doc_id and chunk_index is not None:
+                         retrieved_content = await db_manager.get_context_window(original_doc_id, chunk_index, window_size=1)
+                         strategy_name = "window_expansion"
                          
-                         if parent_id:
-                             retrieved_content = await db_manager.get_parent_content(parent_id)
-                             strategy_name = "parent_retrieval"
-                             
-                         if not retrieved_content and original_doc_id and chunk_index is not None:
-                             retrieved_content = await db_manager.get_context_window(original_doc_id, chunk_index, window_size=1)
-                             strategy_name = "window_expansion"
-                             
-                         if retrieved_content:
-                             full_doc = chunk_doc.copy()
-                             full_doc["content"] = retrieved_content 
-                             full_doc["score"] = item["score"]
-                             full_doc["metadata"]["retrieval_strategy"] = strategy_name
-                             final_context_docs.append(full_doc)
-                         else:
-                             chunk_doc["score"] = item["score"]
-                             final_context_docs.append(chunk_doc)
+                     if retrieved_content:
+                         full_doc = chunk_doc.copy()
+                         full_doc["content"] = retrieved_content 
+                         full_doc["match"] = chunk_doc["content"] # Micro chunk: foco do corte por orçamento
+                         full_doc["score"] = item["score"]
+                         full_doc["metadata"]["retrieval_strategy"] = strategy_name
+                         return full_doc
+                     return raw_chunk(item, chunk_doc)
+                 
+                 def raw_chunk(item, chunk_doc):
+                     chunk_doc["score"] = item["score"]
+                     return chunk_doc
+                 
+                 final_context_docs = await latency.run(
+                     "expansion",
+                     asyncio.gather(*[expand(item, chunk_doc) for item, chunk_doc in selected]),
+                     lambda: [raw_chunk(item, chunk_doc) for item, chunk_doc in selected],
+                     "raw_chunks"
+                 )
             
+            intent_data["latency"] = latency.report()
             context_docs = final_context_docs
+            
+            # E. Compressão extrativa: só as frases do parent relevantes à pergunta (+ vizinhas)
+            if context_docs and settings_manager.context_compression:
+                from src.core.context_compressor import context_compressor
+                # Embedding (e a carga do modelo na primeira chamada) fora do event loop
+                compressed = await asyncio.to_thread(
+                    context_compressor.compress_many,
+                    final_query,
+                    [d["content"] for d in context_docs],
+                    keep_ratio=settings_manager.compression_keep_ratio
+                )
+                for doc, text in zip(context_docs, compressed):
+                    doc["content"] = text
+
+        # 2. Load System Prompt logic (DYNAMIC MODULAR LOADING)
+        # Instead of pushing the monolithic text, we assemble only what is needed based on intent.
+        from src.core.prompt_builder import dynamic_prompt_builder
+        from src.core.token_budget import TokenCounter, context_packer, select_num_ctx
+        from src.core.llm_metrics import llm_metrics
+        
+        intent_data["user_message"] = request.message
+        stable_prefix = settings_manager.prompt_assembly_mode == "stable_prefix"
+        
+        if stable_prefix:
+            # Prefixo byte-estável (seções fixas -> histórico); o que muda a cada turno vai por último
+            system_instructions, volatile_instructions = dynamic_prompt_builder.build_stable_parts(
+                intent_data=intent_data,
+                context_docs=context_docs
+            )
+        else:
+            system_instructions = dynamic_prompt_builder.build_prompt(
+                intent_data=intent_data, 
+                context_docs=context_docs
+            )
+            volatile_instructions = ""
+        
+        # 3. Assemble Conversation (histórico mais recente que cabe na fatia reservada)
+        # O teto do tier limita só o orçamento do ContextPacker; o num_ctx enviado ao Ollama não muda
+        max_ctx = settings_manager.num_ctx
+        if tier["num_ctx_cap"]:
+            max_ctx = min(max_ctx, tier["num_ctx_cap"])
+        if tier["name"] != "full":
+            intent_data["load_tier"] = {"tier": tier["name"], "model": generation_model or settings_manager.llm_model}
+        history_msgs = context_packer.trim_history(
+            request.history, int(max_ctx * settings_manager.history_budget_ratio)
+        ) if request.history else []
+        
+        conversation_history = ""
+        for msg in history_msgs:
+            if msg.role == "system": # Resumo de sessão compactada
+                conversation_history += f"{msg.content}\n"
+                continue
+            role = "USUÁRIO" if msg.role == "user" else "ASSISTENTE"
+            conversation_history += f"{role}: {msg.content}\n"
+        
+        conversation_history += f"USUÁRIO: {request.message}\n"
+        if request.confirmation_mode and request.pending_intent:
+             conversation_history = conversation_history.replace(f"USUÁRIO: {request.message}", f"USUÁRIO: {final_query}")
 
-        # 2. Build Context String
+        conversation_history += "ASSISTENTE: "
+        
+        # 4. Token Budget: documentos preenchem o que sobra, por relevância
+        output_reserve = settings_manager.context_output_reserve
+        fixed_tokens = (TokenCounter.count(system_instructions) + TokenCounter.count(volatile_instructions)
+                        + TokenCounter.count(conversation_history) + 64)
+        if context_docs:
+            context_docs, _ = context_packer.pack(context_docs, max_ctx - output_reserve - fixed_tokens)
+        
+        # 4b. Roteamento de modelo: perguntas simples vão ao modelo pequeno
+        if settings_manager.model_routing_enabled:
+            from src.core.model_router import model_router
+            route = model_router.route(model_router.signals(
+                intent_data, context_docs, history_msgs, request.message, has_images=bool(request.images)
+            ))
+            intent_data["model_route"] = route
+            if route["route"] == "small":
+                generation_model = route["model"]
+        
+        # 5. Build Context String
         if context_docs and len(context_docs) > 0:
             context_str = "CONTEXTO RECUPERADO (Ordenado por Relevância):\n"
             for i, doc in enumerate(context_docs):
@@ -280,36 +950,38 @@ async def chat_endpoint(request: ChatRequest):
         else:
             context_str = "CONTEXTO RECUPERADO:\n[SISTEMA: NENHUM DOCUMENTO ENCONTRADO NO BANCO DE DADOS LOCAL]\n"
         
-        # 3. Load System Prompt logic (DYNAMIC MODULAR LOADING)
-        # Instead of pushing the monolithic text, we assemble only what is needed based on intent.
-        from src.core.prompt_builder import dynamic_prompt_builder
+        if stable_prefix:
+            user_turn = final_query if request.confirmation_mode and request.pending_intent else request.message
+            llm_system = system_instructions
+            llm_history = [{"role": m.role if m.role in ("user", "system") else "assistant", "content": m.content} for m in history_msgs]
+            llm_prompt = "\n\n".join(filter(None, [volatile_instructions, context_str, f"PERGUNTA DO USUÁRIO: {user_turn}"]))
+            full_system_prompt = "\n\n".join(filter(None, [system_instructions, volatile_instructions, context_str]))
+        else:
+            full_system_prompt = f"{system_instructions}\n\n{context_str}"
+            llm_system, llm_history, llm_prompt = full_system_prompt, None, conversation_history
         
-        intent_data["user_message"] = request.message
+        # 6. num_ctx fixo, o mesmo da chamada de intenção: cada valor distinto recarrega o runner do
+        # Ollama (e descarta o KV cache). dynamic_num_ctx (opt-in) volta aos degraus por prompt.
+        prompt_tokens = TokenCounter.count(full_system_prompt) + TokenCounter.count(conversation_history)
+        request_num_ctx = settings_manager.num_ctx
+        if settings_manager.dynamic_num_ctx and not stable_prefix:
+            request_num_ctx = select_num_ctx(prompt_tokens + output_reserve, max_ctx)
+        intent_data["token_budget"] = {"prompt_tokens": prompt_tokens, "num_ctx": request_num_ctx,
+                                       "assembly": "stable_prefix" if stable_prefix else "dynamic"}
         
-        system_instructions = dynamic_prompt_builder.build_prompt(
-            intent_data=intent_data, 
-            context_docs=context_docs
+        # Resposta degradada (orçamento de latência estourado, tier reduzido, modelo menor) não vai ao cache
+        cache_store = (
+            cache_eligible
+            and tier["name"] == "full"
+            and not (intent_data.get("latency") or {}).get("degraded")
+            and generation_model in (None, settings_manager.llm_model)
         )
         
-        full_system_prompt = f"{system_instructions}\n\n{context_str}"
-        
-        # 4. Assemble Conversation
-        conversation_history = ""
-        if request.history:
-            for msg in request.history:
-                role = "USUÁRIO" if msg.role == "user" else "ASSISTENTE"
-                conversation_history += f"{role}: {msg.content}\n"
-        
-        conversation_history += f"USUÁRIO: {request.message}\n"
-        if request.confirmation_mode and request.pending_intent:
-             conversation_history = conversation_history.replace(f"USUÁRIO: {request.message}", f"USUÁRIO: {final_query}")
-
-        conversation_history += "ASSISTENTE: "
-        
         # --- STREAMING RESPONSE ---
         if request.stream:
-            async def event_generator():
+            async def event_generator(stream_slot):
                 full_response_text = ""
+                llm_stats = None
                 scratchpad_buffer = ""
                 in_scratchpad_block = False
                 
@@ -326,13 +998,18 @@ async def chat_endpoint(request: ChatRequest):
                 
                 # 2. Yield Token Stream
                 async for chunk in llm_client.generate_stream(
-                    prompt=conversation_history,
-                    system_prompt=full_system_prompt,
+                    prompt=llm_prompt,
+                    system_prompt=llm_system,
+                    history=llm_history,
                     images=request.images,
                     temperature=settings_manager.temperature,
                     top_k=settings_manager.top_k,
-                    num_ctx=settings_manager.num_ctx
+                    num_ctx=request_num_ctx,
+                    model=generation_model,
+                    slot=stream_slot
                 ):
+                    if chunk.get("stats"):
+                        llm_stats = chunk["stats"]
                     content = chunk["content"]
                     
                     # Intercept Scratchpad Logic - Aggressive Buffering
@@ -418,24 +1095,51 @@ async def chat_endpoint(request: ChatRequest):
                     details=json.dumps({
                         "intent": intent_data,
                         "prompt_version": prompt_version,
-                        "model": settings_manager.llm_model,
-                        "rag_count": len(citation_metadata)
+                        "model": generation_model or settings_manager.llm_model,
+                        "rag_count": len(citation_metadata),
+                        "llm_stats": llm_stats,
+                        "prefix_cache": llm_metrics.record_prefix_reuse(prompt_tokens, llm_stats, TokenCounter.is_exact())
                     })
                 )
                 
+                if cache_store:
+                    try:
+                        from src.core.answer_cache import answer_cache
+                        await answer_cache.store(final_query, intent_sphere, clean_response_log, citation_metadata, cache_range)
+                    except Exception as e:
+                        logger.warning(f"⚠️ Falha ao gravar no answer cache: {e}")
+                
                 yield json.dumps({"type": "done", "status": "complete"}) + "\n"
 
-            return StreamingResponse(event_generator(), media_type="application/x-ndjson")
+            async def admitted_stream():
+                # Admissão dentro do corpo: resposta descartada antes de começar nunca chega a pegar vaga
+                from src.core.llm_scheduler import llm_scheduler
+                try:
+                    stream_slot = await llm_scheduler.acquire("interactive")
+                except LLMQueueTimeout as e:
+                    # Cabeçalhos já enviados: a recusa (503 + Retry-After) vai como evento
+                    yield json.dumps({"type": "error", "status": 503, "retry_after": e.retry_after,
+                                      "content": "Sistema sobrecarregado no momento. Tente novamente em instantes."}) + "\n"
+                    return
+                try:
+                    async for line in event_generator(stream_slot):
+                        yield line
+                finally:
+                    stream_slot.release()
+            
+            return StreamingResponse(admitted_stream(), media_type="application/x-ndjson")
 
         # --- STANDARD JSON RESPONSE (Legacy/Test Compliance) ---
         else:
             response = await llm_client.generate(
-                prompt=conversation_history, 
-                system_prompt=full_system_prompt,
+                prompt=llm_prompt, 
+                system_prompt=llm_system,
+                history=llm_history,
                 images=request.images,
                 temperature=settings_manager.temperature,
                 top_k=settings_manager.top_k,
-                num_ctx=settings_manager.num_ctx
+                num_ctx=request_num_ctx,
+                model=generation_model
             )
             
             # Log Audit
@@ -464,11 +1168,20 @@ async def chat_endpoint(request: ChatRequest):
                     "intent": intent_data,
                     "prompt_version": prompt_version,
                     "model": response["model"],
-                    "rag_count": len(citation_metadata)
+                    "rag_count": len(citation_metadata),
+                    "llm_stats": response.get("stats"),
+                    "prefix_cache": llm_metrics.record_prefix_reuse(prompt_tokens, response.get("stats"), TokenCounter.is_exact())
                 }, default=str)
             )
             logger.info("✅ Audit logged successfully.")
             
+            if cache_store:
+                try:
+                    from src.core.answer_cache import answer_cache
+                    await answer_cache.store(final_query, intent_sphere, clean_response_log, citation_metadata, cache_range)
+                except Exception as e:
+                    logger.warning(f"⚠️ Falha ao gravar no answer cache: {e}")
+            
             return {
                 "response": response["content"], 
                 "metadata": {
@@ -478,7 +1191,17 @@ async def chat_endpoint(request: ChatRequest):
                 }
             }
 
+    except LLMQueueTimeout as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Sistema sobrecarregado no momento. Tente novamente em instantes.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         import traceback
         logger.error(f"Chat Endpoint Error: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Retornos antecipados (escuta ativa, cache, erros) não deixam buscas rodando soltas
+        _discard_task(speculative_task)
+        _discard_early_search(early_keyword)
@@ -0,0 +1,232 @@
+"""
+Deterministic stand-in for the Ollama HTTP API (offline load and latency testing).
+
+Serves /api/chat (streaming and non-streaming, `format: "json"`), /api/tags and /api/ps
+with the same payload shapes as Ollama, so GemmaClient, the backend pool and the metrics
+work unchanged. Output depends only on the seed and the request: the same prompt always
+yields the same tokens. Timing follows the configured prefill delay, prefill throughput
+and decode tokens/s; `parallel` bounds concurrent generations like OLLAMA_NUM_PARALLEL.
+
+Usage:
+    python cli.py fake-ollama --port 11435 --tokens-per-second 40 --prefill-ms 150
+    OLLAMA_URL=http://127.0.0.1:11435 python cli.py start
+Tests: the `fake_ollama` fixture (tests/conftest.py).
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+VOCABULARY = (
+    "a prefeitura publicou no diário oficial o decreto que regulamenta a coleta de lixo "
+    "nos bairros com prazo de trinta dias para adequação conforme a lei municipal e o "
+    "cidadão pode acompanhar a obra pelo portal da transparência ou pela ouvidoria"
+).split()
+
+CHARS_PER_TOKEN = 4
+
+
+class FakeOllamaConfig:
+    def __init__(self, tokens_per_second: float = 50.0, prefill_ms: float = 100.0,
+                 prefill_tokens_per_second: float = 2000.0, error_rate: float = 0.0,
+                 response_tokens: int = 64, load_ms: float = 0.0, parallel: int = 4,
+                 seed: int = 0, models: Optional[List[str]] = None):
+        self.tokens_per_second = tokens_per_second # Decode; 0 = sem atraso
+        self.prefill_ms = prefill_ms # Atraso fixo antes do primeiro token
+        self.prefill_tokens_per_second = prefill_tokens_per_second # Atraso proporcional ao prompt; 0 = sem
+        self.error_rate = error_rate # Fração de chamadas que respondem 500 (sequência determinística)
+        self.response_tokens = response_tokens # Tamanho padrão da resposta (num_predict tem prioridade)
+        self.load_ms = load_ms # Primeira chamada de cada modelo (carga a frio)
+        self.parallel = parallel
+        self.seed = seed
+        self.models = models or ["gemma3:27b", "gemma3:12b", "gemma3:4b", "gemma3:1b"]
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _text_tokens(rng: random.Random, count: int) -> List[str]:
+    words = [rng.choice(VOCABULARY) for _ in range(count)]
+    if words:
+        words[0] = words[0].capitalize()
+        words[-1] += "."
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+def _json_tokens(user_text: str) -> List[str]:
+    """An intent-shaped JSON object (the chat pipeline's intent schema), split into ~4-char tokens."""
+    terms = [w for w in re.findall(r"[\wÀ-ÿ]+", user_text.lower()) if len(w) > 3][:4]
+    payload = json.dumps({
+        "search_needed": True,
+        "is_confirmation": False,
+        "sphere": "unknown",
+        "date_range": {"start": None, "end": None},
+        "keywords": terms,
+        "formal_query": user_text.strip(),
+        "ambiguity_score": 0.1,
+        "understood_intent": user_text.strip(),
+    }, ensure_ascii=False)
+    return [payload[i:i + CHARS_PER_TOKEN] for i in range(0, len(payload), CHARS_PER_TOKEN)]
+
+
+def create_app(config: Optional[FakeOllamaConfig] = None) -> FastAPI:
+    config = config or FakeOllamaConfig()
+    app = FastAPI(title="Fake Ollama")
+    app.state.config = config
+    app.state.stats = {"requests": 0, "errors": 0, "active": 0, "max_active": 0}
+    state = {"loaded": set(), "slots": None}
+    error_rng = random.Random(config.seed)
+
+    def slots() -> asyncio.Semaphore:
+        if state["slots"] is None: # Criado dentro do loop do servidor
+            state["slots"] = asyncio.Semaphore(max(1, config.parallel))
+        return state["slots"]
+
+    @app.get("/")
+    async def root():
+        return "Ollama is running"
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": m, "model": m} for m in config.models]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": m, "model": m} for m in sorted(state["loaded"])]}
+
+    @app.get("/fake/stats")
+    async def fake_stats():
+        return app.state.stats
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body: Dict[str, Any] = await request.json()
+        model = body.get("model") or config.models[0]
+        messages = body.get("messages") or []
+        stream = body.get("stream", True)
+        options = body.get("options") or {}
+        stats = app.state.stats
+        stats["requests"] += 1
+
+        if model not in config.models:
+            return JSONResponse({"error": f"model '{model}' not found"}, status_code=404)
+        if config.error_rate and error_rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": "fake ollama: injected failure"}, status_code=500)
+
+        prompt_text = "".join(m.get("content", "") for m in messages)
+        user_text = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        digest = hashlib.sha256(f"{config.seed}|{model}|{prompt_text}".encode()).hexdigest()
+        rng = random.Random(int(digest[:16], 16))
+        if body.get("format") == "json":
+            tokens = _json_tokens(user_text)
+        else:
+            tokens = _text_tokens(rng, int(options.get("num_predict") or config.response_tokens))
+
+        prompt_tokens = _estimate_tokens(prompt_text)
+        load_s = 0.0 if model in state["loaded"] else config.load_ms / 1000
+        prefill_s = config.prefill_ms / 1000
+        if config.prefill_tokens_per_second:
+            prefill_s += prompt_tokens / config.prefill_tokens_per_second
+        token_s = 1 / config.tokens_per_second if config.tokens_per_second else 0.0
+
+        def final(started: float, decode_started: float, content: str) -> Dict[str, Any]:
+            now = time.perf_counter()
+            return {
+                "model": model,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "message": {"role": "assistant", "content": content},
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": int((now - started) * 1e9),
+                "load_duration": int(load_s * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prefill_s * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int((now - decode_started) * 1e9),
+            }
+
+        async def generate():
+            """Yields (token, None) while decoding and finally (None, final_payload)."""
+            async with slots():
+                stats["active"] += 1
+                stats["max_active"] = max(stats["max_active"], stats["active"])
+                try:
+                    started = time.perf_counter()
+                    await asyncio.sleep(load_s + prefill_s)
+                    state["loaded"].add(model)
+                    decode_started = time.perf_counter()
+                    for i, token in enumerate(tokens):
+                        if token_s:
+                            # Relógio absoluto: o ritmo não deriva com o overhead de cada envio
+                            await asyncio.sleep(max(0.0, decode_started + (i + 1) * token_s - time.perf_counter()))
+                        yield token, None
+                    yield None, final(started, decode_started, "")
+                finally:
+                    stats["active"] -= 1
+
+        if not stream:
+            content, payload = "", None
+            async for token, done in generate():
+                if done is None:
+                    content += token
+                else:
+                    payload = done
+            payload["message"]["content"] = content
+            return payload
+
+        async def ndjson():
+            async for token, done in generate():
+                if done is None:
+                    chunk = {"model": model, "message": {"role": "assistant", "content": token}, "done": False}
+                    yield json.dumps(chunk, ensure_ascii=False) + "\n"
+                else:
+                    yield json.dumps(done) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    return app
+
+
+class FakeOllamaServer:
+    """Runs the fake in a background thread on a free local port (pytest fixtures, benchmarks)."""
+
+    def __init__(self, config: Optional[FakeOllamaConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+        self.config = config or FakeOllamaConfig()
+        self.app = create_app(self.config)
+        if not port:
+            with socket.socket() as sock:
+                sock.bind((host, 0))
+                port = sock.getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self.app.state.stats
+
+    def start(self, timeout: float = 10.0) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Fake Ollama failed to start.")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=5)
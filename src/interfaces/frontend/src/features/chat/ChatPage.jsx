@@ -7,6 +7,24 @@ export const ChatPage = () => {
     const [loading, setLoading] = useState(false);
     const [scratchpad, setScratchpad] = useState(''); // Session Memory Notepad
     const [userId] = useState(() => `user-${Math.random().toString(36).substr(2, 9)}`); // Simple Session ID
+    const [sessionId, setSessionId] = useState(null); // Server-side session (history lives on the backend)
+
+    const ensureSession = async () => {
+        if (sessionId) return sessionId;
+        try {
+            const res = await fetch('/api/chat/sessions', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ user_id: userId })
+            });
+            if (!res.ok) return null;
+            const data = await res.json();
+            setSessionId(data.session_id);
+            return data.session_id;
+        } catch (e) {
+            return null; // Fallback: client-side history
+        }
+    };
 
     const sendMessage = async () => {
         if (!input.trim()) return;
@@ -47,10 +65,16 @@ export const ChatPage = () => {
         setMessages(prev => [...prev, initialAiMsg]);
 
         try {
+            const activeSession = await ensureSession();
             const response = await fetch('/api/chat/', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
+                body: JSON.stringify(activeSession ? {
+                    message: userMsg.text,
+                    user_id: userId,
+                    session_id: activeSession, // Backend keeps history + scratchpad
+                    stream: true
+                } : {
                     message: userMsg.text,
                     user_id: userId,
                     history: recentHistory,
@@ -59,6 +83,9 @@ export const ChatPage = () => {
                 })
             });
 
+            if (response.status === 404 && activeSession) {
+                setSessionId(null); // Expired session: next message opens a new one
+            }
             if (!response.ok) {
                 throw new Error(`HTTP Error: ${response.status}`);
             }
@@ -131,6 +158,15 @@ export const ChatPage = () => {
                             console.log("📝 Scratchpad Updated:", data.content);
                         }
 
+                        // Fila do LLM cheia (503 dentro do stream)
+                        if (data.type === 'error' && data.content) {
+                            if (!firstChunkReceived) { setLoading(false); firstChunkReceived = true; }
+                            setMessages(prev => prev.map(msg =>
+                                msg.id === aiMsgId ? { ...msg, text: data.content } : msg
+                            ));
+                            break;
+                        }
+
                         if (data.type === 'done') {
                             // Stream complete
                             break;
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import math
+import re
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Exemplos rotulados (kNN). search_needed vem do rótulo.
+LABELED_EXAMPLES = {
+    "greeting": [
+        "oi", "olá", "ola, tudo bem?", "bom dia", "boa tarde", "boa noite", "e aí", "opa, tudo certo?",
+    ],
+    "thanks": [
+        "obrigado", "obrigada", "muito obrigado pela ajuda", "valeu", "agradeço", "show, valeu", "perfeito, obrigado",
+    ],
+    "goodbye": [
+        "tchau", "até logo", "até mais", "falou", "até a próxima",
+    ],
+    "about_assistant": [
+        "quem é você?", "o que você faz?", "como você funciona?", "você é um robô?", "para que serve este sistema?",
+    ],
+    "document_search": [
+        "o que diz a lei sobre a obra da CEDAE em Tinguá?",
+        "quais decretos a prefeitura publicou sobre saúde?",
+        "onde fica o posto de saúde do bairro?",
+        "existe alguma licitação para pavimentação de ruas?",
+        "qual o prazo para recorrer de uma multa ambiental?",
+        "a prefeitura pode cortar árvores na reserva biológica?",
+        "quanto a câmara gastou com diárias este ano?",
+        "quais são os direitos de quem mora em área de proteção ambiental?",
+        "publicaram alguma nomeação no diário oficial ontem?",
+        "como denunciar desmatamento ilegal?",
+    ],
+}
+NO_SEARCH_LABELS = {"greeting", "thanks", "goodbye", "about_assistant"}
+
+# Regras rápidas (funcionam mesmo sem o embedder)
+_SMALL_TALK = re.compile(
+    r"^\s*(oi+|ol[aá]|opa|e a[ií]|bom dia|boa tarde|boa noite|obrigad[oa]s?|valeu|tchau|at[eé] (logo|mais|breve))[\s!.,?]*$",
+    re.IGNORECASE
+)
+# Referências ao histórico: sem contexto a mensagem não é autossuficiente -> LLM decide
+_ANAPHORA = re.compile(r"\b(isso|isto|disso|nisso|ele|ela|eles|elas|dele|dela|esse|essa|este|esta|aquele|aquela|mesmo|mesma)\b|^\s*e\s", re.IGNORECASE)
+
+# --- Gazetteers (esfera) ---
+# Só nomes próprios e instituições: termos genéricos ("bairro", "municipal", "ministério", "união")
+# aparecem em perguntas de qualquer esfera, e a esfera vira filtro rígido na busca.
+MUNICIPAL_TERMS = [
+    "nova iguaçu", "tinguá", "duque de caxias", "belford roxo", "mesquita", "nilópolis", "queimados", "japeri",
+    "são joão de meriti", "seropédica", "paracambi", "magé", "itaguaí", "niterói", "são gonçalo",
+    "prefeitura", "câmara municipal", "secretaria municipal", "guarda municipal",
+]
+STATE_TERMS = [
+    "acre", "alagoas", "amapá", "amazonas", "bahia", "ceará", "distrito federal", "espírito santo", "goiás",
+    "maranhão", "mato grosso", "minas gerais", "pará", "paraíba", "paraná", "pernambuco", "piauí",
+    "rio grande do norte", "rio grande do sul", "rondônia", "roraima", "santa catarina", "são paulo",
+    "sergipe", "tocantins", "estado do rio", "estado do rio de janeiro",
+    "governo do estado", "alerj", "assembleia legislativa", "cedae", "inea", "detran", "polícia militar",
+]
+FEDERAL_TERMS = [
+    "congresso", "senado", "câmara dos deputados", "presidente da república",
+    "ibama", "icmbio", "stf", "receita federal", "inss", "código florestal",
+]
+# Vantagem mínima (em termos encontrados) sobre a segunda esfera; abaixo disso a busca roda sem filtro
+SPHERE_MIN_MARGIN = 2
+
+
+def detect_sphere(text: str) -> str:
+    """
+    Sphere from gazetteer hits ('municipal' | 'estadual' | 'federal' | 'unknown').
+    Only a clear lead counts: the sphere becomes a hard retrieval filter that drops 'unknown' documents.
+    """
+    lowered = text.lower()
+    hits = {}
+    for sphere, terms in (("municipal", MUNICIPAL_TERMS), ("estadual", STATE_TERMS), ("federal", FEDERAL_TERMS)):
+        hits[sphere] = sum(1 for t in terms if re.search(rf"\b{re.escape(t)}\b", lowered))
+    best, runner_up = sorted(hits.values(), reverse=True)[:2]
+    if best - runner_up < SPHERE_MIN_MARGIN:
+        return "unknown"
+    return max(hits, key=hits.get)
+
+
+class LocalIntentEngine:
+    """
+    Fast-path intent extraction without the LLM.
+    Combines kNN over labeled examples (shared sentence embedder), keyword selection by
+    FTS vocabulary (IDF) and sphere gazetteers. Returns None when unsure, so the caller
+    falls back to the LLM intent call.
+    """
+
+    def __init__(self, k: int = 5):
+        self.k = k
+        self._example_vectors = None
+        self._example_labels = None
+
+    def _examples(self):
+        if self._example_vectors is None:
+            from src.core.embedder import embedder
+            texts, labels = [], []
+            for label, examples in LABELED_EXAMPLES.items():
+                texts.extend(examples)
+                labels.extend([label] * len(examples))
+            self._example_vectors = embedder.encode(texts)
+            self._example_labels = labels
+        return self._example_vectors, self._example_labels
+
+    def classify(self, message: str) -> tuple:
+        """kNN vote weighted by similarity. Returns (label, confidence, top_similarity)."""
+        from src.core.embedder import embedder
+        vectors, labels = self._examples()
+        query = embedder.encode([message])[0]
+        sims = vectors @ query
+        top = np.argsort(-sims)[:self.k]
+
+        votes = {}
+        for idx in top:
+            votes[labels[idx]] = votes.get(labels[idx], 0.0) + max(float(sims[idx]), 0.0)
+        label = max(votes, key=votes.get)
+        total = sum(votes.values()) or 1.0
+        return label, votes[label] / total, float(sims[top[0]])
+
+    async def extract_keywords(self, text: str, limit: int = 5) -> List[str]:
+        """Words present in the corpus, most informative (highest IDF) first."""
+        from src.core.database import db_manager
+        words = list(dict.fromkeys(w for w in re.findall(r"[\wÀ-ÿ]+", text.lower()) if len(w) > 2))
+        stats, total = await db_manager.fts_term_stats(words)
+        if not stats:
+            return []
+        ranked = sorted(stats, key=lambda w: math.log((total + 1) / (stats[w] + 1)), reverse=True)
+        return ranked[:limit]
+
+    def _build(self, message: str, search_needed: bool, label: str, confidence: float,
+               keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+        return {
+            "search_needed": search_needed,
+            "is_confirmation": False,
+            "keywords": keywords or [],
+            "formal_query": message,
+            "understood_intent": label,
+            "sphere": detect_sphere(message) if search_needed else "unknown",
+            "ambiguity_score": 0.0,
+            "intent_source": "local",
+            "local_confidence": round(confidence, 3)
+        }
+
+    async def interpret(self, message: str, history: Optional[list] = None) -> Optional[Dict[str, Any]]:
+        from src.core.settings_manager import settings_manager
+        text = (message or "").strip()
+        if not text:
+            return None
+
+        # 1. Regras: small talk óbvio dispensa até o embedder
+        if _SMALL_TALK.match(text):
+            return self._build(text, False, "small_talk", 1.0)
+
+        # 2. Follow-ups que dependem do histórico ficam com o LLM
+        if history and (len(text.split()) < 5 or _ANAPHORA.search(text)):
+            return None
+
+        try:
+            # kNN (e a carga do embedder na primeira chamada) fora do event loop
+            label, confidence, top_sim = await asyncio.to_thread(self.classify, text)
+        except Exception as e:
+            logger.debug(f"Local intent kNN unavailable: {e}")
+            return None
+
+        threshold = settings_manager.local_intent_threshold
+        if confidence < threshold or top_sim < settings_manager.local_intent_min_similarity:
+            return None
+
+        if label in NO_SEARCH_LABELS:
+            if len(text.split()) > 8: # Frase longa com cumprimento costuma trazer uma pergunta
+                return None
+            return self._build(text, False, label, confidence)
+
+        try:
+            keywords = await self.extract_keywords(text)
+        except Exception as e:
+            logger.debug(f"Local keyword extraction unavailable: {e}")
+            return None
+        if not keywords:
+            return None
+        return self._build(text, True, label, confidence, keywords)
+
+intent_engine = LocalIntentEngine()
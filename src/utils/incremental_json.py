@@ -0,0 +1,81 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class IncrementalJSONObject:
+    """
+    Incremental parser for a streamed top-level JSON object.
+    feed() receives raw chunks and returns the top-level fields that closed in them, so a
+    caller can act on `keywords` while the model is still writing the rest of the object.
+    Nested values are returned whole, once their closing bracket arrives.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        closed: List[Tuple[str, Any]] = []
+        self.text += chunk
+        text = self.text
+        while self._pos < len(text) and not self.complete:
+            i, c = self._pos, text[self._pos]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(text[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = i # Aspas no nível 1 sem valor em aberto: início de chave
+            elif c in "{[":
+                if not self._started:
+                    if c == "{":
+                        self._started = True
+                        self._depth = 1
+                    continue
+                self._depth += 1
+            elif c in "}]":
+                if not self._started:
+                    continue
+                if self._depth == 1:
+                    self._close_value(i, closed)
+                    self.complete = True
+                self._depth -= 1
+            elif c == ":" and self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = i + 1
+            elif c == "," and self._depth == 1:
+                self._close_value(i, closed)
+        return closed
+
+    def _close_value(self, end: int, closed: List[Tuple[str, Any]]):
+        if self._key is not None and self._value_start is not None:
+            raw = self.text[self._value_start:end].strip()
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                value = None # Valor malformado: o campo fica de fora
+            else:
+                self.fields[self._key] = value
+                closed.append((self._key, value))
+        self._key = None
+        self._value_start = None
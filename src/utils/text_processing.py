@@ -413,7 +413,8 @@ class SmartTextSplitter:
         6. Merge tiny chunks (< min_chunk_chars) with neighbors.
         """
         try:
-            from sentence_transformers import SentenceTransformer, util
+            from sentence_transformers import util
+            from src.core.embedder import embedder
             import numpy as np
         except ImportError:
             return self.split_by_paragraphs(text)
@@ -432,7 +433,7 @@ class SmartTextSplitter:
         valid_split_indices = []
         
         try:
-            model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2') 
+            model = embedder.get_model() # Shared instance (loaded once per process)
             embeddings = model.encode(sentences, convert_to_tensor=True)
             
             # 2. Calculate cosine similarity between consecutive windows
@@ -451,8 +452,6 @@ class SmartTextSplitter:
             logging.getLogger(__name__).warning(f"Semantic split failed: {e}")
             return self.split_by_paragraphs(text)
         finally:
-            if 'model' in locals():
-                del model
             if 'embeddings' in locals():
                 del embeddings
             gc.collect()
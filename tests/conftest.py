@@ -35,3 +35,28 @@ def mock_db_manager():
     mock = AsyncMock(spec=DatabaseManager)
     mock.save_document_record.return_value = "mock_doc_id"
     return mock
+
+@pytest.fixture
+def fake_ollama(request):
+    """
+    Deterministic fake Ollama over real HTTP (src/interfaces/fake_ollama.py).
+    Tune it per test with @pytest.mark.fake_ollama(tokens_per_second=..., error_rate=...).
+    """
+    from src.interfaces.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+    marker = request.node.get_closest_marker("fake_ollama")
+    options = {"tokens_per_second": 0, "prefill_ms": 0, "prefill_tokens_per_second": 0}
+    options.update(marker.kwargs if marker else {})
+    server = FakeOllamaServer(FakeOllamaConfig(**options)).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+async def fake_ollama_llm(fake_ollama, monkeypatch):
+    """The shared llm_client pointed at the fake_ollama server (single backend)."""
+    from src.core.llm_client import llm_client
+    from src.core.ollama_pool import BackendPool
+    pool = BackendPool([fake_ollama.url], lambda url: llm_client._build_client(url))
+    monkeypatch.setattr(llm_client, "backends", pool)
+    monkeypatch.setattr(llm_client, "urls", [fake_ollama.url])
+    yield llm_client
+    await pool.close()
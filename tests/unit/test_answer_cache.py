@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from src.core.answer_cache import AnswerCache, normalize_query
+from src.core.database import DatabaseManager
+from src.core.embedder import embedder
+from src.config import settings
+
+@pytest.fixture
+async def temp_db_manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_DB_PATH", tmp_path / "test_cache.db")
+    db = DatabaseManager()
+    await db.get_sqlite()
+    monkeypatch.setattr("src.core.database.db_manager", db)
+    yield db
+    if db._sqlite_connection:
+        await db._sqlite_connection.close()
+
+def _fake_encode(texts, batch_size=64):
+    # Same vector for any question about the CEDAE works, orthogonal otherwise
+    return np.asarray([[1.0, 0.0] if "cedae" in t else [0.0, 1.0] for t in texts], dtype=np.float32)
+
+def test_normalize_query():
+    assert normalize_query("  O que diz a LEI sobre a obra da CEDAE?") == "o que diz a lei sobre a obra da cedae"
+
+@pytest.mark.asyncio
+async def test_exact_and_semantic_hits(temp_db_manager, monkeypatch):
+    monkeypatch.setattr(embedder, "encode", _fake_encode)
+    cache = AnswerCache()
+    await cache.store("O que diz a lei sobre a obra da CEDAE em Tinguá?", "municipal", "Resposta X", [{"filename": "a.pdf"}])
+
+    exact = await cache.lookup("o que diz a lei sobre a obra da cedae em tinguá", "municipal")
+    assert exact["match"] == "exact" and exact["response"] == "Resposta X"
+
+    near = await cache.lookup("e a obra da CEDAE, o que a lei diz?", "municipal")
+    assert near["match"] == "semantic"
+
+    assert await cache.lookup("O que diz a lei sobre a obra da CEDAE em Tinguá?", "federal") is None
+    assert await cache.lookup("horário do posto de saúde", "municipal") is None
+
+@pytest.mark.asyncio
+async def test_corpus_generation_bump_invalidates(temp_db_manager, monkeypatch):
+    monkeypatch.setattr(embedder, "encode", _fake_encode)
+    cache = AnswerCache()
+    await cache.store("obra da cedae", "unknown", "Resposta antiga", [])
+    assert await cache.lookup("obra da cedae", "unknown")
+
+    await temp_db_manager.bump_corpus_generation() # e.g. a document was activated
+    assert await cache.lookup("obra da cedae", "unknown") is None
+
+    # Persistence: a fresh instance reloads the current generation from SQLite
+    await cache.store("obra da cedae", "unknown", "Resposta nova", [])
+    assert (await AnswerCache().lookup("obra da cedae", "unknown"))["response"] == "Resposta nova"
+
+@pytest.mark.asyncio
+async def test_numbers_and_periods_only_match_exactly(temp_db_manager, monkeypatch):
+    from datetime import date
+    monkeypatch.setattr(embedder, "encode", _fake_encode) # Mesmo vetor: similaridade 1.0
+    cache = AnswerCache()
+    await cache.store("O que diz o art. 5 da lei da CEDAE?", "municipal", "Resposta art. 5", [])
+
+    assert await cache.lookup("O que diz o art. 6 da lei da CEDAE?", "municipal") is None
+    assert (await cache.lookup("o que diz o art 5 da lei da cedae", "municipal"))["match"] == "exact"
+
+    y2023 = (date(2023, 1, 1), date(2023, 12, 31))
+    await cache.store("obras da cedae", "estadual", "Resposta 2023", [], y2023)
+    assert await cache.lookup("obras da cedae", "estadual") is None # Sem período != 2023
+    assert await cache.lookup("e as obras da cedae?", "estadual", (date(2024, 1, 1), date(2024, 12, 31))) is None
+    assert (await cache.lookup("e as obras da cedae?", "estadual", y2023))["response"] == "Resposta 2023"
+
+@pytest.mark.asyncio
+async def test_degraded_turns_are_not_cached(monkeypatch):
+    import json
+    from unittest.mock import AsyncMock, patch
+    from src.core.answer_cache import answer_cache
+    from src.core.load_controller import QUALITY_TIERS
+    from src.core.settings_manager import settings_manager
+    from src.interfaces.api.routes.chat import chat_endpoint, ChatRequest
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", True)
+    monkeypatch.setitem(settings_manager._settings, "request_coalescing", False)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+
+    async def turn(tier):
+        with patch("src.core.load_controller.load_controller.current_tier", return_value=tier), \
+             patch("src.core.database.db_manager") as mock_db, \
+             patch("src.interfaces.api.routes.chat.interpret_intent", new_callable=AsyncMock) as mock_intent, \
+             patch("src.core.llm_client.llm_client.generate", new_callable=AsyncMock) as mock_generate, \
+             patch.object(answer_cache, "lookup", new_callable=AsyncMock, return_value=None), \
+             patch.object(answer_cache, "store", new_callable=AsyncMock) as mock_store:
+            mock_intent.return_value = {"search_needed": False, "formal_query": "oi", "ambiguity_score": 0.0}
+            mock_db.log_audit = AsyncMock(return_value="log_id")
+            mock_generate.return_value = {"content": "Olá!", "model": "m", "timestamp": "now"}
+            await chat_endpoint(ChatRequest(message="oi", user_id="u1", stream=False))
+        return mock_store.await_count
+
+    monkeypatch.setitem(settings_manager._settings, "model_routing_enabled", False)
+    assert await turn(QUALITY_TIERS[0]) == 1
+    assert await turn(QUALITY_TIERS[1]) == 0 # Tier reduzido
+    monkeypatch.setitem(settings_manager._settings, "model_routing_enabled", True)
+    with patch("src.core.model_router.ModelRouter._model_available", return_value=True):
+        assert await turn(QUALITY_TIERS[0]) == 0 # Roteado ao modelo pequeno
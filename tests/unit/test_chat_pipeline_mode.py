@@ -0,0 +1,34 @@
+import json
+import pytest
+from unittest.mock import patch, AsyncMock
+from src.interfaces.api.routes.chat import interpret_intent, Message
+from src.core.llm_client import llm_client
+from src.core.settings_manager import settings_manager
+
+@pytest.mark.asyncio
+async def test_single_pass_skips_intent_llm_call(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "chat_pipeline_mode", "single_pass")
+    history = [Message(role="user", content="O que diz a lei sobre a obra da CEDAE em Tinguá?"),
+               Message(role="assistant", content="...")]
+
+    with patch.object(llm_client, "generate", new_callable=AsyncMock) as mock_generate:
+        intent = await interpret_intent("e o prazo?", history)
+
+    mock_generate.assert_not_called()
+    assert intent["search_needed"] is True
+    # Short follow-up inherits the previous question for retrieval
+    assert "cedae" in intent["keywords"] and "prazo" in intent["keywords"]
+
+@pytest.mark.asyncio
+async def test_small_model_mode_uses_intent_model(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "chat_pipeline_mode", "small_model")
+    monkeypatch.setitem(settings_manager._settings, "intent_model", "gemma3:1b")
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", False)
+
+    with patch.object(llm_client, "generate", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = {"content": json.dumps({"search_needed": False, "formal_query": "oi"})}
+        intent = await interpret_intent("oi")
+
+    assert mock_generate.call_args.kwargs["model"] == "gemma3:1b"
+    assert intent["search_needed"] is False
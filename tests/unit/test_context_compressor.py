@@ -0,0 +1,26 @@
+import numpy as np
+from src.core.context_compressor import ExtractiveCompressor
+from src.core.embedder import embedder
+
+def _fake_encode(texts, batch_size=64):
+    # Query and sentences mentioning "obra" point the same way; everything else is orthogonal
+    vectors = [[1.0, 0.0] if "obra" in t.lower() else [0.0, 1.0] for t in texts]
+    return np.asarray(vectors, dtype=np.float32)
+
+def test_compression_keeps_relevant_sentences_and_header(monkeypatch):
+    monkeypatch.setattr(embedder, "encode", _fake_encode)
+    sentences = [f"Frase de preenchimento número {i} sem relação." for i in range(30)]
+    sentences[15] = "A obra da CEDAE em Tinguá foi embargada."
+    parent = "Art. 10. Disposições gerais. " + " ".join(sentences)
+
+    [compressed] = ExtractiveCompressor().compress_many("situação da obra", [parent], keep_ratio=0.2, min_chars=100)
+
+    assert compressed.startswith("Art. 10.")
+    assert "A obra da CEDAE em Tinguá foi embargada." in compressed
+    assert "[...]" in compressed
+    assert len(compressed) < len(parent) * 0.4
+
+def test_short_parents_are_untouched(monkeypatch):
+    monkeypatch.setattr(embedder, "encode", _fake_encode)
+    texts = ["Texto curto.", "Outro texto curto sobre a obra."]
+    assert ExtractiveCompressor().compress_many("obra", texts) == texts
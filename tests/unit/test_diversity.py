@@ -0,0 +1,18 @@
+import numpy as np
+from src.core.diversity import mmr_select
+
+def _normalize(rows):
+    m = np.asarray(rows, dtype=np.float32)
+    return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+def test_mmr_skips_near_duplicates():
+    # 0 and 1 are the same act republished in two gazette editions
+    embeddings = _normalize([[1.0, 0.0, 0.0], [0.99, 0.01, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    relevance = np.array([0.95, 0.94, 0.80, 0.60])
+
+    assert mmr_select(relevance, embeddings, k=3, lambda_=0.7) == [0, 2, 3]
+
+def test_mmr_lambda_one_is_pure_relevance():
+    embeddings = _normalize([[1.0, 0.0], [1.0, 0.01], [0.0, 1.0]])
+    relevance = np.array([0.9, 0.8, 0.1])
+    assert mmr_select(relevance, embeddings, k=2, lambda_=1.0) == [0, 1]
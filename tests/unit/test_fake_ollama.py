@@ -0,0 +1,71 @@
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.core.settings_manager import settings_manager
+
+@pytest.mark.asyncio
+async def test_generate_is_deterministic_and_reports_stats(fake_ollama_llm):
+    first = await fake_ollama_llm.generate("Quando passa a coleta?", model="gemma3:27b")
+    second = await fake_ollama_llm.generate("Quando passa a coleta?", model="gemma3:27b")
+    other = await fake_ollama_llm.generate("E a obra da CEDAE?", model="gemma3:27b")
+
+    assert first["content"] == second["content"] != other["content"]
+    assert first["stats"]["output_tokens"] == 64 and first["stats"]["prompt_tokens"] > 0
+
+@pytest.mark.asyncio
+@pytest.mark.fake_ollama(tokens_per_second=400, prefill_ms=50)
+async def test_stream_follows_configured_timing(fake_ollama_llm):
+    started = time.perf_counter()
+    chunks = [c async for c in fake_ollama_llm.generate_stream("Oi", model="gemma3:4b")]
+    elapsed = time.perf_counter() - started
+
+    assert chunks[-1]["done"] and chunks[-1]["stats"]["output_tokens"] == 64
+    assert elapsed >= 0.05 + 64 / 400 * 0.9 # prefill + 64 tokens a 400 tok/s
+
+@pytest.mark.asyncio
+async def test_json_mode_feeds_the_streamed_intent_parser(fake_ollama_llm):
+    from src.interfaces.api.routes.chat import intent_fields_complete
+    fields = await fake_ollama_llm.generate_json_fields(
+        "obra da CEDAE em Tinguá", is_complete=intent_fields_complete, model="gemma3:1b"
+    )
+    assert fields["keywords"] == ["obra", "cedae", "tinguá"]
+    assert "understood_intent" not in fields # Stream fechado antes do último campo
+
+@pytest.mark.asyncio
+@pytest.mark.fake_ollama(error_rate=1.0)
+async def test_injected_errors(fake_ollama_llm, fake_ollama):
+    with pytest.raises(Exception):
+        await fake_ollama_llm.generate("Oi", model="gemma3:27b")
+    assert fake_ollama.stats["errors"] >= 1
+
+@pytest.mark.asyncio
+@pytest.mark.fake_ollama(tokens_per_second=200, parallel=2)
+async def test_chat_pipeline_under_concurrent_load(fake_ollama_llm, fake_ollama, monkeypatch):
+    from src.core.load_controller import LoadController
+    from src.interfaces.api.routes.chat import ChatRequest, run_chat_pipeline
+    controller = LoadController() # Isolado: a carga do teste não vaza para o singleton
+    monkeypatch.setattr("src.core.load_controller.load_controller", controller)
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "speculative_retrieval", False)
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+    monkeypatch.setitem(settings_manager._settings, "llm_model", "gemma3:27b")
+    monkeypatch.setitem(settings_manager._settings, "model_routing_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "llm_max_concurrency", 2) # Igual ao parallel do fake
+
+    with patch("src.core.database.db_manager") as mock_db:
+        mock_db.search_documents = AsyncMock(return_value=[])
+        mock_db.search_documents_keyword = AsyncMock(return_value=[])
+        mock_db.log_audit = AsyncMock()
+        results = await asyncio.gather(*(
+            run_chat_pipeline(ChatRequest(message=f"Pergunta {i} sobre a coleta", user_id="u", stream=False), "hash")
+            for i in range(4)
+        ))
+
+    assert all(r["response"] for r in results)
+    assert fake_ollama.stats["max_active"] <= 2 # parallel=2: o resto esperou na fila do fake
+    assert any(t["reason"] == "pressure" for t in controller.transitions) # Fila real -> tier rebaixado
+    details = json.loads(mock_db.log_audit.call_args.kwargs["details"])
+    assert details["llm_stats"]["output_tokens"] == 64
@@ -0,0 +1,110 @@
+import pytest
+from datetime import date
+from src.core.database import DatabaseManager
+from src.core.gazette_shards import normalize_date_range, shard_for
+from src.core.settings_manager import settings_manager
+from src.config import settings
+
+@pytest.fixture
+async def temp_db_manager(tmp_path, monkeypatch):
+    chroma_path = tmp_path / "test_chroma_shards"
+    chroma_path.mkdir()
+    monkeypatch.setattr(settings, "SQLITE_DB_PATH", tmp_path / "test_shards.db")
+    monkeypatch.setattr(settings, "CHROMADB_DIR", chroma_path)
+    monkeypatch.setattr(settings, "CHROMADB_COLD_DIR", tmp_path / "test_chroma_cold")
+    monkeypatch.setitem(settings_manager._settings, "gazette_partitioning", "year")
+    monkeypatch.setitem(settings_manager._settings, "gazette_default_lookback_years", 0)
+
+    db = DatabaseManager()
+    await db.get_sqlite()
+    yield db
+    if db._sqlite_connection:
+        await db._sqlite_connection.close()
+
+def test_shard_naming_and_date_ranges():
+    assert shard_for(date(2024, 8, 15)) == ("sentinela_gazettes_2024", date(2024, 1, 1), date(2024, 12, 31))
+    assert shard_for(date(2024, 8, 15), "quarter") == ("sentinela_gazettes_2024q3", date(2024, 7, 1), date(2024, 9, 30))
+
+    # Bare year / month bounds expand to the whole period
+    assert normalize_date_range("2023", "2023") == (date(2023, 1, 1), date(2023, 12, 31))
+    assert normalize_date_range(None, "2024-02") == (date(1900, 1, 1), date(2024, 2, 29))
+    assert normalize_date_range(None, None) is None
+
+@pytest.mark.asyncio
+async def test_gazettes_routed_to_period_shards(temp_db_manager):
+    db = temp_db_manager
+
+    for year, vector in [(2022, [1.0, 0.0, 0.0]), (2024, [0.9, 0.1, 0.0])]:
+        collection, name = await db._collection_for_document("diario_oficial", {"publication_date": f"{year}-05-10"})
+        assert name == f"sentinela_gazettes_{year}"
+        collection.add(
+            ids=[f"gazette_{year}"],
+            embeddings=[vector],
+            documents=[f"Diário de {year}"],
+            metadatas=[{"original_doc_id": f"gazette_{year}", "status": "active", "publication_ts": year * 10000 + 510}]
+        )
+
+    # Non-gazettes stay in the main collection
+    _, name = await db._collection_for_document("lei", {"publication_date": "2024-05-10"})
+    assert name == db.COLLECTION_NAME
+
+    results = await db.search_documents("x", limit=5, query_embedding=[1.0, 0.0, 0.0],
+                                         date_range=normalize_date_range("2024-01-01", "2024-12-31"))
+    assert [r["metadata"]["original_doc_id"] for r in results] == ["gazette_2024"]
+
+    # Cold shards are skipped by default but still reachable with an explicit range
+    await db.offload_gazette_shard("sentinela_gazettes_2022")
+    assert "sentinela_gazettes_2022" not in await db._shards_for_search(None)
+    results = await db.search_documents("x", limit=5, query_embedding=[1.0, 0.0, 0.0],
+                                         date_range=normalize_date_range("2022", "2022"))
+    assert [r["metadata"]["original_doc_id"] for r in results] == ["gazette_2022"]
+
+@pytest.mark.asyncio
+async def test_undated_query_reaches_old_gazettes(temp_db_manager, monkeypatch):
+    db = temp_db_manager
+    monkeypatch.delitem(settings_manager._settings, "gazette_default_lookback_years") # Padrão
+
+    collection, _ = await db._collection_for_document("diario_oficial", {"publication_date": "2012-03-02"})
+    collection.add(
+        ids=["gazette_2012"],
+        embeddings=[[1.0, 0.0, 0.0]],
+        documents=["Diário de 2012"],
+        metadatas=[{"original_doc_id": "gazette_2012", "status": "active", "publication_ts": 20120302}]
+    )
+
+    results = await db.search_documents("x", limit=5, query_embedding=[1.0, 0.0, 0.0])
+    assert [r["metadata"]["original_doc_id"] for r in results] == ["gazette_2012"]
+
+@pytest.mark.asyncio
+async def test_legacy_gazettes_filtered_by_date_and_migrated(temp_db_manager):
+    db = temp_db_manager
+    main = db.get_collection()
+    # Indexed before partitioning: main collection, no publication_ts
+    main.add(
+        ids=["legacy_2015_c0", "lei_c0"],
+        embeddings=[[1.0, 0.0, 0.0], [0.9, 0.1, 0.0]],
+        documents=["Diário de 2015", "Lei Orgânica"],
+        metadatas=[
+            {"original_doc_id": "legacy_2015", "status": "active", "doc_type": "diario_oficial", "parent_id": "p0"},
+            {"original_doc_id": "lei", "status": "active", "doc_type": "lei", "parent_id": "p1"},
+        ]
+    )
+    await db._sqlite_connection.execute(
+        "INSERT INTO documents (id, filename, source, doc_type, status, publication_date) VALUES (?, ?, ?, ?, ?, ?)",
+        ("legacy_2015", "do_2015.pdf", "upload", "diario_oficial", "active", "2015-06-01")
+    )
+    await db._sqlite_connection.commit()
+
+    async def found(date_range):
+        results = await db.search_documents("x", limit=5, query_embedding=[1.0, 0.0, 0.0], date_range=date_range)
+        return [r["metadata"]["original_doc_id"] for r in results]
+
+    # Dated query: the undated legacy gazette is out, non-gazettes still match
+    assert await found(normalize_date_range("2024", "2024")) == ["lei"]
+
+    result = await db.migrate_legacy_gazettes()
+    assert result == {"documents": 1, "chunks": 1}
+    assert main.get(ids=["legacy_2015_c0"])["ids"] == []
+    assert await found(normalize_date_range("2015", "2015")) == ["legacy_2015", "lei"]
+    assert await found(normalize_date_range("2024", "2024")) == ["lei"]
+    assert await db.migrate_legacy_gazettes() == {"documents": 0, "chunks": 0} # Idempotente
@@ -0,0 +1,48 @@
+import base64
+import io
+import pytest
+from src.core import image_pipeline as pipeline_module
+from src.core.image_pipeline import ImagePipeline
+
+RAW = b"\x89PNG fake image bytes"
+
+@pytest.mark.asyncio
+async def test_paths_and_data_urls_without_pillow(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "Image", None)
+    path = tmp_path / "foto.png"
+    path.write_bytes(RAW)
+    encoded = base64.b64encode(RAW).decode()
+    pipeline = ImagePipeline()
+
+    assert await pipeline.prepare([str(path)]) == [encoded]
+    # data: URL perde o prefixo (Ollama espera base64 puro) e cai no mesmo cache pelo conteúdo
+    assert await pipeline.prepare([f"data:image/png;base64,{encoded}"]) == [encoded]
+    assert pipeline.stats == {"hits": 1, "misses": 1}
+
+    with pytest.raises(ValueError):
+        await pipeline.prepare([str(path)], profile="poster")
+
+def test_tile_count():
+    assert ImagePipeline.tile_count((3000, 4000), 4) == 1 # Foto comum: uma imagem só
+    assert ImagePipeline.tile_count((1000, 3000), 4) == 3
+    assert ImagePipeline.tile_count((1000, 9000), 4) == 4
+
+@pytest.mark.asyncio
+async def test_downscale_and_document_tiles():
+    Image = pytest.importorskip("PIL.Image")
+    pipeline = ImagePipeline()
+
+    def jpeg(size):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, (200, 180, 160)).save(buffer, format="JPEG")
+        return base64.b64encode(buffer.getvalue()).decode()
+
+    def decode(payload):
+        return Image.open(io.BytesIO(base64.b64decode(payload)))
+
+    [photo] = await pipeline.prepare([jpeg((4000, 3000))])
+    assert max(decode(photo).size) <= 896
+
+    strips = await pipeline.prepare([jpeg((1200, 3600))], profile="document")
+    assert len(strips) == 3
+    assert all(decode(s).mode == "L" and max(decode(s).size) <= 896 for s in strips)
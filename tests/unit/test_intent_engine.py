@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from unittest.mock import patch, AsyncMock
+from src.core.embedder import embedder
+from src.core.database import db_manager
+from src.reasoning.intent_engine import LocalIntentEngine, detect_sphere
+
+def _fake_encode(texts, batch_size=64):
+    # Label prototypes: questions about the assistant, other questions and small talk on separate axes
+    vectors = []
+    for t in texts:
+        if "você" in t or "sistema" in t:
+            vectors.append([0.0, 0.0, 1.0])
+        elif len(t.split()) > 4:
+            vectors.append([1.0, 0.0, 0.0])
+        else:
+            vectors.append([0.0, 1.0, 0.0])
+    return np.asarray(vectors, dtype=np.float32)
+
+def test_detect_sphere_from_gazetteers():
+    assert detect_sphere("posto de saúde da prefeitura de Nova Iguaçu") == "municipal"
+    assert detect_sphere("tarifa da CEDAE aprovada pela ALERJ") == "estadual"
+    assert detect_sphere("multa do IBAMA contestada no STF") == "federal"
+    assert detect_sphere("qual o horário?") == "unknown"
+    # Termos genéricos ou um único acerto não viram filtro de esfera
+    assert detect_sphere("direitos na união estável") == "unknown"
+    assert detect_sphere("iluminação do bairro e a escola municipal") == "unknown"
+    assert detect_sphere("o ministério liberou a verba?") == "unknown"
+    assert detect_sphere("obras em Nova Iguaçu") == "unknown"
+    assert detect_sphere("prefeitura de Nova Iguaçu e a CEDAE") == "unknown" # Sem vantagem clara
+
+@pytest.mark.asyncio
+async def test_small_talk_is_answered_locally():
+    intent = await LocalIntentEngine().interpret("Bom dia!")
+    assert intent["search_needed"] is False
+    assert intent["intent_source"] == "local"
+
+@pytest.mark.asyncio
+async def test_self_contained_question_uses_corpus_keywords(monkeypatch):
+    monkeypatch.setattr(embedder, "encode", _fake_encode)
+    stats = ({"obra": 40, "prefeitura": 3, "tinguá": 5}, 100)
+    with patch.object(db_manager, "fts_term_stats", new_callable=AsyncMock, return_value=stats):
+        intent = await LocalIntentEngine().interpret("qual a situação da obra da prefeitura em Tinguá?")
+
+    assert intent["search_needed"] is True
+    assert intent["keywords"] == ["prefeitura", "tinguá", "obra"] # Rarest (most informative) first
+    assert intent["sphere"] == "municipal"
+
+@pytest.mark.asyncio
+async def test_history_dependent_follow_up_defers_to_llm(monkeypatch):
+    monkeypatch.setattr(embedder, "encode", _fake_encode)
+    intent = await LocalIntentEngine().interpret("e sobre isso?", history=[object()])
+    assert intent is None
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.core.llm_client import llm_client
+from src.core.settings_manager import settings_manager
+from src.interfaces.api.routes.chat import interpret_intent, intent_fields_complete
+from src.utils.incremental_json import IncrementalJSONObject
+
+INTENT = {
+    "search_needed": True,
+    "is_confirmation": False,
+    "sphere": "municipal",
+    "date_range": {"start": "2023-01-01", "end": None},
+    "keywords": ["CEDAE", "obra, \"Tinguá\""],
+    "formal_query": "Obra da CEDAE em Tinguá",
+    "ambiguity_score": 0.1,
+    "understood_intent": "Cidadão quer saber da obra",
+}
+
+def _chunks(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def test_parser_emits_fields_as_they_close():
+    parser = IncrementalJSONObject()
+    closed = []
+    for chunk in _chunks(" " + json.dumps(INTENT, ensure_ascii=False), size=3):
+        closed.extend(key for key, _ in parser.feed(chunk))
+    assert closed == list(INTENT)
+    assert parser.fields == INTENT and parser.complete
+
+    partial = IncrementalJSONObject()
+    partial.feed('{"search_needed": true, "keywords": ["a", "b"], "formal_')
+    assert partial.fields == {"search_needed": True, "keywords": ["a", "b"]}
+    assert not partial.complete
+
+def _fake_stream(text, consumed):
+    async def stream(**kwargs):
+        assert kwargs["json_mode"] is True
+        try:
+            for chunk in _chunks(text):
+                consumed.append(chunk)
+                yield {"content": chunk, "done": False}
+            yield {"content": "", "done": True}
+        finally:
+            consumed.append("closed")
+    return stream
+
+@pytest.mark.asyncio
+async def test_intent_stream_stops_once_pipeline_fields_are_present(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", True)
+    text = json.dumps(INTENT, ensure_ascii=False)
+    consumed, seen = [], []
+
+    with patch.object(llm_client, "generate_stream", _fake_stream(text, consumed)):
+        intent = await interpret_intent("e a obra da cedae?", on_field=lambda k, v: seen.append(k))
+
+    assert "understood_intent" not in intent # Gerado depois de tudo que o pipeline usa
+    assert intent["keywords"] == INTENT["keywords"]
+    assert consumed[-1] == "closed" # Stream fechado: o Ollama para de gerar
+    assert len("".join(consumed[:-1])) < len(text)
+    assert seen[:5] == ["search_needed", "is_confirmation", "sphere", "date_range", "keywords"]
+
+def test_ambiguous_intent_waits_for_understood_intent(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "active_listening_threshold", 0.85)
+    fields = {k: v for k, v in INTENT.items() if k != "understood_intent"}
+    assert intent_fields_complete(fields)
+    assert not intent_fields_complete({**fields, "ambiguity_score": 0.95})
+
+@pytest.mark.asyncio
+async def test_keyword_search_fires_during_intent_stream(monkeypatch):
+    from src.interfaces.api.routes.chat import ChatRequest, run_chat_pipeline
+    from src.core.reranker import reranker
+
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", True)
+    monkeypatch.setitem(settings_manager._settings, "speculative_retrieval", False)
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+
+    events = []
+    async def keyword_search(query, limit=20, sphere=None, date_range=None):
+        events.append(("keyword_search", query, sphere))
+        return []
+    async def stream(**kwargs):
+        for chunk in _chunks(json.dumps(INTENT, ensure_ascii=False)):
+            events.append(("chunk", chunk))
+            yield {"content": chunk, "done": False}
+            await asyncio.sleep(0) # Deixa a task de busca rodar durante o stream
+
+    with patch("src.core.database.db_manager") as mock_db, \
+         patch.object(llm_client, "generate_stream", stream), \
+         patch.object(reranker, "rerank", side_effect=lambda q, docs, top_k=5: docs), \
+         patch.object(llm_client, "generate", new_callable=AsyncMock) as mock_generate:
+        mock_db.search_documents_keyword = AsyncMock(side_effect=keyword_search)
+        mock_db.search_documents = AsyncMock(return_value=[])
+        mock_db.log_audit = AsyncMock()
+        mock_generate.return_value = {"content": "Resposta", "model": "m", "timestamp": "t"}
+        result = await run_chat_pipeline(ChatRequest(message="e a obra da cedae?", user_id="u", stream=False), "hash")
+
+    assert result["response"] == "Resposta"
+    searches = [e for e in events if e[0] == "keyword_search"]
+    assert searches == [("keyword_search", 'CEDAE obra, "Tinguá"', "municipal")] # Uma só busca, reaproveitada
+    assert any(e[0] == "chunk" for e in events[events.index(searches[0]) + 1:]) # ...disparada antes do fim do stream
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.core.latency_budget import LatencyBudget
+from src.interfaces.api.routes.chat import chat_endpoint, ChatRequest
+from src.core.reranker import reranker
+from src.core.settings_manager import settings_manager
+
+@pytest.mark.asyncio
+async def test_stage_over_budget_uses_fallback():
+    budget = LatencyBudget({"vector": 50, "keyword": 0})
+
+    async def slow():
+        await asyncio.sleep(1)
+        return ["late"]
+
+    async def fast():
+        return ["ok"]
+
+    assert await budget.run("vector", slow(), list, "keyword_only") == []
+    assert await budget.run("keyword", fast(), list, "vector_only") == ["ok"]
+    assert budget.report()["degraded"] == [{"stage": "vector", "budget_ms": 50.0, "fallback": "keyword_only"}]
+    assert budget.timings_ms["vector"] < 500
+
+@pytest.mark.asyncio
+async def test_slow_reranker_degrades_to_fused_order(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "latency_budgets_ms", {"rerank": 50})
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", False)
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+
+    def slow_rerank(query, documents, top_k=5):
+        time.sleep(0.5) # Blocking cross-encoder
+        return [{"index": 0, "score": 0.99, "content": documents[0]}]
+
+    with patch("src.core.database.db_manager") as mock_db:
+        mock_db.search_documents = AsyncMock(return_value=[
+            {"content": "Chunk B", "metadata": {"filename": "b.txt", "source": "test", "original_doc_id": "b"}, "score": 0.6},
+            {"content": "Chunk A", "metadata": {"filename": "a.txt", "source": "test", "original_doc_id": "a"}, "score": 0.9},
+        ])
+        mock_db.search_documents_keyword = AsyncMock(return_value=[])
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+
+        with patch.object(reranker, "rerank", side_effect=slow_rerank), \
+             patch("src.core.llm_client.llm_client.generate", new_callable=AsyncMock) as mock_generate:
+            mock_generate.side_effect = [
+                {"content": json.dumps({"formal_query": "posto de saude", "keywords": ["posto"]}), "model": "mock", "timestamp": "now"},
+                {"content": "Resposta", "model": "mock", "timestamp": "now"}
+            ]
+            started = time.perf_counter()
+            result = await chat_endpoint(ChatRequest(message="Onde fica o posto?", user_id="u1", stream=False))
+            elapsed = time.perf_counter() - started
+
+    details = json.loads(mock_db.log_audit.call_args.kwargs["details"])
+    assert details["intent"]["latency"]["degraded"][0]["fallback"] == "fused_order"
+    assert [c["filename"] for c in result["metadata"]["citations"]] == ["a.txt", "b.txt"]
+    assert elapsed < 0.5
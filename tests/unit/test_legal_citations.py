@@ -0,0 +1,74 @@
+import pytest
+from src.core.database import DatabaseManager
+from src.core.legal_citations import Citation, parse_citations, law_id_for_document, extract_provisions
+from src.config import settings
+
+@pytest.fixture
+async def temp_db_manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_DB_PATH", tmp_path / "test_citations.db")
+    monkeypatch.setattr(settings, "CHROMADB_DIR", tmp_path / "test_chroma_citations")
+
+    db = DatabaseManager()
+    await db.get_sqlite()
+    yield db
+    if db._sqlite_connection:
+        await db._sqlite_connection.close()
+
+def test_parse_citations():
+    assert parse_citations("Art. 5º, inciso XI da Constituição") == [Citation("cf", "5", None, "XI")]
+    assert parse_citations("o que diz o inciso II do § 1º do art. 225 da CF/88?") == [Citation("cf", "225", "1", "II")]
+    assert parse_citations("Lei nº 12.651/2012 art. 4") == [Citation("lei:12651", "4")]
+    assert parse_citations("Código Florestal, artigo 4º-A") == [Citation("lei:12651", "4-A")]
+    # Each article is bound to its own law
+    assert parse_citations("art. 4 da Lei 12.651 e art. 5 da CF") == [Citation("lei:12651", "4"), Citation("cf", "5")]
+    assert parse_citations("art. 4 e art. 5 da CF") == [Citation("cf", "4"), Citation("cf", "5")]
+    assert parse_citations("Art. 10 do Decreto-Lei 3.365/41") == [Citation("dl:3365", "10")]
+    # Article lists: one citation per article
+    assert parse_citations("arts. 5º e 6º da CF") == [Citation("cf", "5"), Citation("cf", "6")]
+    assert parse_citations("artigos 5, 6 e 37-A da Constituição") == [
+        Citation("cf", "5"), Citation("cf", "6"), Citation("cf", "37-A")
+    ]
+    # Lowercase "cf." before another law is "conforme", not the Constitution
+    assert parse_citations("art. 37 cf. a Lei 8.666") == [Citation("lei:8666", "37")]
+    assert parse_citations("art. 37 da cf") == [Citation("cf", "37")]
+    # Ambiguous law (one before, another after) -> dropped instead of guessed
+    assert parse_citations("Lei 12.651 art. 4 e art. 5 da CF") == [Citation("cf", "5")]
+    # No identifiable law -> no citation (every law has an Art. 5)
+    assert parse_citations("o que diz o art. 5?") == []
+    assert parse_citations("Onde fica o posto de saude?") == []
+
+def test_law_identification_and_provisions():
+    assert law_id_for_document("l12651.htm") == "lei:12651"
+    assert law_id_for_document("constituicao.pdf", doc_type="constituicao") == "cf"
+    assert law_id_for_document("Lei_Complementar_140_2011.pdf") == "lc:140"
+
+    article, provisions = extract_provisions(
+        "[CAPÍTULO I] Art. 5º Todos são iguais perante a lei:\nI - homens e mulheres;\nXI - a casa é asilo;\n"
+        "§ 1º As normas definidoras.\n§ 2º Os direitos:\nI - outro"
+    )
+    assert article == "5"
+    assert (None, "XI") in provisions
+    assert ("2", "I") in provisions
+
+@pytest.mark.asyncio
+async def test_resolve_citation_from_index(temp_db_manager):
+    db = temp_db_manager
+    await db.save_document_record({
+        "id": "cf88", "filename": "Constituição Federal.html", "source": "admin",
+        "text_content": "...", "doc_type": "constituicao", "sphere": "federal", "status": "active"
+    })
+    await db.save_parent_chunk("cf88", 0, "Art. 5º Todos são iguais perante a lei:\nI - homens e mulheres;", "article")
+    await db.save_parent_chunk("cf88", 1, "Art. 5º XI - a casa é asilo inviolável do indivíduo;", "article")
+    await db.save_parent_chunk("cf88", 2, "Art. 6º São direitos sociais a educação, a saúde.", "article")
+
+    assert await db.index_legal_citations("cf88") > 0
+
+    results = await db.resolve_citations(parse_citations("Art. 5º, inciso XI da Constituição"))
+    assert [r["metadata"]["parent_id"] for r in results] == ["cf88_parent_1"]
+    assert results[0]["metadata"]["retrieval_strategy"] == "citation_lookup"
+
+    # Article-level citation returns every part of the article
+    results = await db.resolve_citations(parse_citations("art. 5 da CF"))
+    assert [r["metadata"]["parent_id"] for r in results] == ["cf88_parent_0", "cf88_parent_1"]
+
+    assert await db.resolve_citations(parse_citations("art. 99 da CF")) == []
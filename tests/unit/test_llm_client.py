@@ -0,0 +1,51 @@
+import json
+import httpx
+import pytest
+from src.core.llm_client import GemmaClient
+
+@pytest.fixture
+def pooled_client(monkeypatch):
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append(request)
+        body = json.loads(request.content)
+        if body["stream"]:
+            lines = [{"message": {"content": "Olá"}, "done": False}, {"message": {"content": "!"}, "done": True}]
+            return httpx.Response(200, content="\n".join(json.dumps(l) for l in lines))
+        return httpx.Response(200, json={"message": {"content": "ok"}, "model": body["model"], "done": True})
+
+    client = GemmaClient()
+    original = client._build_client
+    def build_with_mock(base_url):
+        built = original(base_url)
+        built._transport = httpx.MockTransport(handler)
+        return built
+    monkeypatch.setattr(client, "_build_client", build_with_mock)
+    return client, seen
+
+@pytest.mark.asyncio
+async def test_calls_share_one_pooled_client(pooled_client):
+    client, seen = pooled_client
+    await client.start()
+    pool = client.client
+
+    result = await client.generate("oi", model="gemma3:1b")
+    tokens = [chunk["content"] async for chunk in client.generate_stream("oi")]
+
+    assert client.client is pool
+    assert result["content"] == "ok" and tokens == ["Olá", "!"]
+    assert [r.url.path for r in seen if r.method == "POST"] == ["/api/chat", "/api/chat"]
+
+    await client.close()
+    assert pool.is_closed
+
+@pytest.mark.asyncio
+async def test_timeouts_split_and_overridable(pooled_client):
+    client, seen = pooled_client
+    await client.start()
+    assert client.client.timeout.connect < client.client.timeout.read
+
+    await client.generate("oi", timeout=7)
+    assert seen[-1].extensions["timeout"]["read"] == 7
+    await client.close()
@@ -0,0 +1,49 @@
+import json
+import httpx
+import pytest
+from src.core.llm_client import GemmaClient
+from src.core.llm_metrics import LLMMetrics, extract_stats
+
+FINAL_CHUNK = {
+    "model": "gemma3:27b", "message": {"content": ""}, "done": True,
+    "total_duration": 5_000_000_000, "load_duration": 2_000_000_000,
+    "prompt_eval_count": 3000, "prompt_eval_duration": 1_500_000_000,
+    "eval_count": 200, "eval_duration": 1_000_000_000,
+}
+
+def test_extract_stats_converts_ollama_fields():
+    stats = extract_stats(FINAL_CHUNK)
+    assert stats["prompt_tokens"] == 3000 and stats["output_tokens"] == 200
+    assert stats["tokens_per_s"] == 200.0
+    assert stats["prefill_tokens_per_s"] == 2000.0
+    assert stats["cold_load"] is True
+    assert extract_stats({"message": {"content": "oi"}, "done": False}) is None
+
+def test_per_model_aggregates():
+    metrics = LLMMetrics()
+    metrics.record(extract_stats(FINAL_CHUNK))
+    metrics.record(extract_stats({**FINAL_CHUNK, "load_duration": 1_000_000}))
+
+    model = metrics.snapshot()["models"]["gemma3:27b"]
+    assert model["calls"] == 2 and model["cold_loads"] == 1
+    assert model["prefill_ms_per_1k_tokens"] == 500.0
+    assert model["recent_max_prompt_tokens"] == 3000
+
+@pytest.mark.asyncio
+async def test_stream_yields_final_stats(monkeypatch):
+    def handler(request):
+        lines = [{"model": "gemma3:27b", "message": {"content": "Olá"}, "done": False}, FINAL_CHUNK]
+        return httpx.Response(200, content="\n".join(json.dumps(l) for l in lines))
+
+    client = GemmaClient()
+    original = client._build_client
+    def build_with_mock(base_url):
+        built = original(base_url)
+        built._transport = httpx.MockTransport(handler)
+        return built
+    monkeypatch.setattr(client, "_build_client", build_with_mock)
+
+    chunks = [chunk async for chunk in client.generate_stream("oi")]
+    assert "stats" not in chunks[0]
+    assert chunks[-1]["stats"]["output_tokens"] == 200
+    await client.close()
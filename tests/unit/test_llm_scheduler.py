@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, patch
+from src.core.llm_scheduler import LLMScheduler, LLMQueueTimeout
+from src.core.settings_manager import settings_manager
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "llm_max_concurrency", 2)
+    monkeypatch.setitem(settings_manager._settings, "llm_lane_limits", {"interactive": 2, "intent": 1, "ingestion": 1})
+    monkeypatch.setitem(settings_manager._settings, "llm_queue_timeouts", {"interactive": 1, "intent": 1, "ingestion": 0.05})
+    return LLMScheduler()
+
+@pytest.mark.asyncio
+async def test_ingestion_cannot_take_interactive_capacity(scheduler):
+    first = await scheduler.acquire("ingestion")
+    # Faixa de ingestão cheia: a segunda espera, mas o chat entra na hora
+    with pytest.raises(LLMQueueTimeout):
+        await scheduler.acquire("ingestion")
+    chat = await asyncio.wait_for(scheduler.acquire("interactive"), 0.1)
+
+    snapshot = scheduler.snapshot()["lanes"]
+    assert snapshot["ingestion"]["rejected"] == 1
+    assert snapshot["interactive"]["running"] == 1
+    first.release()
+    chat.release()
+
+@pytest.mark.asyncio
+async def test_freed_slot_goes_to_highest_priority_waiter(scheduler):
+    held = [await scheduler.acquire("interactive"), await scheduler.acquire("interactive")]
+    order = []
+
+    async def wait(lane):
+        slot = await scheduler.acquire(lane)
+        order.append(lane)
+        return slot
+
+    intent = asyncio.create_task(wait("intent"))
+    await asyncio.sleep(0)
+    chat = asyncio.create_task(wait("interactive"))
+    await asyncio.sleep(0)
+
+    held[0].release()
+    await asyncio.sleep(0.01)
+    assert order == ["interactive"] # Chegou depois, mas tem prioridade
+    held[1].release()
+    await asyncio.sleep(0.01)
+    assert order == ["interactive", "intent"]
+    for task in (intent, chat):
+        (await task).release()
+
+@pytest.mark.asyncio
+async def test_chat_rejected_with_503_and_retry_after(monkeypatch):
+    import json
+    from src.interfaces.api.routes.chat import chat_endpoint, ChatRequest
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+
+    with patch("src.core.database.db_manager") as mock_db, \
+         patch("src.interfaces.api.routes.chat.interpret_intent", new_callable=AsyncMock) as mock_intent, \
+         patch("src.core.llm_scheduler.llm_scheduler.acquire", side_effect=LLMQueueTimeout("interactive", 20.0, 7)):
+        mock_intent.return_value = {"search_needed": False, "formal_query": "oi", "ambiguity_score": 0.0}
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+        with pytest.raises(HTTPException) as exc:
+            await chat_endpoint(ChatRequest(message="oi", user_id="u1", stream=False))
+        response = await chat_endpoint(ChatRequest(message="oi", user_id="u1"))
+        events = [json.loads(line) async for line in response.body_iterator]
+
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "7"
+    # Stream: a recusa chega como evento (cabeçalhos já enviados)
+    assert events == [{"type": "error", "status": 503, "retry_after": 7, "content": events[0]["content"]}]
+
+@pytest.mark.asyncio
+async def test_dropped_stream_response_holds_no_slot(monkeypatch):
+    import gc
+    from src.core.llm_scheduler import llm_scheduler
+    from src.interfaces.api.routes.chat import chat_endpoint, ChatRequest
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "request_coalescing", False)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+
+    with patch("src.core.database.db_manager") as mock_db, \
+         patch("src.interfaces.api.routes.chat.interpret_intent", new_callable=AsyncMock) as mock_intent:
+        mock_intent.return_value = {"search_needed": False, "formal_query": "oi", "ambiguity_score": 0.0}
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+        response = await chat_endpoint(ChatRequest(message="oi", user_id="u1"))
+
+    # Cliente desconectou antes do corpo começar: a resposta é descartada sem ser iterada
+    del response
+    gc.collect()
+    assert llm_scheduler.snapshot()["lanes"]["interactive"]["running"] == 0
@@ -0,0 +1,115 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.core.load_controller import LoadController, QUALITY_TIERS
+from src.core.settings_manager import settings_manager
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "load_adaptive_enabled", True)
+    return LoadController(recovery_seconds=30)
+
+def test_steps_down_under_pressure_and_recovers_gradually(controller):
+    assert controller.evaluate(now=0)["name"] == "full"
+
+    controller.queue_depth = 20 # Pico: vai direto ao último degrau
+    assert controller.evaluate(now=1)["name"] == "survival"
+
+    controller.queue_depth = 0
+    assert controller.evaluate(now=2)["name"] == "survival" # Histerese
+    assert controller.evaluate(now=33)["name"] == "lean" # Sobe um degrau por vez
+    assert controller.evaluate(now=64)["name"] == "reduced"
+    assert [t["to"] for t in controller.transitions] == ["survival", "lean", "reduced"]
+
+def test_any_signal_can_trigger_degradation(controller):
+    controller.loop_lag_ms = 300
+    assert controller.evaluate(now=0)["name"] == "lean"
+    with controller.llm_call(), controller.llm_call(), controller.llm_call(), controller.llm_call():
+        assert controller.llm_inflight == 4
+    assert controller.llm_inflight == 0
+
+def test_inflight_thresholds_follow_configured_parallelism(controller, monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "llm_max_concurrency", 4)
+    controller.llm_inflight = 3 # Gerações em paralelo abaixo da capacidade: normal
+    assert controller.evaluate(now=0)["name"] == "full"
+    controller.llm_inflight = 4
+    assert controller.evaluate(now=1)["name"] == "reduced"
+    assert controller.snapshot()["thresholds"]["llm_inflight"] == (4, 8, 16)
+
+@pytest.mark.asyncio
+async def test_dropped_stream_does_not_leave_queue_depth_raised(monkeypatch):
+    import gc
+    from fastapi.responses import StreamingResponse
+    from src.interfaces.api.routes.chat import _tracked
+    fresh = LoadController()
+    monkeypatch.setattr("src.core.load_controller.load_controller", fresh)
+
+    async def pipeline():
+        async def body():
+            yield "linha\n"
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    response = await _tracked(pipeline())
+    del response # Cliente desconectou antes do corpo começar
+    gc.collect()
+    assert fresh.queue_depth == 0
+
+    response = await _tracked(pipeline())
+    assert [chunk async for chunk in response.body_iterator] == ["linha\n"]
+    assert fresh.queue_depth == 0
+
+@pytest.mark.asyncio
+async def test_chat_applies_current_tier(monkeypatch):
+    from src.interfaces.api.routes.chat import chat_endpoint, ChatRequest
+    from src.core.reranker import reranker
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", False)
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+    monkeypatch.setitem(settings_manager._settings, "load_shed_model", "gemma3:4b")
+    monkeypatch.setitem(settings_manager._settings, "dynamic_num_ctx", False)
+
+    with patch("src.core.load_controller.load_controller.current_tier", return_value=QUALITY_TIERS[-1]), \
+         patch("src.core.database.db_manager") as mock_db, \
+         patch.object(reranker, "rerank", return_value=[{"index": 0, "score": 0.9, "content": "Texto"}]), \
+         patch("src.core.llm_client.llm_client.generate", new_callable=AsyncMock) as mock_generate:
+        mock_db.search_documents = AsyncMock(return_value=[{"content": "Texto", "metadata": {"filename": "a.txt"}, "score": 0.8}])
+        mock_db.search_documents_keyword = AsyncMock(return_value=[])
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+        mock_generate.side_effect = [
+            {"content": json.dumps({"formal_query": "posto de saude", "keywords": ["posto"]}), "model": "mock", "timestamp": "now"},
+            {"content": "Resposta", "model": "gemma3:4b", "timestamp": "now"}
+        ]
+        await chat_endpoint(ChatRequest(message="Onde fica o posto?", user_id="u1", stream=False))
+
+    assert mock_db.search_documents.call_args.kwargs["limit"] == QUALITY_TIERS[-1]["rag_top_k"]
+    assert mock_generate.call_args.kwargs["model"] == "gemma3:4b"
+    assert mock_generate.call_args.kwargs["num_ctx"] == settings_manager.num_ctx # Sem recarga do runner
+    details = json.loads(mock_db.log_audit.call_args.kwargs["details"])
+    assert details["intent"]["token_budget"]["prompt_tokens"] <= QUALITY_TIERS[-1]["num_ctx_cap"]
+    assert details["intent"]["load_tier"]["tier"] == "survival"
+
+@pytest.mark.asyncio
+async def test_survival_tier_keeps_main_model_when_shed_model_missing(monkeypatch):
+    from src.interfaces.api.routes.chat import chat_endpoint, ChatRequest
+    from src.core.llm_client import llm_client
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", False)
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "load_shed_model", "gemma3:12b")
+
+    with patch("src.core.load_controller.load_controller.current_tier", return_value=QUALITY_TIERS[-1]), \
+         patch("src.core.database.db_manager") as mock_db, \
+         patch("src.core.llm_client.llm_client.generate", new_callable=AsyncMock) as mock_generate:
+        for backend in llm_client.backends.backends:
+            monkeypatch.setattr(backend, "installed_models", {"gemma3:27b"}) # Sondado: sem o 12b
+        mock_db.search_documents = AsyncMock(return_value=[])
+        mock_db.search_documents_keyword = AsyncMock(return_value=[])
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+        mock_generate.side_effect = [
+            {"content": json.dumps({"formal_query": "oi", "search_needed": False}), "model": "mock", "timestamp": "now"},
+            {"content": "Resposta", "model": "gemma3:27b", "timestamp": "now"}
+        ]
+        await chat_endpoint(ChatRequest(message="Oi, tudo bem?", user_id="u1", stream=False))
+
+    assert mock_generate.call_args.kwargs.get("model") in (None, settings_manager.llm_model)
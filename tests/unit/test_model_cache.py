@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from src.core.model_cache import ModelCache
+from src.core.reranker import Reranker
+
+@pytest.fixture
+def cache(tmp_path):
+    c = ModelCache(path=tmp_path / "model_cache.db", memory_entries=2, max_rows=3)
+    yield c
+    c.close()
+
+def test_values_survive_restart(cache, tmp_path):
+    cache.put("qemb:x", np.array([0.1, 0.2, 0.3]))
+    cache.close()
+
+    reopened = ModelCache(path=tmp_path / "model_cache.db")
+    assert np.allclose(reopened.get("qemb:x"), [0.1, 0.2, 0.3])
+    assert reopened.stats["disk_hits"] == 1
+    reopened.close()
+
+def test_memory_lru_and_disk_eviction(cache, monkeypatch):
+    monkeypatch.setattr(ModelCache, "EVICT_EVERY", 1)
+    for i in range(5):
+        cache.put(f"k{i}", np.array([float(i)]))
+
+    assert list(cache._memory) == ["k3", "k4"] # L1 bounded by memory_entries
+    (rows,) = cache._db().execute("SELECT COUNT(*) FROM model_cache").fetchone()
+    assert rows == 3 # L2 bounded by max_rows, oldest evicted
+    assert cache.get("k0") is None and cache.get("k2") is not None
+
+def test_rerank_only_scores_new_pairs(cache, monkeypatch):
+    monkeypatch.setattr("src.core.model_cache.model_cache", cache)
+    fake_scores = lambda query, docs: [len(d) / 100 for d in docs]
+
+    with patch.object(Reranker, "_predict", side_effect=fake_scores) as predict:
+        first = Reranker.score_pairs("obra da CEDAE", ["doc a", "doc bb"])
+        second = Reranker.score_pairs("obra  da CEDAE", ["doc bb", "doc ccc"])
+
+    assert predict.call_count == 2
+    assert predict.call_args_list[1].args[1] == ["doc ccc"] # "doc bb" came from the cache
+    assert second[0] == pytest.approx(first[1])
@@ -0,0 +1,73 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.core.model_router import ModelRouter
+from src.core.settings_manager import settings_manager
+from src.interfaces.api.routes.chat import Message
+
+DOC = {"content": "A coleta de lixo no centro ocorre às segundas.", "metadata": {}, "score": 0.9}
+
+@pytest.fixture(autouse=True)
+def _settings(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+    monkeypatch.setitem(settings_manager._settings, "llm_model", "gemma3:27b")
+    monkeypatch.setitem(settings_manager._settings, "model_routing_small_model", "gemma3:4b")
+    monkeypatch.setitem(settings_manager._settings, "model_routing_thresholds", {})
+
+def test_simple_question_goes_to_small_model():
+    router = ModelRouter()
+    signals = router.signals({"ambiguity_score": 0.1}, [DOC], [], "Quando passa a coleta de lixo?")
+    decision = router.route(signals)
+    assert decision["route"] == "small" and decision["model"] == "gemma3:4b"
+    assert router.counts == {"small": 1, "large": 0}
+
+def test_complex_signals_keep_the_large_model(monkeypatch):
+    router = ModelRouter()
+    legal = router.route(router.signals({}, [DOC], [], "O que diz o artigo 5 da lei orgânica?"))
+    assert legal["route"] == "large" and legal["reasons"] == ["legal"]
+
+    long_context = router.route(router.signals({}, [{**DOC, "content": "x" * 12000}], [], "E a coleta?"))
+    assert long_context["reasons"] == ["context_tokens"]
+
+    deep = [Message(role="user", content="oi"), Message(role="assistant", content="olá")] * 7
+    assert "history_turns" in router.route(router.signals({}, [], deep, "e agora?"))["reasons"]
+
+    # Limiar configurável (inclusive por nº de documentos)
+    monkeypatch.setitem(settings_manager._settings, "model_routing_thresholds", {"docs": 3})
+    assert router.route(router.signals({}, [DOC] * 5, [], "E a coleta?"))["reasons"] == ["docs"]
+
+def test_normal_retrieval_turn_can_go_small():
+    # Cinco slots de contexto preenchidos (fan-out padrão) com parents de tamanho usual
+    parents = [{**DOC, "content": "A coleta de lixo no centro ocorre às segundas. " * 25} for _ in range(5)]
+    signals = ModelRouter.signals({"ambiguity_score": 0.2}, parents, [], "Quando passa a coleta de lixo no centro?")
+    assert signals["docs"] == 5
+    assert ModelRouter().route(signals)["route"] == "small"
+
+def test_missing_small_model_falls_back_to_large(monkeypatch):
+    from src.core.llm_client import llm_client
+    for backend in llm_client.backends.backends:
+        monkeypatch.setattr(backend, "installed_models", {"gemma3:27b"})
+    decision = ModelRouter().route(ModelRouter.signals({}, [], [], "oi"))
+    assert decision["reasons"] == ["small_model_unavailable"] and decision["model"] == "gemma3:27b"
+
+@pytest.mark.asyncio
+async def test_chat_generates_with_routed_model_and_audits_decision(monkeypatch):
+    from src.interfaces.api.routes.chat import ChatRequest, run_chat_pipeline
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", False)
+    monkeypatch.setitem(settings_manager._settings, "model_routing_enabled", True)
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+
+    intent = json.dumps({"search_needed": False, "ambiguity_score": 0.0, "formal_query": "bom dia"})
+    with patch("src.core.database.db_manager") as mock_db, \
+         patch("src.core.llm_client.llm_client.generate", new_callable=AsyncMock) as mock_generate:
+        mock_db.log_audit = AsyncMock()
+        mock_generate.side_effect = [
+            {"content": intent, "model": "m", "timestamp": "t"},
+            {"content": "Bom dia!", "model": "gemma3:4b", "timestamp": "t"},
+        ]
+        await run_chat_pipeline(ChatRequest(message="Bom dia", user_id="u", stream=False), "hash")
+
+    assert mock_generate.call_args.kwargs["model"] == "gemma3:4b"
+    details = json.loads(mock_db.log_audit.call_args.kwargs["details"])
+    assert details["intent"]["model_route"]["route"] == "small"
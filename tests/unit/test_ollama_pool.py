@@ -0,0 +1,59 @@
+import json
+import httpx
+import pytest
+from src.core.llm_client import GemmaClient
+from src.config import settings
+
+def _client_with_nodes(monkeypatch, handlers):
+    """GemmaClient over fake nodes: {url: handler(request) -> httpx.Response}."""
+    monkeypatch.setattr(settings, "OLLAMA_URLS", ",".join(handlers))
+    client = GemmaClient()
+    original = client._build_client
+    def build_with_mock(base_url):
+        built = original(base_url)
+        built._transport = httpx.MockTransport(handlers[base_url])
+        return built
+    monkeypatch.setattr(client, "_build_client", build_with_mock)
+    return client
+
+def _ok(name):
+    def handler(request):
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [{"name": "gemma3:27b"}]})
+        if request.url.path == "/api/ps":
+            return httpx.Response(200, json={"models": []})
+        return httpx.Response(200, json={"message": {"content": name}, "model": "gemma3:27b", "done": True})
+    return handler
+
+def _down(request):
+    raise httpx.ConnectError("connection refused")
+
+@pytest.mark.asyncio
+async def test_non_stream_call_fails_over_and_opens_circuit(monkeypatch):
+    client = _client_with_nodes(monkeypatch, {"http://a:11434": _down, "http://b:11434": _ok("b")})
+    a, b = client.backends.backends
+
+    for _ in range(3):
+        b.outstanding = 5 # "a" wins least-outstanding until its circuit opens
+        result = await client.generate("oi", model="gemma3:27b")
+        b.outstanding = 0
+        assert result["content"] == "b"
+
+    assert a.state == "open"
+    assert client.backends.pick("gemma3:27b") is b
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_routing_prefers_loaded_model_then_least_outstanding(monkeypatch):
+    client = _client_with_nodes(monkeypatch, {"http://a:11434": _ok("a"), "http://b:11434": _ok("b")})
+    await client.start()
+    a, b = client.backends.backends
+
+    a.outstanding = 3
+    assert client.backends.pick("gemma3:27b") is b # Menos requisições em andamento
+    a.loaded_models = {"gemma3:27b"}
+    assert client.backends.pick("gemma3:27b") is a # Modelo já carregado evita o cold load
+    b.installed_models = set()
+    a.loaded_models = set()
+    assert client.backends.pick("gemma3:27b") is a # "b" não tem o modelo
+    await client.close()
@@ -0,0 +1,109 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.core.database import DatabaseManager
+from src.core.session_store import SessionStore, split_scratchpad
+from src.core.settings_manager import settings_manager
+from src.core.token_budget import TokenCounter
+from src.config import settings
+
+@pytest.fixture
+async def temp_db_manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_DB_PATH", tmp_path / "test_sessions.db")
+    db = DatabaseManager()
+    await db.get_sqlite()
+    monkeypatch.setattr("src.core.database.db_manager", db)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+    yield db
+    if db._sqlite_connection:
+        await db._sqlite_connection.close()
+
+def test_split_scratchpad():
+    answer, note = split_scratchpad("Resposta.<SCRATCHPAD>Mora em Tinguá</SCRATCHPAD>")
+    assert answer == "Resposta." and note == "Mora em Tinguá"
+    assert split_scratchpad("Sem nota") == ("Sem nota", None)
+
+@pytest.mark.asyncio
+async def test_session_is_bound_to_its_owner(temp_db_manager):
+    store = SessionStore()
+    session_id = await store.create("hash-a")
+    await store.append_turn(session_id, "Pergunta", "Resposta", scratchpad="Nota")
+
+    session = await store.load(session_id, "hash-a")
+    assert session["scratchpad"] == "Nota"
+    assert [m["role"] for m in session["messages"]] == ["user", "assistant"]
+    assert await store.load(session_id, "hash-b") is None
+    assert await store.delete(session_id, "hash-b") is False
+    assert await store.delete(session_id, "hash-a") is True
+    assert await store.load(session_id, "hash-a") is None
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_history_bounded(temp_db_manager, monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "session_compaction_tokens", 200)
+    monkeypatch.setitem(settings_manager._settings, "session_recent_messages", 2)
+    store = SessionStore()
+    session_id = await store.create("hash-a")
+
+    generate = AsyncMock(return_value={"content": "Cidadão perguntou sobre a obra da CEDAE."})
+    with patch("src.core.llm_client.llm_client.generate", generate):
+        sizes = []
+        for turn in range(12):
+            await store.append_turn(session_id, f"Pergunta {turn} " + "sobre a obra " * 20, "Resposta longa " * 30)
+            await store.compact(session_id)
+            session = await store.load(session_id, "hash-a")
+            sizes.append(sum(TokenCounter.count(m["content"]) for m in store.history(session)))
+
+    assert generate.await_args.kwargs["priority"] == "ingestion"
+    assert session["summary"] == "Cidadão perguntou sobre a obra da CEDAE."
+    assert len(session["messages"]) <= 4 # 2 mantidas + o turno novo antes da próxima compactação
+    assert store.history(session)[0]["role"] == "system"
+    assert max(sizes[4:]) <= max(sizes[:4]) + 50 # Não cresce com a conversa
+
+@pytest.mark.asyncio
+async def test_extractive_fallback_when_llm_fails(temp_db_manager, monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "session_compaction_tokens", 10)
+    monkeypatch.setitem(settings_manager._settings, "session_recent_messages", 0)
+    store = SessionStore()
+    session_id = await store.create("hash-a")
+    await store.append_turn(session_id, "Qual o prazo do IPTU?", "O prazo é 10 de março. Há desconto à vista.")
+
+    with patch("src.core.llm_client.llm_client.generate", AsyncMock(side_effect=ConnectionError("offline"))):
+        assert await store.compact(session_id) is True
+
+    session = await store.load(session_id, "hash-a")
+    assert session["messages"] == []
+    assert "Qual o prazo do IPTU?" in session["summary"]
+    assert "Há desconto" not in session["summary"] # Só a primeira frase da resposta
+
+@pytest.mark.asyncio
+async def test_chat_uses_session_history_and_persists_turn(temp_db_manager, monkeypatch):
+    from src.interfaces.api.routes.chat import ChatRequest, chat_endpoint
+    from src.core.session_store import session_store
+    from src.utils.security import anonymize_user
+
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", False)
+    monkeypatch.setitem(settings_manager._settings, "request_coalescing", False)
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+    session_id = await session_store.create(anonymize_user("u1"))
+    await session_store.append_turn(session_id, "Moro em Tinguá.", "Entendido.", scratchpad="Bairro: Tinguá")
+
+    intent = json.dumps({"search_needed": False, "ambiguity_score": 0.0, "formal_query": "obras", "keywords": []})
+    generate = AsyncMock(side_effect=[
+        {"content": intent, "model": "m", "timestamp": "t"},
+        {"content": "Há obras previstas.<SCRATCHPAD>Interesse: obras</SCRATCHPAD>", "model": "m", "timestamp": "t"},
+    ])
+    with patch("src.core.llm_client.llm_client.generate", generate), \
+         patch("src.core.database.db_manager.log_audit", AsyncMock()):
+        result = await chat_endpoint(ChatRequest(message="E as obras?", user_id="u1", session_id=session_id, stream=False))
+
+    assert result["metadata"]["session_id"] == session_id
+    final_call = generate.await_args_list[-1].kwargs
+    assert "Moro em Tinguá." in final_call["prompt"] # Histórico veio do servidor
+    session = await session_store.load(session_id, anonymize_user("u1"))
+    assert session["messages"][-1] == {"role": "assistant", "content": "Há obras previstas."}
+    assert session["scratchpad"] == "Interesse: obras"
+
+    with pytest.raises(Exception) as exc:
+        await chat_endpoint(ChatRequest(message="Oi", user_id="outro", session_id=session_id, stream=False))
+    assert getattr(exc.value, "status_code", None) == 404
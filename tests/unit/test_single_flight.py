@@ -0,0 +1,95 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.core.single_flight import SingleFlight, StreamBroadcast
+from src.interfaces.api.routes.chat import chat_endpoint, ChatRequest
+from src.core.settings_manager import settings_manager
+
+@pytest.fixture
+def chat_settings(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "request_coalescing", True)
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+
+async def _ticker(n):
+    for i in range(n):
+        await asyncio.sleep(0.01)
+        yield i
+
+@pytest.mark.asyncio
+async def test_single_flight_runs_work_once():
+    flights = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    results = await asyncio.gather(*[flights.do("k", work) for _ in range(5)])
+    assert calls == 1
+    assert [r for r, _ in results] == ["ok"] * 5
+    assert sum(shared for _, shared in results) == 4
+    assert flights.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_broadcast_replays_for_late_subscribers():
+    broadcast = StreamBroadcast(_ticker(5))
+    early = [e async for e in broadcast.subscribe()]
+    late = [e async for e in broadcast.subscribe()]
+    assert early == late == [0, 1, 2, 3, 4]
+
+@pytest.mark.asyncio
+async def test_identical_stream_requests_share_one_generation(chat_settings):
+    async def fake_stream(**kwargs):
+        for word in ["Resposta ", "compartilhada ", "entre ", "todos os usuários."]:
+            await asyncio.sleep(0.01)
+            yield {"content": word}
+
+    with patch("src.core.database.db_manager") as mock_db, \
+         patch("src.interfaces.api.routes.chat.interpret_intent", new_callable=AsyncMock) as mock_intent, \
+         patch("src.core.llm_client.llm_client.generate_stream", side_effect=fake_stream) as mock_stream:
+        mock_intent.return_value = {"search_needed": False, "formal_query": "oi", "ambiguity_score": 0.0}
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+
+        async def consume(user):
+            response = await chat_endpoint(ChatRequest(message="Oi, tudo bem?", user_id=user))
+            return [json.loads(line) async for line in response.body_iterator]
+
+        outputs = await asyncio.gather(*[consume(f"user{i}") for i in range(3)])
+
+    assert mock_stream.call_count == 1
+    texts = ["".join(e["content"] for e in out if e["type"] == "token") for out in outputs]
+    assert texts[0] == texts[1] == texts[2] == "Resposta compartilhada entre todos os usuários."
+    actions = [c.kwargs["action"] for c in mock_db.log_audit.call_args_list]
+    assert actions.count("chat_rag_stream") == 1 and actions.count("chat_coalesced_stream") == 2
+
+@pytest.mark.asyncio
+async def test_coalesced_answers_are_copied_per_session(chat_settings):
+    from src.core.session_store import session_store
+
+    async def slow_generate(**kwargs):
+        await asyncio.sleep(0.05)
+        return {"content": "Olá!", "model": "m", "timestamp": "now"}
+
+    async def load(session_id, user_hash):
+        return {"id": session_id, "scratchpad": None}
+
+    with patch("src.core.database.db_manager") as mock_db, \
+         patch("src.interfaces.api.routes.chat.interpret_intent", new_callable=AsyncMock) as mock_intent, \
+         patch("src.core.llm_client.llm_client.generate", side_effect=slow_generate) as mock_generate, \
+         patch.object(session_store, "load", side_effect=load), \
+         patch.object(session_store, "history", return_value=[]), \
+         patch.object(session_store, "append_turn", new_callable=AsyncMock), \
+         patch.object(session_store, "schedule_compaction"):
+        mock_intent.return_value = {"search_needed": False, "formal_query": "oi", "ambiguity_score": 0.0}
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+        results = await asyncio.gather(*[
+            chat_endpoint(ChatRequest(message="Oi, tudo bem?", user_id=f"user{i}", session_id=f"s{i}", stream=False))
+            for i in range(3)
+        ])
+
+    assert mock_generate.call_count == 1 # Uma geração compartilhada...
+    assert [r["metadata"]["session_id"] for r in results] == ["s0", "s1", "s2"] # ...cópias independentes
@@ -0,0 +1,78 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.interfaces.api.routes.chat import chat_endpoint, ChatRequest
+from src.core.reranker import reranker
+from src.core.settings_manager import settings_manager
+
+@pytest.fixture
+def speculative_settings(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "speculative_retrieval", True)
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", False)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+
+async def _run_chat(formal_query: str):
+    with patch("src.core.database.db_manager") as mock_db:
+        mock_db.search_documents = AsyncMock(return_value=[
+            {"content": "Texto Vetorial 1", "metadata": {"filename": "doc_vec.txt", "source": "test"}, "score": 0.8}
+        ])
+        mock_db.search_documents_keyword = AsyncMock(return_value=[])
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+
+        with patch.object(reranker, "rerank", return_value=[{"index": 0, "score": 0.9, "content": "Texto Vetorial 1"}]):
+            with patch("src.core.llm_client.llm_client.generate", new_callable=AsyncMock) as mock_generate:
+                mock_generate.side_effect = [
+                    {"content": json.dumps({"formal_query": formal_query, "keywords": ["posto"]}), "model": "mock", "timestamp": "now"},
+                    {"content": "Resposta", "model": "mock", "timestamp": "now"}
+                ]
+                req = ChatRequest(message="Onde fica o posto de saude?", user_id="user123", stream=False)
+                await chat_endpoint(req)
+
+        details = json.loads(mock_db.log_audit.call_args.kwargs["details"])
+        return mock_db.search_documents, details["intent"]["speculative"]
+
+@pytest.mark.asyncio
+async def test_speculative_candidates_reused_when_query_unchanged(speculative_settings):
+    search, speculative = await _run_chat("Onde fica o posto de saude?")
+
+    search.assert_called_once() # Only the speculative search at t=0
+    assert speculative["hit"] is True
+
+@pytest.mark.asyncio
+async def test_rewritten_query_triggers_delta_search(speculative_settings, monkeypatch):
+    # Force the token-overlap fallback (no embedder model in tests)
+    from src.core.embedder import embedder
+    monkeypatch.setattr(embedder, "encode", lambda texts: (_ for _ in ()).throw(RuntimeError("offline")))
+
+    search, speculative = await _run_chat("Endereço e horário da Unidade Básica de Saúde de Tinguá")
+
+    assert search.call_count == 2 # Speculative + delta
+    assert speculative["hit"] is False
+    assert search.call_args_list[1].args[0] == "Endereço e horário da Unidade Básica de Saúde de Tinguá"
+
+@pytest.mark.asyncio
+async def test_ambiguous_turn_cancels_speculative_search(speculative_settings, monkeypatch):
+    import asyncio
+    monkeypatch.setitem(settings_manager._settings, "active_listening_threshold", 0.5)
+    cancelled = asyncio.Event()
+
+    async def slow_search(*args, **kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def ambiguous_intent(**kwargs):
+        await asyncio.sleep(0.05) # A busca especulativa já está em andamento
+        return {"content": json.dumps({"formal_query": "posto", "ambiguity_score": 0.9}), "model": "mock", "timestamp": "now"}
+
+    with patch("src.core.database.db_manager") as mock_db, \
+         patch("src.core.llm_client.llm_client.generate", side_effect=ambiguous_intent):
+        mock_db.search_documents = AsyncMock(side_effect=slow_search)
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+        result = await chat_endpoint(ChatRequest(message="E o posto?", user_id="user123", stream=False))
+        await asyncio.wait_for(cancelled.wait(), timeout=1) # Busca especulativa não fica rodando solta
+
+    assert result["status"] == "ambiguity_detected"
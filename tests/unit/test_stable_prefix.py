@@ -0,0 +1,56 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.interfaces.api.routes.chat import chat_endpoint, ChatRequest, Message
+from src.core.reranker import reranker
+from src.core.settings_manager import settings_manager
+from src.core.llm_metrics import LLMMetrics
+
+@pytest.fixture
+def stable_settings(monkeypatch):
+    monkeypatch.setitem(settings_manager._settings, "prompt_assembly_mode", "stable_prefix")
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", False)
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+
+async def _answer_call(message: str, history, doc_text: str):
+    with patch("src.core.database.db_manager") as mock_db, \
+         patch.object(reranker, "rerank", return_value=[{"index": 0, "score": 0.9, "content": doc_text}]), \
+         patch("src.core.llm_client.llm_client.generate", new_callable=AsyncMock) as mock_generate:
+        mock_db.search_documents = AsyncMock(return_value=[
+            {"content": doc_text, "metadata": {"filename": "lei.txt", "source": "camara"}, "score": 0.8}
+        ])
+        mock_db.search_documents_keyword = AsyncMock(return_value=[])
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+        mock_generate.side_effect = [
+            {"content": json.dumps({"formal_query": message, "keywords": ["lei"], "search_needed": True}), "model": "mock", "timestamp": "now"},
+            {"content": "Resposta", "model": "mock", "timestamp": "now"}
+        ]
+        await chat_endpoint(ChatRequest(message=message, user_id="u1", history=history, stream=False))
+    return mock_generate.call_args.kwargs
+
+@pytest.mark.asyncio
+async def test_prefix_is_byte_stable_across_turns(stable_settings):
+    first = await _answer_call("O que diz a lei de zoneamento?", None, "Texto da lei de zoneamento")
+    history = [Message(role="user", content="O que diz a lei de zoneamento?"), Message(role="assistant", content="Resposta")]
+    second = await _answer_call("E sobre o IPTU progressivo?", history, "Texto sobre IPTU")
+
+    assert first["system_prompt"] == second["system_prompt"] # Mesmo prefixo -> KV cache reaproveitável
+    assert second["history"] == [{"role": "user", "content": "O que diz a lei de zoneamento?"},
+                                 {"role": "assistant", "content": "Resposta"}]
+    # Contexto recuperado e pergunta só no final
+    assert "Texto sobre IPTU" in second["prompt"] and "Texto sobre IPTU" not in second["system_prompt"]
+    assert second["prompt"].endswith("E sobre o IPTU progressivo?")
+    assert first["num_ctx"] == second["num_ctx"] == settings_manager.num_ctx
+
+def test_prefix_reuse_estimate():
+    metrics = LLMMetrics()
+    stats = {"model": "gemma3:27b", "prompt_tokens": 500, "prompt_eval_ms": 250.0, "output_tokens": 10,
+             "eval_ms": 100.0, "load_ms": 0.0, "total_ms": 400.0, "cold_load": False}
+    metrics.record(stats)
+    # Contagem heurística (len/3.2) superestima o prompt: nenhum reuso reportado
+    assert metrics.record_prefix_reuse(3000, stats) is None
+    report = metrics.record_prefix_reuse(3000, stats, exact_count=True)
+    assert report["reused_tokens_est"] == 2500
+    assert report["prefill_saved_ms_est"] == 1250.0
+    assert metrics.snapshot()["models"]["gemma3:27b"]["prefix_reused_tokens_est"] == 2500
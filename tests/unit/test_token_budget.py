@@ -0,0 +1,59 @@
+import pytest
+from src.core.settings_manager import settings_manager
+from src.core.token_budget import TokenCounter, ContextPacker, focus_window, select_num_ctx
+
+@pytest.fixture(autouse=True)
+def heuristic_tokenizer(monkeypatch):
+    # Char-based estimate: deterministic and no model files needed
+    monkeypatch.setitem(settings_manager._settings, "context_tokenizer", "")
+
+def test_select_num_ctx_uses_smallest_sufficient_step():
+    assert select_num_ctx(1500, 8192) == 2048
+    assert select_num_ctx(2049, 8192) == 4096
+    assert select_num_ctx(50000, 8192) == 8192 # Capped at the configured maximum
+
+def test_focus_window_keeps_matched_chunk():
+    text = "A" * 3000 + " TRECHO RELEVANTE SOBRE A OBRA " + "B" * 3000
+    window = focus_window(text, "TRECHO RELEVANTE SOBRE A OBRA", max_tokens=100)
+    assert "TRECHO RELEVANTE SOBRE A OBRA" in window
+    assert TokenCounter.count(window) <= 100
+
+def test_packer_fills_budget_by_relevance():
+    docs = [
+        {"content": "x" * 3200, "score": 0.2, "metadata": {}},
+        {"content": "y" * 320, "score": 0.9, "metadata": {}},
+        {"content": "z" * 3200, "score": 0.5, "metadata": {}, "match": "z" * 50},
+    ]
+    packed, used = ContextPacker(min_doc_tokens=50).pack(docs, budget_tokens=700, header_tokens=10)
+
+    assert used <= 700
+    # Most relevant first; the second is cut to fit, the least relevant is dropped
+    assert [d["score"] for d in packed] == [0.9, 0.5]
+    assert len(packed[1]["content"]) < 3200
+
+@pytest.mark.asyncio
+async def test_intent_and_answer_share_one_num_ctx(monkeypatch):
+    import json
+    from unittest.mock import AsyncMock, patch
+    from src.core.llm_client import llm_client
+    from src.core.load_controller import QUALITY_TIERS
+    from src.interfaces.api.routes.chat import chat_endpoint, ChatRequest
+    monkeypatch.setitem(settings_manager._settings, "local_intent_enabled", False)
+    monkeypatch.setitem(settings_manager._settings, "intent_streaming", False)
+    monkeypatch.setitem(settings_manager._settings, "answer_cache_enabled", False)
+    monkeypatch.delitem(settings_manager._settings, "dynamic_num_ctx", raising=False) # Padrão
+
+    payloads = []
+    async def ollama(payload, timeout):
+        payloads.append(payload)
+        content = json.dumps({"search_needed": False, "formal_query": "oi"}) if payload.get("format") else "Olá!"
+        return {"content": content, "model": payload["model"], "timestamp": "now"}
+
+    with patch("src.core.load_controller.load_controller.current_tier", return_value=QUALITY_TIERS[1]), \
+         patch("src.core.database.db_manager") as mock_db, \
+         patch.object(llm_client, "_generate_with_failover", side_effect=ollama):
+        mock_db.log_audit = AsyncMock(return_value="log_id")
+        await chat_endpoint(ChatRequest(message="Oi, tudo bem?", user_id="u1", stream=False))
+
+    # Prompt curto e tier com teto de 6144: o runner do Ollama ainda vê um único num_ctx
+    assert [p["options"]["num_ctx"] for p in payloads] == [settings_manager.num_ctx] * 2
@@ -0,0 +1,61 @@
+import pytest
+from src.core.database import DatabaseManager
+from src.config import settings
+
+@pytest.fixture
+async def temp_db_manager(tmp_path, monkeypatch):
+    chroma_path = tmp_path / "test_chroma_routing"
+    chroma_path.mkdir()
+    monkeypatch.setattr(settings, "SQLITE_DB_PATH", tmp_path / "test_routing.db")
+    monkeypatch.setattr(settings, "CHROMADB_DIR", chroma_path)
+
+    db = DatabaseManager()
+    yield db
+    if db._sqlite_connection:
+        await db._sqlite_connection.close()
+
+def _add_micros(db, doc_id, vectors, sphere="municipal"):
+    """Indexes micro chunks with explicit embeddings (no model download in tests)."""
+    ids, metas, docs = [], [], []
+    for i, _ in enumerate(vectors):
+        ids.append(f"{doc_id}_parent_{i // 2}_micro_{i % 2}")
+        metas.append({
+            "original_doc_id": doc_id,
+            "parent_id": f"{doc_id}_parent_{i // 2}",
+            "parent_type": "act",
+            "chunk_index": i % 2,
+            "status": "active",
+            "sphere": sphere,
+            "filename": f"{doc_id}.txt"
+        })
+        docs.append(f"{doc_id} trecho {i}")
+    db.get_collection().add(ids=ids, embeddings=vectors, metadatas=metas, documents=docs)
+
+@pytest.mark.asyncio
+async def test_two_stage_restricts_chunk_search_to_routed_documents(temp_db_manager, monkeypatch):
+    db = temp_db_manager
+
+    # doc_a lives near the x axis, doc_b near the y axis
+    _add_micros(db, "doc_a", [[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.95, 0.0, 0.05], [0.9, 0.0, 0.1]])
+    _add_micros(db, "doc_b", [[0.0, 1.0, 0.0], [0.1, 0.9, 0.0], [0.0, 0.95, 0.05], [0.0, 0.9, 0.1]])
+
+    assert db.index_document_routing("doc_a") == 2 # Two parents -> two centroids
+    assert db.index_document_routing("doc_b") == 2
+
+    monkeypatch.setattr(db, "embed_query", lambda text: [1.0, 0.05, 0.0])
+    results = await db.search_documents_two_stage("consulta", limit=10, top_docs=1)
+
+    assert results
+    assert {r["metadata"]["original_doc_id"] for r in results} == {"doc_a"}
+
+@pytest.mark.asyncio
+async def test_two_stage_falls_back_to_flat_search_without_routing(temp_db_manager, monkeypatch):
+    db = temp_db_manager
+    _add_micros(db, "doc_c", [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+
+    monkeypatch.setattr(db, "embed_query", lambda text: [1.0, 0.0, 0.0])
+    results = await db.search_documents_two_stage("consulta", limit=2)
+
+    assert len(results) == 2
+    assert results[0]["metadata"]["original_doc_id"] == "doc_c"
+    assert results[0]["score"] == pytest.approx(1.0, abs=1e-3)
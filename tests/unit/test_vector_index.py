@@ -0,0 +1,37 @@
+import pytest
+from src.core.vector_index import collection_metadata, distance_to_similarity, resolve_profile
+
+def test_profile_uses_cosine_space():
+    meta = collection_metadata("balanced")
+    assert meta["hnsw:space"] == "cosine"
+    assert meta["hnsw:M"] == 32
+    assert meta["hnsw:search_ef"] >= 64
+
+def test_overrides_and_unknown_profile():
+    params = resolve_profile("does_not_exist", {"search_ef": 96, "unknown_key": 1})
+    assert params["search_ef"] == 96
+    assert "unknown_key" not in params
+    assert params["M"] == resolve_profile("balanced")["M"]
+
+def test_distance_to_similarity_per_space():
+    # Identical normalized vectors
+    assert distance_to_similarity(0.0, "cosine") == 1.0
+    assert distance_to_similarity(0.0, "l2") == 1.0
+    # Orthogonal normalized vectors: cosine distance 1, squared L2 distance 2
+    assert distance_to_similarity(1.0, "cosine") == pytest.approx(0.0)
+    assert distance_to_similarity(2.0, "l2") == pytest.approx(0.0)
+
+def test_tune_apply_changes_search_ef_of_existing_collection():
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+    from scripts.tune_hnsw import apply_search_ef
+
+    client = chromadb.EphemeralClient(settings=ChromaSettings(anonymized_telemetry=False))
+    client.create_collection("tune_apply_test", metadata=collection_metadata("small"), embedding_function=None)
+    # get_or_create_collection com metadata nova não altera a coleção existente
+    client.get_or_create_collection("tune_apply_test", metadata={**collection_metadata("small"), "hnsw:search_ef": 200})
+    assert client.get_collection("tune_apply_test").configuration["hnsw"]["ef_search"] == 64
+
+    assert apply_search_ef(client, "tune_apply_test", 200)
+    assert client.get_collection("tune_apply_test").configuration["hnsw"]["ef_search"] == 200
+    client.delete_collection("tune_apply_test")